@@ -7,9 +7,8 @@ from astropy.time import Time
 import astropy.units as u
 import math
 from datetime import datetime
-import yaml
-import os
-from src.coordinates import skyfield_to_icrs, icrs_to_gcrs, convert_au_to_km
+from src.ground_stations import load_ground_stations, station_positions, geodetic_to_gcrs_km
+from src.time_utils import utc_time
 
 class CameraViewpointSelector:
     """相机位置与观察点选择器"""
@@ -38,8 +37,8 @@ class CameraViewpointSelector:
         self.earth = earth
         self.ts = ts
         
-        # 从文件加载地面站数据
-        self.ground_stations = self.load_ground_stations()
+        # 从文件加载地面站数据 (进程内只读取一次)
+        self.ground_stations = load_ground_stations()
         
         # 结果数据
         self.result = None
@@ -51,46 +50,10 @@ class CameraViewpointSelector:
         # 创建UI
         self.create_ui()
     
-    def load_ground_stations(self):
-        """从YAML文件加载地面站数据"""
-        stations_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'stations.yaml')
-        
-        # 如果文件不存在，创建默认站点并保存
-        if not os.path.exists(stations_file):
-            default_stations = {
-                "英国-格林威治天文台": {"lat": 51.4769, "lon": 0.0, "alt": 45.0},
-                "中国-西电科大西大楼": {"lat": 34.2308, "lon": 108.9167, "alt": 414.0},
-                "阿根廷-布宜诺斯艾利斯": {"lat": -34.6500, "lon": -58.3333, "alt": 2.0},
-                "北极-中国黄河站": {"lat": 78.9167, "lon": 11.9333, "alt": 24.0}
-            }
-            
-            # 保存默认站点到文件
-            try:
-                with open(stations_file, 'w', encoding='utf-8') as f:
-                    yaml.dump(default_stations, f, allow_unicode=True, sort_keys=False)
-                print(f"已创建默认地面站文件: {stations_file}")
-                return default_stations
-            except Exception as e:
-                print(f"创建默认地面站文件失败: {str(e)}")
-                # 如果保存失败，仍然返回默认站点
-                return default_stations
-        
-        # 如果文件存在，读取文件内容
-        try:
-            with open(stations_file, 'r', encoding='utf-8') as f:
-                stations = yaml.safe_load(f)
-                print(f"已从 {stations_file} 加载 {len(stations)} 个地面站")
-                return stations
-        except Exception as e:
-            print(f"读取地面站文件失败: {str(e)}")
-            # 如果读取失败，返回默认站点
-            return {
-                "英国-格林威治天文台": {"lat": 51.4769, "lon": 0.0, "alt": 45.0},
-                "中国-西电科大西大楼": {"lat": 34.2308, "lon": 108.9167, "alt": 414.0},
-                "阿根廷-布宜诺斯艾利斯": {"lat": -34.6500, "lon": -58.3333, "alt": 2.0},
-                "北极-中国黄河站": {"lat": 78.9167, "lon": 11.9333, "alt": 24.0}
-            }
-        
+    def get_station_positions(self):
+        """获取当前时刻所有地面站的 GCRS 坐标 (一次批量计算并缓存)"""
+        return station_positions(self.ground_stations, self.earth, utc_time(self.ts, self.time_utc))
+    
     def create_ui(self):
         """创建用户界面，添加异常处理"""
         try:
@@ -338,7 +301,7 @@ class CameraViewpointSelector:
             self.camera_lon_var.set(str(station_data["lon"]))
             
             # 计算GCRS坐标
-            gcrs_coords = self.geo_to_gcrs(station_data["lat"], station_data["lon"], station_data["alt"])
+            gcrs_coords = self.get_station_positions().position(station_name)
             self.camera_x_var.set(f"{gcrs_coords[0]:.2f}")
             self.camera_y_var.set(f"{gcrs_coords[1]:.2f}")
             self.camera_z_var.set(f"{gcrs_coords[2]:.2f}")
@@ -435,7 +398,7 @@ class CameraViewpointSelector:
             self.target_lon_var.set(str(station_data["lon"]))
             
             # 计算GCRS坐标
-            gcrs_coords = self.geo_to_gcrs(station_data["lat"], station_data["lon"], station_data["alt"])
+            gcrs_coords = self.get_station_positions().position(station_name)
             self.target_x_var.set(f"{gcrs_coords[0]:.2f}")
             self.target_y_var.set(f"{gcrs_coords[1]:.2f}")
             self.target_z_var.set(f"{gcrs_coords[2]:.2f}")
@@ -691,29 +654,11 @@ class CameraViewpointSelector:
             list: GCRS坐标 [x, y, z] (千米)
         """
         # 转换为地心坐标系
-        t = self.ts.utc(self.time_utc.year, self.time_utc.month, self.time_utc.day,
-                        self.time_utc.hour, self.time_utc.minute, self.time_utc.second)
+        t = utc_time(self.ts, self.time_utc)
         
-        # 创建地面位置
-        topos = Topos(latitude_degrees=lat, longitude_degrees=lon, elevation_m=alt)
-        
-        # 获取地面观测点
-        location = self.earth + topos
-        
-        # 在特定时间获取位置
-        position = location.at(t).position
-        
-        # 转换为 ICRS 坐标
-        icrs_coords = skyfield_to_icrs(position)
-        
-        # 转换为 km 单位
-        icrs_coords_km = convert_au_to_km(icrs_coords)
-        
-        # 转换为 GCRS 坐标
-        gcrs_coords_km = icrs_to_gcrs(icrs_coords_km, t.utc_iso())
-        
-        # 返回GCRS坐标
-        return [gcrs_coords_km.x.value, gcrs_coords_km.y.value, gcrs_coords_km.z.value]
+        # 在特定时间获取地面点的 GCRS 坐标 (千米)
+        positions, _ = geodetic_to_gcrs_km(self.earth, [lat], [lon], [alt], t)
+        return positions[0].tolist()
     
     def check_same_position(self):
         """检查相机和观察点是否位于同一位置"""
@@ -747,16 +692,8 @@ class CameraViewpointSelector:
         # 地球半径 (km)
         EARTH_RADIUS = 6340
         
-        # 获取地球中心坐标
-        t = self.ts.utc(self.time_utc.year, self.time_utc.month, self.time_utc.day,
-                       self.time_utc.hour, self.time_utc.minute, self.time_utc.second)
-        
-        # 获取地球在GCRS中的位置
-        earth_position = self.earth.at(t).position
-        earth_icrs = skyfield_to_icrs(earth_position)
-        earth_icrs_km = convert_au_to_km(earth_icrs)
-        earth_gcrs_km = icrs_to_gcrs(earth_icrs_km, t.utc_iso())
-        earth_center = np.array([earth_gcrs_km.x.value, earth_gcrs_km.y.value, earth_gcrs_km.z.value])
+        # 获取地球在GCRS中的位置 (与地面站坐标在同一次批量计算中得到)
+        earth_center = self.get_station_positions().earth_center
         
         print(f"地球中心GCRS坐标: {earth_center}")
         print(f"检查地球遮挡: 相机点={point1}, 目标点={point2}")
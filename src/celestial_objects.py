@@ -1,9 +1,34 @@
+import threading
 from skyfield.api import load
 
-def load_ephemeris(filename='de440s.bsp'):
-    """加载 JPL DE 星历数据。"""
-    return load(filename)
+# 默认星历文件，可通过 set_ephemeris_file 换成只含所需时间段的裁剪文件
+_ephemeris_file = 'de440s.bsp'
+_ephemerides = {}
+_lock = threading.Lock()
+
+def set_ephemeris_file(filename):
+    """设置默认星历文件 (不会立即打开)。"""
+    global _ephemeris_file
+    _ephemeris_file = filename
+
+def load_ephemeris(filename=None):
+    """按需加载 JPL DE 星历数据。
+
+    每个文件在进程内只打开一次。jplephem 打开时只读取段摘要，
+    各数据段在首次计算时以内存映射方式读取，不会把整个文件读入内存。
+    """
+    filename = filename or _ephemeris_file
+    with _lock:
+        eph = _ephemerides.get(filename)
+        if eph is None:
+            print(f"加载星历文件: {filename}")
+            eph = _ephemerides[filename] = load(filename)
+        return eph
 
 def get_celestial_object(eph, name):
     """从星历数据中获取天体对象。"""
-    return eph[name]
\ No newline at end of file
+    return eph[name]
+
+def get_body(name):
+    """从默认星历中获取天体对象，首次调用时才打开星历文件。"""
+    return get_celestial_object(load_ephemeris(), name)
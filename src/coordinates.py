@@ -1,7 +1,27 @@
-from astropy.coordinates import ICRS, GCRS
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+import erfa
+from astropy.coordinates import ICRS, GCRS, CartesianRepresentation, get_body_barycentric, get_body_barycentric_posvel
 from astropy.time import Time
 import astropy.units as u
 
+from .celestial_objects import get_body
+from .time_utils import to_astropy_time
+
+AU_KM = 149597870.7  # 1 au in km
+
+# 插值缓存的默认误差上限 (km)
+FRAME_CACHE_ERROR_KM = 1e-3
+
+# 地球质心位置四阶导数的上界 (km/天^4)，用于确定节点间距。周年运动与月球引起的摆动
+# 各约 13，月球轨道偏心与近日点附近叠加后实测最大约 36，这里留有余量
+_EARTH_FOURTH_DERIVATIVE_KM = 40.0
+
+# Skyfield 中地心位置的中心天体编号
+_EARTH_CENTER = 399
+
 def skyfield_to_icrs(skyfield_position):
     """将 Skyfield 的位置转换为 astropy 的 ICRS 坐标。"""
     return ICRS(
@@ -13,14 +33,216 @@ def skyfield_to_icrs(skyfield_position):
 
 def icrs_to_gcrs(icrs_coord, obstime):
     """将 ICRS 坐标转换为 GCRS 坐标。"""
-    return icrs_coord.transform_to(GCRS(obstime=Time(obstime))).cartesian
+    return icrs_coord.transform_to(GCRS(obstime=astropy_time(obstime))).cartesian
 
 def convert_au_to_km(icrs_coord):
     """将 ICRS 坐标中的 AU 单位转换为 km 单位。"""
-    au_to_km = 149597870.7  # 1 au in km
     return ICRS(
-        x=icrs_coord.x.value * au_to_km * u.km,
-        y=icrs_coord.y.value * au_to_km * u.km,
-        z=icrs_coord.z.value * au_to_km * u.km,
+        x=icrs_coord.x.value * AU_KM * u.km,
+        y=icrs_coord.y.value * AU_KM * u.km,
+        z=icrs_coord.z.value * AU_KM * u.km,
         representation_type='cartesian'
-    )
\ No newline at end of file
+    )
+
+@lru_cache(maxsize=256)
+def _parse_time(text):
+    """解析时间字符串，同一时刻只解析一次。"""
+    return Time(text)
+
+def astropy_time(obstime):
+    """将时间转换为 astropy 的 Time 对象。
+
+    Args:
+        obstime: ISO 时间字符串、Skyfield Time 或 astropy Time (可以是数组)
+
+    Returns:
+        Time: astropy 时间对象
+    """
+    if isinstance(obstime, Time):
+        return obstime
+    if isinstance(obstime, str):
+        return _parse_time(obstime)
+    # Skyfield Time：直接使用 TT 儒略日的两部分，不经过字符串
+    return to_astropy_time(obstime)
+
+def icrs_to_gcrs_km(positions_km, obstime, interpolate=False):
+    """将一批 ICRS (太阳系质心) 坐标一次性转换为 GCRS 坐标。
+
+    Args:
+        positions_km: (..., 3) 的 ICRS 坐标 (km)，例如 (3,)、(N, 3) 或 (N, M, 3)
+        obstime: 观测时刻，单个时刻或与坐标末尾几个维度对应的时刻数组 (例如 (N, 3) 对应 N 个时刻，
+                 (N, M, 3) 对应 M 个时刻)
+        interpolate (bool): 是否使用进程级的插值缓存 (适合密集的时间序列)
+
+    Returns:
+        numpy.ndarray: 与输入形状相同的 GCRS 坐标 (km)
+    """
+    if interpolate:
+        return get_frame_cache().icrs_to_gcrs_km(positions_km, obstime)
+    positions = np.asarray(positions_km, dtype=np.float64)
+    xyz = np.moveaxis(np.atleast_2d(positions), -1, 0) * u.km
+    icrs = ICRS(CartesianRepresentation(xyz))
+    gcrs = icrs.transform_to(GCRS(obstime=astropy_time(obstime)))
+    return np.moveaxis(gcrs.cartesian.xyz.to_value(u.km), 0, -1).reshape(positions.shape)
+
+def geocentric_to_gcrs_km(positions_km, earth_km, obstime, interpolate=False):
+    """将几何地心坐标 (如 SGP4 传播结果) 转换为与质心天体一致的 GCRS 坐标。
+
+    几何地心坐标的方向已经是 GCRS 的方向，但不含周年光行差 (地球同步轨道处约 4 km)。
+    这里加上地球的质心坐标后经过与太阳、月球相同的 ICRS→GCRS 变换，
+    结果与 earth + satellite 逐个经 astropy 变换一致。
+
+    Args:
+        positions_km: (..., 3) 的几何地心坐标 (km)
+        earth_km: 地球的 ICRS 质心坐标 (km)，(3,) 或与时刻数组对应的 (M, 3)
+        obstime: 观测时刻，约定同 icrs_to_gcrs_km
+        interpolate (bool): 是否使用进程级的插值缓存 (适合轨道轨迹等密集的时间序列)
+
+    Returns:
+        numpy.ndarray: 与输入形状相同的 GCRS 坐标 (km)
+    """
+    positions = np.asarray(positions_km, dtype=np.float64)
+    return icrs_to_gcrs_km(positions + np.asarray(earth_km, dtype=np.float64), obstime, interpolate)
+
+def skyfield_to_gcrs_km(positions, obstime, earth_km=None):
+    """将一批同一时刻的 Skyfield 位置转换为 GCRS 坐标。
+
+    以太阳系质心为中心的位置 (如 earth.at(t)、sun.at(t)) 与以地心为中心的位置
+    (如卫星、wgs84 地面点的 .at(t)，先加上地球质心坐标) 合并为一次 astropy 变换，
+    结果与逐个经 astropy ICRS→GCRS 变换一致。
+
+    Args:
+        positions (list): Skyfield Position 对象列表 (单个时刻)
+        obstime: 观测时刻 (Skyfield Time、astropy Time 或 ISO 字符串)
+        earth_km (array-like, optional): 地心位置所需的地球 ICRS 质心坐标 (km)，
+                                         默认由星历中的地球在该时刻的位置计算
+
+    Returns:
+        numpy.ndarray: (N, 3) 的 GCRS 坐标 (km)
+    """
+    barycentric = np.empty((len(positions), 3))
+    if not len(positions):
+        return barycentric
+    for i, position in enumerate(positions):
+        barycentric[i] = position.position.km
+        if position.center == _EARTH_CENTER:
+            if earth_km is None:
+                earth_km = get_body('earth').at(position.t).position.km
+            barycentric[i] += earth_km
+    return icrs_to_gcrs_km(barycentric, obstime)
+
+class FrameTransformCache:
+    """ICRS→GCRS 变换的分时节点缓存
+
+    astropy 每次变换都会重新计算地球的质心位置与速度。这里只在粗间隔的
+    时间节点上计算一次 (有界 LRU 缓存)，节点之间对地球位置做三次 Hermite
+    插值 (以速度为导数)，对速度与太阳位置做线性插值，再按与 astropy 相同的
+    步骤 (平移、太阳引力偏折、光行差) 逐点处理。节点间距由误差上限推出，
+    插值误差直接体现为近地目标的位置误差。方向接近太阳中心时引力偏折项会
+    放大误差，太阳本身的位置约有几 km (几毫角秒) 的差异。
+    """
+
+    def __init__(self, error_bound_km=FRAME_CACHE_ERROR_KM, max_nodes=4096):
+        """初始化变换缓存
+
+        Args:
+            error_bound_km (float): 插值引入的最大位置误差 (km)
+            max_nodes (int): 最多缓存的节点数量
+        """
+        self.error_bound_km = error_bound_km
+        self.max_nodes = max_nodes
+        # 三次 Hermite 插值误差不超过 h^4 / 384 乘以四阶导数上界，据此反推节点间距 (天)
+        step = (384.0 * error_bound_km / _EARTH_FOURTH_DERIVATIVE_KM) ** 0.25
+        self.node_step_days = float(np.clip(step, 1.0 / 1440, 1.0))
+        self._nodes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_nodes(self, indices):
+        """返回各节点的 (地球质心位置, 地球质心速度, 太阳质心位置)，单位 au 与 au/天"""
+        with self._lock:
+            missing = [index for index in indices if index not in self._nodes]
+            if missing:
+                # 缺失的节点合并为一次星历计算
+                times = Time(erfa.DJ00, np.array(missing) * self.node_step_days, format='jd', scale='tdb')
+                earth_pos, earth_vel = get_body_barycentric_posvel('earth', times)
+                sun_pos = get_body_barycentric('sun', times)
+                earth_pos = earth_pos.xyz.to_value(u.au).T
+                earth_vel = earth_vel.xyz.to_value(u.au / u.day).T
+                sun_pos = sun_pos.xyz.to_value(u.au).T
+                for i, index in enumerate(missing):
+                    self._nodes[index] = (earth_pos[i], earth_vel[i], sun_pos[i])
+
+            nodes = []
+            for index in indices:
+                self._nodes.move_to_end(index)
+                nodes.append(self._nodes[index])
+            while len(self._nodes) > self.max_nodes:
+                self._nodes.popitem(last=False)
+        return [np.array(column) for column in zip(*nodes)]
+
+    def _earth_state(self, obstime):
+        """插值得到各时刻的地球质心位置、速度与太阳质心位置，形状为 时刻形状 + (3,)"""
+        time = astropy_time(obstime).tdb
+        offset = np.ravel((time.jd1 - erfa.DJ00) + time.jd2) / self.node_step_days
+        index = np.floor(offset).astype(np.int64)
+        s = (offset - index)[:, np.newaxis]
+
+        # 所有样本用到的节点一次取齐
+        unique, inverse = np.unique(np.concatenate([index, index + 1]), return_inverse=True)
+        earth_pos, earth_vel, sun_pos = self._get_nodes(unique.tolist())
+        i0, i1 = inverse[:len(index)], inverse[len(index):]
+
+        h = self.node_step_days
+        h00 = 2 * s**3 - 3 * s**2 + 1
+        h10 = s**3 - 2 * s**2 + s
+        h01 = -2 * s**3 + 3 * s**2
+        h11 = s**3 - s**2
+        position = h00 * earth_pos[i0] + h10 * h * earth_vel[i0] + h01 * earth_pos[i1] + h11 * h * earth_vel[i1]
+        velocity = (1 - s) * earth_vel[i0] + s * earth_vel[i1]
+        sun = (1 - s) * sun_pos[i0] + s * sun_pos[i1]
+        shape = time.shape + (3,)
+        return position.reshape(shape), velocity.reshape(shape), sun.reshape(shape)
+
+    def icrs_to_gcrs_km(self, positions_km, obstime):
+        """将 ICRS (太阳系质心) 坐标转换为 GCRS 坐标
+
+        Args:
+            positions_km: (..., 3) 的 ICRS 坐标 (km)
+            obstime: 观测时刻，约定同模块级的 icrs_to_gcrs_km
+
+        Returns:
+            numpy.ndarray: 与输入形状相同的 GCRS 坐标 (km)
+        """
+        positions = np.asarray(positions_km, dtype=np.float64)
+        earth_pos, earth_vel, sun_pos = self._earth_state(obstime)
+
+        # 与 astropy 相同：先平移到地心，再对方向做太阳引力偏折与光行差，距离保持不变
+        distance, direction = erfa.pn(positions / AU_KM - earth_pos)
+        heliocentric = earth_pos - sun_pos
+        sun_distance, sun_direction = erfa.pn(heliocentric)
+        source_distance, source = erfa.pn(heliocentric + distance[..., np.newaxis] * direction)
+        # 目标接近太阳中心时方向不稳定，与 astropy 一样退回到远距离近似
+        source = np.where(source_distance[..., np.newaxis] > 1e-10, source, direction)
+        natural = erfa.ld(1.0, direction, source, sun_direction, sun_distance, 1e-6)
+
+        velocity = earth_vel * (erfa.AULT / erfa.DAYSEC)
+        bm1 = np.sqrt(1 - np.sum(velocity**2, axis=-1))
+        proper = erfa.ab(natural, velocity, sun_distance, bm1)
+        return proper * (distance * AU_KM)[..., np.newaxis]
+
+# 进程级共享的变换缓存
+_frame_cache = FrameTransformCache()
+
+def get_frame_cache():
+    """获取进程级共享的 ICRS→GCRS 变换缓存。"""
+    return _frame_cache
+
+def configure_frame_cache(error_bound_km=FRAME_CACHE_ERROR_KM, max_nodes=4096):
+    """以新的误差上限重建进程级变换缓存
+
+    Args:
+        error_bound_km (float): 插值引入的最大位置误差 (km)
+        max_nodes (int): 最多缓存的节点数量
+    """
+    global _frame_cache
+    _frame_cache = FrameTransformCache(error_bound_km, max_nodes)
@@ -0,0 +1,80 @@
+"""
+星历裁剪工具
+从完整的 JPL DE 星历中只截取太阳、地球、月球在指定日期范围内的数据段，
+生成可随渲染节点分发、加载更快的小星历文件。
+
+用法: python -m src.ephemeris_excerpt de440s.bsp 2025-01-01 2025-12-31 -o de440s_2025.bsp
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import date
+
+from jplephem.daf import DAF
+from jplephem.excerpter import write_excerpt
+from jplephem.spk import SPK
+
+# 太阳、地月质心、地球、月球的 SPK 目标编号
+# (Skyfield 由 太阳系质心→地月质心→地球/月球 的链路求得地球与月球的位置)
+SUN_EARTH_MOON_TARGETS = (10, 3, 399, 301)
+
+def _date_to_jd(value):
+    """将日期转换为当日0时的儒略日"""
+    # date.toordinal() 以公元1年1月1日为1，加上 1721424.5 即得该日0时的儒略日
+    return value.toordinal() + 1721424.5
+
+def excerpt_ephemeris(source, output, start, end, targets=SUN_EARTH_MOON_TARGETS):
+    """截取星历文件中指定天体与日期范围的数据段
+
+    Args:
+        source (str): 原始星历文件路径
+        output (str): 输出文件路径
+        start (date): 起始日期
+        end (date): 结束日期 (包含当天)
+        targets (tuple): 需要保留的 SPK 目标编号
+
+    Returns:
+        str: 输出文件路径
+    """
+    if end < start:
+        raise ValueError("结束日期不能早于起始日期")
+
+    output_dir = os.path.dirname(os.path.abspath(output))
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix='.' + os.path.basename(output) + '.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'w+b') as output_file, open(source, 'rb') as f:
+            spk = SPK(DAF(f))
+            summaries = [summary for summary, segment in zip(spk.daf.summaries(), spk.segments)
+                         if segment.target in targets]
+            found = {segment.target for segment in spk.segments if segment.target in targets}
+            if found != set(targets):
+                raise ValueError(f"星历文件 {source} 缺少目标: {sorted(set(targets) - found)}")
+
+            write_excerpt(spk, output_file, _date_to_jd(start), _date_to_jd(end) + 1.0, summaries)
+        # 写完后再原子替换，避免渲染节点读到不完整的文件
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, output)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    print(f"已生成星历裁剪文件: {output} ({start} ~ {end}, {os.path.getsize(output) / 1024:.0f} KB)")
+    return output
+
+def main():
+    parser = argparse.ArgumentParser(description="截取太阳、地球、月球在指定日期范围内的星历数据")
+    parser.add_argument('source', help="原始星历文件，例如 de440s.bsp")
+    parser.add_argument('start', type=date.fromisoformat, help="起始日期 (YYYY-MM-DD)")
+    parser.add_argument('end', type=date.fromisoformat, help="结束日期 (YYYY-MM-DD)")
+    parser.add_argument('-o', '--output', help="输出文件，默认为 <原文件名>_<起始>_<结束>.bsp")
+    args = parser.parse_args()
+
+    output = args.output
+    if not output:
+        stem = os.path.splitext(args.source)[0]
+        output = f"{stem}_{args.start:%Y%m%d}_{args.end:%Y%m%d}.bsp"
+    excerpt_ephemeris(args.source, output, args.start, args.end)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import os
+import time
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+class FileLock:
+    """基于锁文件的跨进程互斥锁
+
+    POSIX 上使用 fcntl.flock，Windows 上使用 msvcrt.locking。
+    进程退出时操作系统会自动释放锁，不会留下死锁。
+    """
+
+    def __init__(self, path):
+        """初始化文件锁
+
+        Args:
+            path (str): 锁文件路径
+        """
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking=True, timeout=None):
+        """获取锁
+
+        Args:
+            blocking (bool): 锁被占用时是否等待
+            timeout (float, optional): 最长等待时间 (秒)，None 表示一直等待
+
+        Returns:
+            bool: 是否成功获取锁
+        """
+        if self._file is not None:
+            return True
+        f = open(self.path, 'a+b')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._try_lock(f):
+                self._file = f
+                return True
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                f.close()
+                return False
+            time.sleep(0.05)
+
+    def release(self):
+        """释放锁"""
+        if self._file is None:
+            return
+        try:
+            if os.name == 'nt':
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def _try_lock(f):
+        """以非阻塞方式尝试加锁"""
+        try:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
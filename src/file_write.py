@@ -1,3 +1,11 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+# PBRTWriter 的默认写缓冲区大小 (字节)
+BUFFER_SIZE = 1024 * 1024
+
 def overwrite_file(filepath, content):
     """覆盖写入文件。"""
     with open(filepath, 'w', encoding='utf-8') as f:  # 使用 'w' 模式打开文件
@@ -17,4 +25,91 @@ def write_lines_to_file_loop_with_newline(filepath, string_list):
 def write_line_to_file_loop_with_newline(filepath, line):
     """使用循环和 write() 将字符串列表写入文件。"""
     with open(filepath, 'a', encoding='utf-8') as f:
-        f.write(line + '\n')  # 在每行末尾添加换行符
\ No newline at end of file
+        f.write(line + '\n')  # 在每行末尾添加换行符
+
+class PBRTWriter:
+    """缓冲写入 PBRT 文件的上下文管理器
+
+    所有内容先经一个带缓冲的句柄写入同目录的临时文件，正常退出时再原子替换目标文件，
+    读取方不会看到写了一半的文件；出现异常时丢弃临时文件，原文件保持不变。
+
+    用法:
+        with PBRTWriter('popo.pbrt') as w:
+            w.write_lines(['WorldBegin', ...])
+    """
+
+    def __init__(self, path, append=False, compress=False, buffer_size=BUFFER_SIZE):
+        """初始化写入器
+
+        Args:
+            path (str): 目标文件路径；compress 为 True 且路径不以 .gz 结尾时自动加上 .gz
+            append (bool): 是否保留目标文件原有内容并在其后追加
+            compress (bool): 是否输出 gzip 压缩的文件 (pbrt-v4 可直接读取 .pbrt.gz)
+            buffer_size (int): 写缓冲区大小 (字节)
+        """
+        if compress and not path.endswith('.gz'):
+            path += '.gz'
+        self.path = path
+        self.append = append
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self._file = None
+        self._temp_path = None
+
+    def __enter__(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, self._temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(self.path) + '.',
+                                               suffix='.part')
+        self._file = os.fdopen(fd, 'w+b', buffering=self.buffer_size)
+        if self.append and os.path.exists(self.path):
+            opener = gzip.open if self.compress else open
+            with opener(self.path, 'rb') as f:
+                shutil.copyfileobj(f, self._file, self.buffer_size)
+        return self
+
+    def write(self, data):
+        """写入文本 (按 UTF-8 编码) 或字节"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._file.write(data)
+
+    def write_lines(self, lines):
+        """写入多行文本，每行末尾添加换行符"""
+        self.write(''.join(line + '\n' for line in lines))
+
+    def tell(self):
+        """当前写入位置 (未压缩内容中的字节偏移)"""
+        return self._file.tell()
+
+    def truncate(self, position):
+        """截掉 position 之后已写入的内容"""
+        self._file.truncate(position)
+        self._file.seek(position)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self._commit()
+        finally:
+            self._file.close()
+            if os.path.exists(self._temp_path):
+                os.remove(self._temp_path)
+        return False
+
+    def _commit(self):
+        """写完后原子替换目标文件；需要压缩时将临时文件流式压缩后再替换"""
+        self._file.flush()
+        source_path = self._temp_path
+        if self.compress:
+            # 先写未压缩的内容，才能在写入过程中截掉失败的部分；最后一次性压缩
+            self._file.seek(0)
+            fd, source_path = tempfile.mkstemp(dir=os.path.dirname(self._temp_path),
+                                               prefix='.' + os.path.basename(self.path) + '.', suffix='.gz.part')
+            try:
+                with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+                    shutil.copyfileobj(self._file, gz, self.buffer_size)
+            except BaseException:
+                os.remove(source_path)
+                raise
+        os.chmod(source_path, 0o644)
+        os.replace(source_path, self.path)
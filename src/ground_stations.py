@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import yaml
+from skyfield.api import wgs84
+
+from .coordinates import icrs_to_gcrs_km
+
+# 地面站配置文件
+STATIONS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'stations.yaml')
+
+DEFAULT_STATIONS = {
+    "英国-格林威治天文台": {"lat": 51.4769, "lon": 0.0, "alt": 45.0},
+    "中国-西电科大西大楼": {"lat": 34.2308, "lon": 108.9167, "alt": 414.0},
+    "阿根廷-布宜诺斯艾利斯": {"lat": -34.6500, "lon": -58.3333, "alt": 2.0},
+    "北极-中国黄河站": {"lat": 78.9167, "lon": 11.9333, "alt": 24.0}
+}
+
+_stations_cache = {}
+_positions_cache = OrderedDict()
+_lock = threading.Lock()
+
+# 最多缓存的 (地面站集合, 时刻) 组合数量
+MAX_CACHED_EPOCHS = 32
+
+def load_ground_stations(stations_file=STATIONS_FILE):
+    """从YAML文件加载地面站数据
+
+    同一文件在进程内只读取一次，文件修改后才重新读取。
+
+    Args:
+        stations_file (str): 地面站配置文件路径
+
+    Returns:
+        dict: {站名: {"lat": 纬度, "lon": 经度, "alt": 海拔(米)}}
+    """
+    # 如果文件不存在，创建默认站点并保存
+    if not os.path.exists(stations_file):
+        try:
+            with open(stations_file, 'w', encoding='utf-8') as f:
+                yaml.dump(DEFAULT_STATIONS, f, allow_unicode=True, sort_keys=False)
+            print(f"已创建默认地面站文件: {stations_file}")
+        except Exception as e:
+            print(f"创建默认地面站文件失败: {str(e)}")
+            # 如果保存失败，仍然返回默认站点
+            return dict(DEFAULT_STATIONS)
+
+    try:
+        mtime = os.path.getmtime(stations_file)
+        with _lock:
+            cached = _stations_cache.get(stations_file)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        with open(stations_file, 'r', encoding='utf-8') as f:
+            stations = yaml.safe_load(f)
+        print(f"已从 {stations_file} 加载 {len(stations)} 个地面站")
+        with _lock:
+            _stations_cache[stations_file] = (mtime, stations)
+        return stations
+    except Exception as e:
+        print(f"读取地面站文件失败: {str(e)}")
+        # 如果读取失败，返回默认站点
+        return dict(DEFAULT_STATIONS)
+
+def stations_hash(stations):
+    """计算地面站集合的哈希值，用作位置缓存的键"""
+    canonical = json.dumps(
+        [[name, data["lat"], data["lon"], data.get("alt", 0.0)] for name, data in sorted(stations.items())],
+        ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+def geodetic_to_gcrs_km(earth, lats, lons, alts, t):
+    """将一组大地坐标一次性转换为 GCRS 坐标，并同时给出地心的 GCRS 坐标
+
+    与逐站执行 earth + Topos → ICRS → GCRS 的结果相同，但所有站点
+    (以及地心) 合并为一次 ICRS→GCRS 变换。
+
+    Args:
+        earth: 地球天体对象
+        lats: 纬度数组 (度)
+        lons: 经度数组 (度)
+        alts: 海拔数组 (米)
+        t: Skyfield 时间对象 (单个时刻)
+
+    Returns:
+        tuple: ((N, 3) 的站点 GCRS 坐标 (km), 地心 GCRS 坐标 (km))
+    """
+    earth_km = earth.at(t).position.km
+    stations = wgs84.latlon(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64),
+                            elevation_m=np.asarray(alts, dtype=np.float64))
+    geocentric = stations.at(t).position.km.reshape(3, -1).T
+
+    # 站点的质心坐标 = 地球质心坐标 + 站点地心坐标，最后一行为地心本身
+    barycentric = np.vstack([geocentric + earth_km, earth_km])
+    gcrs = icrs_to_gcrs_km(barycentric, t)
+    return gcrs[:-1], gcrs[-1]
+
+class StationPositions:
+    """某一时刻所有地面站的 GCRS 坐标"""
+
+    def __init__(self, names, positions, earth_center):
+        """初始化地面站位置表
+
+        Args:
+            names (list): 站名列表
+            positions (numpy.ndarray): (N, 3) 的 GCRS 坐标 (km)
+            earth_center (numpy.ndarray): 地心的 GCRS 坐标 (km)
+        """
+        self.names = names
+        self.positions = positions
+        self.earth_center = earth_center
+        self._index = {name: row for row, name in enumerate(names)}
+
+    def position(self, name):
+        """返回站点的 GCRS 坐标 [x, y, z] (km)"""
+        return self.positions[self._index[name]].tolist()
+
+def station_positions(stations, earth, t):
+    """获取所有地面站在指定时刻的 GCRS 坐标
+
+    结果按 (地面站集合哈希, 时刻) 缓存，同一时刻的多次选择与遮挡检查共享同一份结果。
+
+    Args:
+        stations (dict): {站名: {"lat", "lon", "alt"}}
+        earth: 地球天体对象
+        t: Skyfield 时间对象 (单个时刻)
+
+    Returns:
+        StationPositions: 地面站位置表
+    """
+    key = (stations_hash(stations), float(t.whole), float(t.tt_fraction))
+    with _lock:
+        cached = _positions_cache.get(key)
+        if cached is not None:
+            _positions_cache.move_to_end(key)
+            return cached
+
+    names = list(stations)
+    lats = [stations[name]["lat"] for name in names]
+    lons = [stations[name]["lon"] for name in names]
+    alts = [stations[name].get("alt", 0.0) for name in names]
+    positions, earth_center = geodetic_to_gcrs_km(earth, lats, lons, alts, t)
+    result = StationPositions(names, positions, earth_center)
+
+    with _lock:
+        _positions_cache[key] = result
+        while len(_positions_cache) > MAX_CACHED_EPOCHS:
+            _positions_cache.popitem(last=False)
+    return result
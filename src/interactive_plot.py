@@ -18,27 +18,32 @@ import time
 import math
 import csv
 import gc
-from astropy.coordinates import ICRS, GCRS, CartesianRepresentation
-from astropy.time import Time
-import astropy.units as u
+
+from src.coordinates import geocentric_to_gcrs_km, skyfield_to_gcrs_km
+from src.time_utils import utc_time
+from src.propagation import propagate_gcrs_km
+from src.satellite_registry import get_registry
 
 class SolarSystemVisualizer:
     def __init__(self, selected_satellites, time_utc, satellite_tle_data, ts, earth, 
-                 camera_info=None, target_info=None):
+                 camera_info=None, target_info=None, epoch_tles=None):
         """初始化可视化器
         
         Args:
             selected_satellites: 已选择的卫星列表，格式为 [(model_name, sat_name, model_uuid, sat_position)]
             time_utc (datetime): 可视化的UTC时间点
-            satellite_tle_data (dict): TLE数据字典，格式为 {卫星名: [tle1_line, tle2_line]}
+            satellite_tle_data (TLECatalog): TLE目录，satellite_tle_data[卫星名] 为 [tle1_line, tle2_line]
             ts: 时间尺度对象
             earth: 地球天体对象，用于计算轨道
             camera_info (dict, optional): 相机信息，包含类型和名称
             target_info (dict, optional): 目标点信息，包含类型和名称
+            epoch_tles (dict, optional): 为渲染时刻选定的TLE {卫星名: [tle1_line, tle2_line]}，
+                                         与场景使用同一份；未提供时使用目录中的TLE
         """
         self.selected_satellites = selected_satellites
         self.time_utc = time_utc
         self.satellite_tle_data = satellite_tle_data
+        self.epoch_tles = epoch_tles or {}
         self.ts = ts
         self.earth = earth
         
@@ -73,74 +78,47 @@ class SolarSystemVisualizer:
         
         print(f"正在准备可视化 {len(self.selected_satellites)} 个选定的卫星...")
     
-    def _calculate_orbital_period(self, satellite):
-        """计算卫星轨道周期
-        
-        Args:
-            satellite: Skyfield卫星对象
-            
-        Returns:
-            float: 轨道周期 (小时)
-        """
-        try:
-            # Skyfield的model.no_kozai是弧度/分钟
-            # 转换为圈/天: (弧度/分钟) * (分钟/天) / (2π弧度/圈)
-            rad_per_min = satellite.model.no_kozai
-            min_per_day = 24 * 60
-            rad_per_circle = 2 * math.pi
-            
-            # 计算平均运动（圈/天）
-            mean_motion = rad_per_min * min_per_day / rad_per_circle
-            
-            # 计算周期 (小时) = 24小时/（圈/天）
-            period_hours = 24.0 / mean_motion
-            
-            return period_hours
-        except Exception as e:
-            print(f"计算轨道周期时出错: {str(e)}")
-            return 1.5  # 默认值
-    
-    def _get_orbit_settings(self, satellite, sat_name):
+    def _get_orbit_settings(self, sat_name):
         """根据卫星轨道特性确定轨道绘制参数
         
+        轨道周期与轨道类型在加载目录时已批量计算，这里直接查表。
+        
         Args:
-            satellite: Skyfield卫星对象
             sat_name: 卫星名称
             
         Returns:
             tuple: (轨道点数量, 轨道时长(小时), 轨道名称后缀)
         """
-        try:
-            # 计算轨道周期(小时)
-            period_hours = self._calculate_orbital_period(satellite)
-            
-            # 根据轨道周期动态调整轨道显示参数
-            if period_hours <= 3:  # 近地轨道 (LEO)
-                orbit_hours = min(period_hours * 0.9, 3)  # 最多轨道周期的90%，但不超过3小时
-                orbit_points = 30
-                orbit_type = "LEO"
-            elif period_hours <= 12:  # 中轨道 (MEO)
-                orbit_hours = min(period_hours * 0.9, 12)  # 轨道周期的90%，但不超过12小时
-                orbit_points = 60
-                orbit_type = "MEO"
-            else:  # 高轨道或地球同步轨道 (GEO/HEO)
-                orbit_hours = min(period_hours * 0.9, 24)  # 轨道周期的90%，但不超过24小时
-                orbit_points = 80
-                orbit_type = "GEO/HEO"
-            
-            # 确保时间和点数合理
-            orbit_hours = max(1.0, orbit_hours)  # 至少1小时
-            orbit_points = max(20, orbit_points)  # 至少20个点
-            
-            period_str = f"{period_hours:.1f}h"
-            orbit_str = f"{orbit_hours:.1f}h"
-            
-            print(f"卫星 {sat_name}: 轨道周期={period_str}, 轨道类型={orbit_type}, 显示时长={orbit_str}, 点数={orbit_points}")
-            
-            return orbit_points, orbit_hours, f"轨道周期: {period_str}"
-        except Exception as e:
-            print(f"确定轨道参数时出错: {str(e)}")
+        orbit_info = self.satellite_tle_data.orbit_info(sat_name)
+        if orbit_info is None or not np.isfinite(orbit_info["period_min"]):
             return self.default_orbit_points, self.default_orbit_hours, ""
+        
+        period_hours = orbit_info["period_min"] / 60.0
+        orbit_type = orbit_info["regime"]
+        
+        # 根据轨道类型动态调整轨道显示参数
+        if orbit_type == "LEO":
+            orbit_hours = min(period_hours * 0.9, 3)  # 最多轨道周期的90%，但不超过3小时
+            orbit_points = 30
+        elif orbit_type == "MEO":
+            orbit_hours = min(period_hours * 0.9, 12)  # 轨道周期的90%，但不超过12小时
+            orbit_points = 60
+        else:  # 高轨道或地球同步轨道 (GEO/HEO)
+            orbit_hours = min(period_hours * 0.9, 24)  # 轨道周期的90%，但不超过24小时
+            orbit_points = 80
+        
+        # 确保时间和点数合理
+        orbit_hours = max(1.0, orbit_hours)  # 至少1小时
+        orbit_points = max(20, orbit_points)  # 至少20个点
+        
+        period_str = f"{period_hours:.1f}h"
+        orbit_str = f"{orbit_hours:.1f}h"
+        
+        print(f"卫星 {sat_name}: 轨道周期={period_str}, 轨道类型={orbit_type}, "
+              f"远地点={orbit_info['apogee_km']:.0f}km, 近地点={orbit_info['perigee_km']:.0f}km, "
+              f"显示时长={orbit_str}, 点数={orbit_points}")
+        
+        return orbit_points, orbit_hours, f"轨道周期: {period_str}"
     
     def _calculate_past_orbit(self, tle_lines, satellite_name, earth):
         """计算卫星过去轨迹点
@@ -154,11 +132,11 @@ class SolarSystemVisualizer:
             tuple: 轨道点列表和轨道信息 (positions, orbit_info)
         """
         try:
-            # 创建卫星对象
-            satellite = EarthSatellite(tle_lines[0], tle_lines[1], satellite_name, self.ts)
+            # 从注册表获取卫星对象，复用已初始化的 SGP4 记录
+            satellite = get_registry().get_satellite(tle_lines, satellite_name, self.ts)
             
             # 根据轨道特性确定轨道绘制参数
-            orbit_points, orbit_hours, orbit_info = self._get_orbit_settings(satellite, satellite_name)
+            orbit_points, orbit_hours, orbit_info = self._get_orbit_settings(satellite_name)
             
             # 计算过去轨道点的时间间隔
             time_step = orbit_hours * 3600 / orbit_points  # 秒
@@ -172,94 +150,17 @@ class SolarSystemVisualizer:
             #csv_filename = os.path.join(debug_dir, f'{satellite_name}_orbit_debug.csv')
             
             # 计算过去的轨道点
-            positions = []
-            debug_rows = []
-            
-            # 首先计算确切的当前时刻位置（最后一个点）
-            current_t = self.ts.utc(self.time_utc.year, self.time_utc.month, self.time_utc.day,
-                                   self.time_utc.hour, self.time_utc.minute, self.time_utc.second)
-            current_position = (earth + satellite).at(current_t)
-            pos_au = current_position.position.au
-            
-            # 转换为ICRS坐标 - 使用CartesianRepresentation
-            cart = CartesianRepresentation(pos_au[0] * u.au, pos_au[1] * u.au, pos_au[2] * u.au)
-            
-            # 转换为公里单位
-            au_to_km = 149597870.7
-            cart_km = CartesianRepresentation(
-                cart.x * au_to_km * u.km / u.au,
-                cart.y * au_to_km * u.km / u.au,
-                cart.z * au_to_km * u.km / u.au
-            )
-            sat_icrs_km = ICRS(cart_km)
-            
-            # 转换为GCRS坐标
-            utc_iso = current_t.utc_iso()
-            time_obj = Time(utc_iso, format='isot', scale='utc')
-            sat_gcrs_km = sat_icrs_km.transform_to(GCRS(obstime=time_obj))
-            
-            # 确切的当前位置
-            current_x = float(sat_gcrs_km.cartesian.x.value)
-            current_y = float(sat_gcrs_km.cartesian.y.value)
-            current_z = float(sat_gcrs_km.cartesian.z.value)
-            
-            # 计算历史轨道点
-            for i in range(orbit_points):  # 不包括当前位置，单独计算
-                # 计算时间点 (从过去到当前时间)
-                time_offset = -(orbit_points - i) * time_step  # 负值表示过去的时间
-                past_time = self.time_utc + timedelta(seconds=time_offset)
-                
-                # 转换为skyfield时间
-                t = self.ts.utc(past_time.year, past_time.month, past_time.day,
-                               past_time.hour, past_time.minute, past_time.second)
-                
-                # 计算卫星位置 - 使用与main.py相同的方法
-                satellite_position = (earth + satellite).at(t)
-                
-                # 正确获取position的值，要指定单位
-                pos_au = satellite_position.position.au
-                
-                # 转换为ICRS坐标 - 使用CartesianRepresentation
-                cart = CartesianRepresentation(pos_au[0] * u.au, pos_au[1] * u.au, pos_au[2] * u.au)
-                
-                # 转换为公里单位
-                au_to_km = 149597870.7
-                cart_km = CartesianRepresentation(
-                    cart.x * au_to_km * u.km / u.au,
-                    cart.y * au_to_km * u.km / u.au,
-                    cart.z * au_to_km * u.km / u.au
-                )
-                sat_icrs_km = ICRS(cart_km)
-                
-                # 转换为GCRS坐标
-                utc_iso = t.utc_iso()
-                time_obj = Time(utc_iso, format='isot', scale='utc')
-                sat_gcrs_km = sat_icrs_km.transform_to(GCRS(obstime=time_obj))
-                
-                # 坐标值
-                x = float(sat_gcrs_km.cartesian.x.value)
-                y = float(sat_gcrs_km.cartesian.y.value)
-                z = float(sat_gcrs_km.cartesian.z.value)
-                
-                # 添加到位置列表
-                positions.append((x, y, z))
-                
-                ## 准备调试行
-                #debug_rows.append({
-                #    'timestamp': past_time.strftime('%Y-%m-%d %H:%M:%S'),
-                #    'x_km': x,
-                #    'y_km': y,
-                #    'z_km': z
-                #})
-            
-            # 添加当前时刻的确切位置（最后一个点）
-            positions.append((current_x, current_y, current_z))
-            #debug_rows.append({
-            #    'timestamp': self.time_utc.strftime('%Y-%m-%d %H:%M:%S'),
-            #    'x_km': current_x,
-            #    'y_km': current_y,
-            #    'z_km': current_z
-            #})
+            # 过去 orbit_points 个时刻加上当前时刻，一次批量传播完成
+            offsets = -(orbit_points - np.arange(orbit_points + 1)) * time_step  # 负值表示过去的时间
+            t = utc_time(self.ts, self.time_utc, offsets)
+            # 与地球位置经同一 ICRS→GCRS 变换，轨迹与地球处于同一参考系；
+            # 轨迹上的密集时刻使用插值缓存，误差不超过配置的上限
+            track = geocentric_to_gcrs_km(propagate_gcrs_km([satellite.model], t)[0],
+                                          self.earth.at(t).position.km.T, t, interpolate=True)
+            
+            # 添加到位置列表，最后一个点为当前时刻的确切位置
+            positions = [(float(x), float(y), float(z)) for x, y, z in track]
+            current_x, current_y, current_z = positions[-1]
             
             # 打印最后一行数据
             print(f"[DEBUG] 卫星 {satellite_name} 当前位置: [{current_x:.1f}, {current_y:.1f}, {current_z:.1f}]")
@@ -299,39 +200,10 @@ class SolarSystemVisualizer:
             
             print("计算地球位置...")
             # 计算地球在选定UTC时间的位置
-            t = self.ts.utc(self.time_utc.year, self.time_utc.month, self.time_utc.day,
-                            self.time_utc.hour, self.time_utc.minute, self.time_utc.second)
+            t = utc_time(self.ts, self.time_utc)
             
-            # 使用与main.py相同的坐标转换方法
-            earth_position = self.earth.at(t)
-            # 正确获取position的值，要指定单位
-            pos_au = earth_position.position.au
-            
-            # 确保导入astropy.units
-            from astropy.coordinates import CartesianRepresentation
-            import astropy.units as u
-            
-            # 转换为ICRS坐标 - 使用CartesianRepresentation
-            cart = CartesianRepresentation(pos_au[0] * u.au, pos_au[1] * u.au, pos_au[2] * u.au)
-            
-            # 转换为公里单位
-            au_to_km = 149597870.7
-            cart_km = CartesianRepresentation(
-                cart.x * au_to_km * u.km / u.au,
-                cart.y * au_to_km * u.km / u.au,
-                cart.z * au_to_km * u.km / u.au
-            )
-            earth_icrs_km = ICRS(cart_km)
-            
-            # 转换为GCRS坐标
-            utc_iso = t.utc_iso()
-            time_obj = Time(utc_iso, format='isot', scale='utc')
-            earth_gcrs_km = earth_icrs_km.transform_to(GCRS(obstime=time_obj))
-            
-            # 获取地球在GCRS坐标系中的位置（单位：km）
-            earth_x = float(earth_gcrs_km.cartesian.x.value)
-            earth_y = float(earth_gcrs_km.cartesian.y.value)
-            earth_z = float(earth_gcrs_km.cartesian.z.value)
+            # 使用与main.py相同的坐标转换引擎
+            earth_x, earth_y, earth_z = skyfield_to_gcrs_km([self.earth.at(t)], t)[0].tolist()
             
             print(f"地球位置: X={earth_x:.6f} km, Y={earth_y:.6f} km, Z={earth_z:.6f} km")
 
@@ -373,9 +245,10 @@ class SolarSystemVisualizer:
                         display_name = f"[被观察点] {sat_name}"
                     
                     # 先计算过去的轨道点
-                    if sat_name in self.satellite_tle_data:
+                    tle_lines = self.epoch_tles.get(sat_name) or self.satellite_tle_data.get(sat_name)
+                    if tle_lines:
                         past_positions, orbit_info = self._calculate_past_orbit(
-                            self.satellite_tle_data[sat_name], 
+                            tle_lines, 
                             sat_name,
                             self.earth  # 传递地球对象
                         )
@@ -581,10 +454,10 @@ def visualize_in_new_thread(selection_result, time_utc, satellite_positions, tle
     """在新线程中运行可视化，并允许主线程继续执行但在最后等待可视化完成
     
     Args:
-        selection_result: 用户选择的结果，包含模型-卫星配对
+        selection_result: 用户选择的结果，包含模型-卫星配对与为渲染时刻选定的TLE (tles)
         time_utc: 选择的时间
         satellite_positions: 卫星位置字典 {sat_name: [x, y, z]}
-        tle_data: 卫星TLE数据字典
+        tle_data: 卫星TLE目录 (TLECatalog)
         ts: 时间尺度对象
         earth: 地球天体对象，用于计算轨道
         wait_time (int): 主线程等待可视化的最大时间（秒）
@@ -650,7 +523,8 @@ def visualize_in_new_thread(selection_result, time_utc, satellite_positions, tle
                 ts,
                 earth,  # 传递地球对象
                 camera_info=camera_info,
-                target_info=target_info
+                target_info=target_info,
+                epoch_tles=selection_result.get('tles')
             )
             
             # 生成并保存可视化
@@ -672,27 +546,3 @@ def visualize_in_new_thread(selection_result, time_utc, satellite_positions, tle
     
     print("可视化已在新线程中启动")
     return visualization_done  # 返回事件对象，主线程可以等待它
-
-# 添加用于坐标转换的函数
-def skyfield_to_icrs(position):
-    """将skyfield位置转换为ICRS坐标"""
-    # 使用正确的方式创建ICRS坐标
-    cart = CartesianRepresentation(position[0] * u.au, position[1] * u.au, position[2] * u.au)
-    return ICRS(cart)
-
-def convert_au_to_km(icrs):
-    """将AU单位的ICRS坐标转换为km单位"""
-    au_to_km = 149597870.7  # 1 AU = 149597870.7 km
-    # 使用正确的方式创建ICRS坐标
-    cart = icrs.cartesian
-    cart_km = CartesianRepresentation(
-        cart.x * au_to_km * u.km / u.au,
-        cart.y * au_to_km * u.km / u.au,
-        cart.z * au_to_km * u.km / u.au
-    )
-    return ICRS(cart_km)
-
-def icrs_to_gcrs(icrs_km, time_str):
-    """将ICRS坐标转换为GCRS坐标"""
-    time = Time(time_str, format='isot', scale='utc')
-    return icrs_km.transform_to(GCRS(obstime=time)) 
\ No newline at end of file
@@ -12,16 +12,29 @@ from datetime import datetime as dt
 import json
 from tkinter import messagebox
 import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageTk
 from settings import settings
 
-from .celestial_objects import load_ephemeris, get_celestial_object
-from .coordinates import skyfield_to_icrs, icrs_to_gcrs, convert_au_to_km
-from .time_utils import get_timescale, get_utc_time
-from .tle_data import get_tle_data, load_tle_data, get_satellite
+from .celestial_objects import set_ephemeris_file, get_body
+from .coordinates import configure_frame_cache, geocentric_to_gcrs_km, skyfield_to_gcrs_km
+from .time_utils import get_timescale, get_utc_time, utc_time
+from .time_data import report_time_data_staleness
+from .model_api import ModelAPIClient
+from .model_cache import configure_model_cache, get_model_cache, model_version
+from .scene_assembly import (SCENE_LAYOUTS, MODELS_SUBDIR, write_scene_models, remove_unused_model_files,
+                             package_scene)
+from .ply_meshes import MESHES_SUBDIR, PLY_MIN_VERTICES, convert_model_meshes, install_mesh_files
+from .tle_data import get_tle_data, get_tle_catalog, tle_sources_from_settings, load_tle_data, get_satellite, tles_for_epoch, datetime_to_jd
+from .propagation import propagate_gcrs_km
+from .tle_search import TLESearchIndex
+from .satellite_registry import get_registry
 from .file_write import *
 from .rendering_settings import *
 from .world_settings import *
+from .scene_graph import (Scene, LookAt, Camera, Sampler, Integrator, Film, PixelFilter, ColorSpace,
+                          BackgroundLight, Sun, Earth, Moon, ModelPlacement)
 from src.interactive_plot import visualize_in_new_thread
 from src.camera_viewpoint import select_camera_viewpoint
 from src.rendering_settings_view import get_rendering_settings
@@ -31,14 +44,20 @@ import subprocess
 import gc
 import time
 
-# 1. 加载 JPL DE 星历数据
-eph = load_ephemeris() # from Year 1849 to Year 2150
-earth = get_celestial_object(eph, 'earth')
-sun = get_celestial_object(eph, 'sun')
-moon = get_celestial_object(eph, 'moon')
+# 密集时间序列 (轨道轨迹) 的坐标转换使用插值缓存，误差上限可在配置文件中调整
+configure_frame_cache(settings.get('coordinates', {}).get('FRAME_CACHE_ERROR_KM', 0.001))
+
+# 未经变换的模型缓存在本地，在不同历元渲染时不再重复下载
+model_cache_settings = settings.get('models', {})
+configure_model_cache(model_cache_settings.get('CACHE_DIR', 'model_cache'), model_cache_settings.get('CACHE_MAX_MB', 2048))
+
+# 1. JPL DE 星历数据在首次计算天体位置时才打开 (de440s.bsp: from Year 1849 to Year 2150)
+# 可在配置文件中换成只含所需日期范围的裁剪星历 (见 src/ephemeris_excerpt.py)
+set_ephemeris_file(settings.get('ephemeris', {}).get('FILE', 'de440s.bsp'))
 
 # 2. 定义时间 (2025年3月10日 UTC+8 08:00)
 ts = get_timescale() # 获取 skyfield 的 timescale
+report_time_data_staleness(ts) # 启动时检查离线时间表格是否过期
 """
 time_utc = get_utc_time(ts, 2025, 3, 10, 8, 0, 0) # 使用 skyfield 的 timescale 创建 Time 对象
 
@@ -132,15 +151,16 @@ r_settings = [['# PBRTgen 0.0.1', '# by github.com/wtflmao', '\n'],
               ['WorldBegin']]
 r_settings_overwriter('rendering_settings.pbrt', r_settings)
 
-# 以下世界设置会在用户选择时间后更新，并在处理模型变换时应用
-w_settings = [] # 初始化为空列表，稍后填充
+# 世界设置 (天体与模型) 在用户选择时间后构建为场景图，见 transform_and_create_scene_files
 
 # 从配置文件获取TLE下载地址
 
-# 获取TLE数据，使用缓存机制
-latest_tle_data = get_tle_data(settings.get('tle', {}).get('CELESTRAK_TLE_URL'))
-# 加载TLE数据
-latest_tle_data = load_tle_data(latest_tle_data)
+# 获取TLE数据，使用缓存机制；多个数据源并发下载并按NORAD编号合并
+tle_settings = settings.get('tle', {})
+latest_tle_data = get_tle_catalog(tle_sources_from_settings(tle_settings),
+                                  tle_settings.get('MAX_DOWNLOAD_WORKERS', 4))
+# 加载TLE数据，已陨落或 SGP4 无法传播的目标不进入选择列表与传播
+latest_tle_data = load_tle_data(latest_tle_data).exclude_decayed()
 
 # 11. 构建 .pbrt 文件的卫星设置
 
@@ -158,7 +178,9 @@ def get_cloud_models(api_base_url, api_version, api_key):
     model_url = f"{api_base_url}{api_version}/model"
     headers = {"Authorization": f"Bearer {api_key}"}
     try:
-        response = requests.get(model_url, headers=headers)
+        api_settings = settings.get('api', {})
+        response = requests.get(model_url, headers=headers,
+                                timeout=(api_settings.get('CONNECT_TIMEOUT', 10.0), api_settings.get('READ_TIMEOUT', 300.0)))
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -175,11 +197,19 @@ class ModelTLESelector:
         self.models = models
         self.tle_data = tle_data
         self.filtered_tle_names = list(tle_data.keys())  # 用于搜索过滤
+        self.filtered_tle_positions = {}  # TLE名称 -> 列表中的行号
+        
+        # TLE搜索索引，搜索在后台线程执行，结果经队列交回Tk主线程
+        self.search_index = TLESearchIndex(tle_data)
+        self.search_executor = ThreadPoolExecutor(max_workers=1)
+        self.search_results = queue.Queue()
+        self.search_after_id = None
+        self.search_poll_id = None
         
         # 存储选择的模型和TLE配对
         self.selected_pairs = []
         
-        # 当前选择的模型序号
+        # 当前正在配对的模型在列表中的序号
         self.current_model_index = 0
         
         # 当前选择的模型名称(用于TLE选择阶段)
@@ -318,20 +348,52 @@ class ModelTLESelector:
         self.model_listbox.bind('<Motion>', self.on_model_hover)
     
     def filter_tle_list(self, *args):
-        """根据搜索框内容筛选TLE列表"""
-        search_term = self.search_var.get().upper()  # 转为大写以进行不区分大小写的搜索
+        """根据搜索框内容筛选TLE列表 (防抖：停止输入一段时间后才搜索)"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(150, self.start_tle_search)
+    
+    def start_tle_search(self):
+        """在后台线程中执行搜索，不阻塞Tk事件循环"""
+        self.search_after_id = None
+        search_term = self.search_var.get()
+        
+        def run_search():
+            self.search_results.put((search_term, self.search_index.search(search_term)))
+        
+        self.search_executor.submit(run_search)
+        if self.search_poll_id is None:
+            self.search_poll_id = self.root.after(20, self.poll_tle_search)
+    
+    def poll_tle_search(self):
+        """在Tk主线程中取回搜索结果并刷新列表"""
+        self.search_poll_id = None
+        latest = None
+        while not self.search_results.empty():
+            latest = self.search_results.get_nowait()
+        
+        if latest is None:
+            self.search_poll_id = self.root.after(20, self.poll_tle_search)
+            return
+        
+        search_term, tle_names = latest
+        if search_term != self.search_var.get():
+            # 搜索期间输入又发生了变化，等待更新的结果
+            self.search_poll_id = self.root.after(20, self.poll_tle_search)
+            return
         
-        # 清空当前列表
+        self.show_tle_names(tle_names)
+    
+    def show_tle_names(self, tle_names):
+        """用给定的TLE名称替换列表内容"""
+        # 清空当前列表并一次性插入所有匹配项
         self.tle_listbox.delete(0, tk.END)
+        if tle_names:
+            self.tle_listbox.insert(tk.END, *tle_names)
         
         # 重置筛选后的TLE名称列表
-        self.filtered_tle_names = []
-        
-        # 添加匹配的TLE
-        for tle_name in self.tle_data.keys():
-            if search_term in tle_name:
-                self.tle_listbox.insert(tk.END, tle_name)
-                self.filtered_tle_names.append(tle_name)
+        self.filtered_tle_names = tle_names
+        self.filtered_tle_positions = {tle_name: i for i, tle_name in enumerate(tle_names)}
         
         # 更新已选择项的显示状态
         self.update_listbox_states()
@@ -343,11 +405,7 @@ class ModelTLESelector:
             self.model_listbox.insert(tk.END, model_name)
         
         # 加载TLE数据
-        for tle_name in self.tle_data.keys():
-            self.tle_listbox.insert(tk.END, tle_name)
-        
-        # 更新筛选后的TLE名称列表
-        self.filtered_tle_names = list(self.tle_data.keys())
+        self.show_tle_names(list(self.tle_data.keys()))
     
     def on_model_select(self, event):
         if not self.is_tle_selection_stage:
@@ -385,17 +443,16 @@ class ModelTLESelector:
         # 更新模型列表状态
         for i in range(self.model_listbox.size()):
             if i in self.selected_models:
-                self.model_listbox.itemconfig(i, {'bg': 'light gray', 'fg': 'gray'})
+                # 已配对的模型仍可继续与其他TLE配对 (例如星座中的同型卫星)
+                self.model_listbox.itemconfig(i, {'bg': 'light green', 'fg': 'black'})
             else:
                 self.model_listbox.itemconfig(i, {'bg': 'white', 'fg': 'black'})
         
-        # 更新TLE列表状态
-        for i in range(self.tle_listbox.size()):
-            tle_name = self.filtered_tle_names[i] if i < len(self.filtered_tle_names) else ""
-            if tle_name in self.selected_tles:
+        # 更新TLE列表状态 (只需重绘已选择的行，其余行保持默认样式)
+        for tle_name in self.selected_tles:
+            i = self.filtered_tle_positions.get(tle_name)
+            if i is not None:
                 self.tle_listbox.itemconfig(i, {'bg': 'light gray', 'fg': 'gray'})
-            else:
-                self.tle_listbox.itemconfig(i, {'bg': 'white', 'fg': 'black'})
     
     def select_item(self):
         if not self.is_tle_selection_stage:
@@ -406,17 +463,13 @@ class ModelTLESelector:
                 return
             
             index = selection[0]
-            if index in self.selected_models:
-                messagebox.showinfo("提示", "该模型已被选择")
-                return
-            
             model = self.models[index]
             model_name = model.get('name')
             model_uuid = model.get('uuid')  # 获取UUID
             
             # 标记已选择的模型
             self.selected_models.add(index)
-            self.current_model_index += 1
+            self.current_model_index = index
             
             # 切换到TLE选择阶段
             self.is_tle_selection_stage = True
@@ -463,12 +516,13 @@ class ModelTLESelector:
             self.current_pairing_model = None
             self.current_pairing_model_uuid = None
             
-            # 移除最后选择的模型
-            if self.selected_models:
-                last_model_index = max(self.selected_models)
-                self.selected_models.remove(last_model_index)
+            # 当前模型若没有已完成的配对，则取消其选择标记
+            paired_uuids = {model_uuid for _, _, model_uuid in self.selected_pairs}
+            model = self.models[self.current_model_index]
+            if model.get('uuid') not in paired_uuids:
+                self.selected_models.discard(self.current_model_index)
                 # 恢复该模型的显示状态
-                self.model_listbox.itemconfig(last_model_index, {'bg': 'white', 'fg': 'black'})
+                self.model_listbox.itemconfig(self.current_model_index, {'bg': 'white', 'fg': 'black'})
             
             # 更新状态显示
             self.status_label.config(text="请选择模型：")
@@ -501,9 +555,12 @@ class ModelTLESelector:
             return
         
         # 返回结果并关闭窗口
+        self.search_executor.shutdown(wait=False)
         self.result = {
             "time": selected_time,
-            "pairs": self.selected_pairs
+            "pairs": self.selected_pairs,
+            # 模型版本用作本地模型缓存的键
+            "model_versions": {model.get('uuid'): model_version(model) for model in self.models}
         }
         self.root.destroy()
 
@@ -538,58 +595,32 @@ def select_models_and_tles():
         print("用户取消了选择")
         return None
 
-# 运行选择器
-selection_result = select_models_and_tles()
+def select_epoch_tles(selection_result):
+    """为配对的卫星选出历元最接近渲染时刻的TLE，记入选择结果
+
+    场景、渲染后的位置报告与轨道可视化都使用这一份TLE，三者的卫星位置保持一致。
 
-def process_material_names(content, model_uuid):
-    """处理材料名称，替换空字符串为唯一名称
-    
     Args:
-        content: 文件内容
-        model_uuid: 模型的UUID
-        
-    Returns:
-        str: 处理后的内容
+        selection_result: 用户选择的结果
     """
-    import uuid
-    import re
-    
-    # 查找所有MakeNamedMaterial ""语句
-    empty_materials = re.findall(r'MakeNamedMaterial\s*""', content)
-    if len(empty_materials) > 1:
-        raise ValueError("发现多个空字符串命名的材料定义")
-    elif len(empty_materials) == 0:
-        return content  # 没有需要处理的情况
-    
-    # 生成唯一材料名，以模型UUID前8位开头
-    model_uuid_prefix = model_uuid[:8]
-    new_name = f"{model_uuid_prefix}-auto-{uuid.uuid4().hex[:8]}"
-    
-    # 替换材料定义 - 只替换MakeNamedMaterial ""
-    content = re.sub(
-        r'MakeNamedMaterial\s*""',
-        f'MakeNamedMaterial "{new_name}"',
-        content,
-        count=1  # 只替换第一个出现
-    )
-    
-    # 替换材料引用 - 只替换NamedMaterial ""，而不是所有的" "
-    content = re.sub(
-        r'NamedMaterial\s*""',
-        f'NamedMaterial "{new_name}"',
-        content
-    )
-    
-    return content
+    names = list(dict.fromkeys(tle_name for model_name, tle_name, model_uuid in selection_result['pairs']))
+    # 从历史档案中选择历元最接近渲染时刻的TLE
+    tles = tles_for_epoch(latest_tle_data, names, datetime_to_jd(selection_result['time']))
+    selection_result['tles'] = dict(zip(names, tles))
+
+# 运行选择器
+selection_result = select_models_and_tles()
+if selection_result:
+    select_epoch_tles(selection_result)
 
 time_utc = get_utc_time(ts, 2025, 3, 10, 8, 0, 0) # mock
 
 # 处理模型变换、下载并生成场景文件
 def transform_and_create_scene_files(selection_result, api_base_url, api_version, api_key):
-    """处理模型变换、下载模型并生成场景文件
+    """从本地缓存 (必要时下载) 取得模型，放置到卫星位置并生成场景文件
     
     Args:
-        selection_result: 用户选择的结果
+        selection_result: 用户选择的结果 (含 select_epoch_tles 选定的TLE)
         api_base_url: API基础URL
         api_version: API版本
         api_key: API密钥
@@ -603,66 +634,34 @@ def transform_and_create_scene_files(selection_result, api_base_url, api_version
     
     # 获取用户选择的时间
     selected_time = selection_result['time']
-    time_utc = get_utc_time(ts, 
-                         selected_time.year, 
-                         selected_time.month, 
-                         selected_time.day, 
-                         selected_time.hour, 
-                         selected_time.minute, 
-                         selected_time.second)
+    time_utc = utc_time(ts, selected_time)
     
     print(f"使用UTC时间: {time_utc.utc_iso()} 计算天体位置")
+    earth, sun, moon = get_body('earth'), get_body('sun'), get_body('moon')
     
     # 使用用户选择的时间计算天体位置
-    # 计算天体在地心系中的位置 (地心坐标)
-    earth_position = earth.at(time_utc).position
-    sun_position = sun.at(time_utc).position
-    moon_position = moon.at(time_utc).position
-    
-    # 将 skyfield 的位置转换为 astropy 的 ICRS 坐标
-    earth_icrs = skyfield_to_icrs(earth_position)
-    sun_icrs = skyfield_to_icrs(sun_position)
-    moon_icrs = skyfield_to_icrs(moon_position)
-    
-    # 转换为 km 单位
-    earth_icrs_km = convert_au_to_km(earth_icrs)
-    sun_icrs_km = convert_au_to_km(sun_icrs)
-    moon_icrs_km = convert_au_to_km(moon_icrs)
-    
-    # 转换为 GCRS 坐标 (单位: 千米 km)
-    earth_gcrs_km = icrs_to_gcrs(earth_icrs_km, time_utc.utc_iso())
-    sun_gcrs_km = icrs_to_gcrs(sun_icrs_km, time_utc.utc_iso())
-    moon_gcrs_km = icrs_to_gcrs(moon_icrs_km, time_utc.utc_iso())
+    # 地球、太阳、月球的质心坐标合并为一次 ICRS→GCRS 变换 (单位: 千米 km)
+    earth_position = earth.at(time_utc)
+    earth_gcrs_km, sun_gcrs_km, moon_gcrs_km = skyfield_to_gcrs_km(
+        [earth_position, sun.at(time_utc), moon.at(time_utc)], time_utc).tolist()
     
     # 准备卫星位置数据，用于相机和观察点选择
     satellite_positions = {}
     
+    # 一次性批量传播所有配对卫星的位置，使用为渲染时刻选定的TLE；
+    # 几何地心坐标再经与地球、太阳、月球相同的 ICRS→GCRS 变换 (GCRS, km)
+    pair_tle_names = [tle_name for model_name, tle_name, model_uuid in selection_result['pairs']]
+    pair_positions = geocentric_to_gcrs_km(
+        propagate_gcrs_km([selection_result['tles'][name] for name in pair_tle_names], time_utc)[:, 0, :],
+        earth_position.position.km, time_utc)
+    
     # 处理每个卫星的位置
-    for model_name, tle_name, model_uuid in selection_result['pairs']:
-        print(f"计算卫星 {tle_name} 的位置...")
-        
-        # 创建卫星对象
-        satellite = EarthSatellite(latest_tle_data[tle_name][0], latest_tle_data[tle_name][1], tle_name, ts)
-        
-        # 计算卫星位置
-        satellite_position = (earth + satellite).at(time_utc).position
-        
-        # 转换为ICRS坐标
-        satellite_icrs = skyfield_to_icrs(satellite_position)
-        satellite_icrs_km = convert_au_to_km(satellite_icrs)
-        
-        # 转换为GCRS坐标
-        satellite_gcrs_km = icrs_to_gcrs(satellite_icrs_km, time_utc.utc_iso())
-        
+    for tle_name, position in zip(pair_tle_names, pair_positions):
         # 存储卫星位置
-        satellite_positions[tle_name] = [
-            float(satellite_gcrs_km.x.value), 
-            float(satellite_gcrs_km.y.value), 
-            float(satellite_gcrs_km.z.value)
-        ]
+        satellite_positions[tle_name] = [float(position[0]), float(position[1]), float(position[2])]
         
         # 打印卫星位置信息
-        print(f"卫星 {tle_name} GCRS坐标 (km): X={satellite_gcrs_km.x:.6f}, Y={satellite_gcrs_km.y:.6f}, Z={satellite_gcrs_km.z:.6f}")
+        print(f"卫星 {tle_name} GCRS坐标 (km): X={position[0]:.6f}, Y={position[1]:.6f}, Z={position[2]:.6f}")
     
     # 启动相机和观察点选择界面
     print("正在启动相机位置和观察点选择界面...")
@@ -705,172 +704,147 @@ def transform_and_create_scene_files(selection_result, api_base_url, api_version
         print(f"像素采样次数: {pixel_samples}")
         print(f"最大反射次数: {max_depth}")
     
-    # 基于用户选择的时间更新世界设置
-    w_settings = [set_bkg_light_source(None, 0.0001),
-                 set_attrubute_the_sun([sun_gcrs_km.x.value, sun_gcrs_km.y.value, sun_gcrs_km.z.value], None),
-                 set_attrubute_the_moon([moon_gcrs_km.x.value, moon_gcrs_km.y.value, moon_gcrs_km.z.value], None),
-                 set_attrubute_the_earth([earth_gcrs_km.x.value, earth_gcrs_km.y.value, earth_gcrs_km.z.value], None, None, None)]
+    # 在内存中构建场景图，最后一次性序列化
+    scene = Scene()
+    scene.set(LookAt(camera_position, target_position))
+    scene.set(Camera(None, fov))
+    scene.set(Sampler(None, pixel_samples))
+    scene.set(Integrator(None, max_depth))
+    scene.set(Film(resolution_x, resolution_y))
+    scene.set(PixelFilter())
+    scene.set(ColorSpace())
 
-    # 确保渲染设置文件存在
-    if not os.path.exists('rendering_settings.pbrt'):
-        print("渲染设置文件不存在，重新生成")
-        r_settings = [['# PBRTgen 0.0.1', '# by github.com/wtflmao', '\n'],
-                      set_lookat(camera_position, target_position, None),
-                      set_camera(None, fov),
-                      set_sampler(None, pixel_samples),
-                      set_integrator(None, max_depth),
-                      set_film(resolution_x, resolution_y, None),
-                      set_pixel_filter(),
-                      set_color_space(None),
-                      ['WorldBegin']]
-        r_settings_overwriter('rendering_settings.pbrt', r_settings)
-    else:
-        # 读取现有设置文件并更新相关部分
-        with open('rendering_settings.pbrt', 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 查找并替换相机设置
-        lines = content.split('\n')
-        new_lines = []
-        i = 0
-        
-        while i < len(lines):
-            if lines[i].startswith('LookAt'):
-                # 跳过原有的3行LookAt设置
-                i += 3
-                # 添加新的LookAt设置
-                new_lines.append(f'LookAt {camera_position[0]}  {camera_position[1]}  {camera_position[2]}')
-                new_lines.append(f'       {target_position[0]}  {target_position[1]}  {target_position[2]}')
-                new_lines.append('       0  0  1')
-            elif lines[i].startswith('Camera '):
-                # 替换相机设置
-                new_lines.append(f'Camera "perspective" "float fov" {fov}')
-                i += 1
-            elif lines[i].startswith('Sampler '):
-                # 替换采样器设置
-                new_lines.append(f'Sampler "halton" "integer pixelsamples" {pixel_samples}')
-                i += 1
-            elif lines[i].startswith('Integrator '):
-                # 替换积分器设置
-                new_lines.append(f'Integrator "volpath" "integer maxdepth" {max_depth}')
-                i += 1
-            elif lines[i].startswith('Film '):
-                # 替换电影设置（可能跨多行）
-                new_lines.append('Film "spectral" "string filename" "1.exr"')
-                new_lines.append(f'     "integer xresolution" [{resolution_x}]')
-                new_lines.append(f'     "integer yresolution" [{resolution_y}]')
-                new_lines.append('     "float diagonal" [70]')
-                
-                # 跳过原有的Film行
-                while i < len(lines) and not (lines[i].startswith('PixelFilter') or lines[i].startswith('ColorSpace') or lines[i].startswith('WorldBegin')):
-                    i += 1
-                continue
-            else:
-                new_lines.append(lines[i])
-                i += 1
-        
-        # 重写文件
-        with open('rendering_settings.pbrt', 'w', encoding='utf-8') as f:
-            f.write('\n'.join(new_lines))
-        
-        print("已更新渲染设置文件")
+    # 基于用户选择的时间设置天体
+    scene.add(BackgroundLight(None, 0.0001))
+    scene.add(Sun(sun_gcrs_km))
+    scene.add(Moon(moon_gcrs_km))
+    scene.add(Earth(earth_gcrs_km))
 
-    # 读取渲染设置文件
-    with open('rendering_settings.pbrt', 'r', encoding='utf-8') as f:
-        rendering_settings_content = f.read()
-    
-    headers = {"Authorization": f"Bearer {api_key}"}
-    
-    # 创建最终的合并文件
-    output_file_path = "popo.pbrt"
-    
-    # 如果文件已存在，先删除
-    if os.path.exists(output_file_path):
-        os.remove(output_file_path)
-    
-    # 先写入公共头部
-    with open(output_file_path, 'w', encoding='utf-8') as f:
-        f.write(rendering_settings_content)
-        # 添加天体设置
-        f.write("\n# 天体设置\n\n")
-    
-    # 应用世界设置（天体）
-    w_settings_appender(output_file_path, w_settings)
-    
-    # 添加模型标记
-    with open(output_file_path, 'a', encoding='utf-8') as f:
-        f.write("\n# 模型部分开始\n\n")
-    
-    # 处理每个模型-TLE配对
+    # 使用前面批量计算得到的卫星位置放置模型
     for model_name, tle_name, model_uuid in selection_result['pairs']:
-        print(f"处理模型 {model_name} (UUID: {model_uuid}) 与 TLE {tle_name} 的配对...")
-        
-        # 创建卫星对象
-        satellite = EarthSatellite(latest_tle_data[tle_name][0], latest_tle_data[tle_name][1], tle_name, ts)
-        
-        # 计算卫星位置
-        satellite_position = (earth + satellite).at(time_utc).position
-        
-        # 转换为ICRS坐标
-        satellite_icrs = skyfield_to_icrs(satellite_position)
-        satellite_icrs_km = convert_au_to_km(satellite_icrs)
-        
-        # 转换为GCRS坐标
-        satellite_gcrs_km = icrs_to_gcrs(satellite_icrs_km, time_utc.utc_iso())
-        
-        # 打印卫星位置信息
-        print(f"卫星 {tle_name} GCRS坐标 (km): X={satellite_gcrs_km.x:.6f}, Y={satellite_gcrs_km.y:.6f}, Z={satellite_gcrs_km.z:.6f}")
-        
-        # 构建转换请求数据
-        transform_data = {
-            "uuid": model_uuid,
-            "translate": [float(satellite_gcrs_km.x.value), float(satellite_gcrs_km.y.value), float(satellite_gcrs_km.z.value)]
-        }
-        
-        # 发送转换请求
-        transform_url = f"{api_base_url}{api_version}/transform"
-        try:
-            transform_response = requests.post(transform_url, headers=headers, json=transform_data)
-            transform_response.raise_for_status()
-            
-            print(f"模型 {model_name} 转换成功，正在下载模型文件...")
-            
-            # 下载模型文件
-            model_url = f"{api_base_url}{api_version}/model/momo/{model_uuid}"
-            model_response = requests.get(model_url, headers=headers)
-            model_response.raise_for_status()
+        scene.add(ModelPlacement(model_name, tle_name, model_uuid, satellite_positions[tle_name]))
 
-            # 创建临时文件前先处理材料名称
-            raw_content = model_response.content.decode('utf-8')
-            try:
-                processed_content = process_material_names(raw_content, model_uuid)
-                print(f"已处理模型 {model_name} 的材料名称")
-            except ValueError as e:
-                print(f"材料处理失败: {e}")
-                continue
-            
-            # 创建临时文件，使用处理后的内容
-            temp_file_path = f"temp_{model_uuid}.pbrt"
-            with open(temp_file_path, 'w', encoding='utf-8') as f:
-                f.write(processed_content)  # 使用处理后的内容而不是原始内容
-            
-            print(f"模型文件下载成功，保存为临时文件 {temp_file_path}")
-            
-            # 将模型文件追加到合并文件中
-            with open(output_file_path, 'a', encoding='utf-8') as f:
-                f.write(f"\n# {tle_name} - {model_uuid} - {model_name} Starts\n")
-                with open(temp_file_path, 'r', encoding='utf-8') as model_file:
-                    f.write(model_file.read())
-                f.write(f"\n# {tle_name} - {model_uuid} - {model_name} Ends\n\n")
-            
-            # 删除临时文件
-            os.remove(temp_file_path)
-            
-        except requests.exceptions.RequestException as e:
-            print(f"处理模型 {model_name} 失败: {e}")
+    # 渲染设置文件记录本次使用的渲染设置
+    with PBRTWriter('rendering_settings.pbrt') as f:
+        f.write(scene.options_text())
+    print("已更新渲染设置文件")
+
+    # 场景布局：single 为单个合并文件；import / include 时主文件与各模型文件放在场景目录中
+    scene_settings = settings.get('scene', {})
+    layout = scene_settings.get('LAYOUT', 'single')
+    if layout not in SCENE_LAYOUTS:
+        print(f"未知的场景布局 {layout}，使用 single")
+        layout = 'single'
+    scene_dir = scene_settings.get('DIR', 'popo_scene')
+
+    # 创建最终的合并文件
+    if layout == 'single':
+        output_file_path = "popo.pbrt"
+    else:
+        os.makedirs(scene_dir, exist_ok=True)
+        output_file_path = os.path.join(scene_dir, "popo.pbrt")
+
+    # 模型以未经变换的形式缓存在本地，只有缓存中没有的模型才需要下载；
+    # 模型列表没有版本号时，缓存的副本以 ETag 条件请求向服务器确认 (未变化时服务器返回 304，不传输内容)；
+    # 请求并发进行，共享同一个保持连接的会话，响应内容以流的方式写入缓存
+    model_versions = selection_result.get('model_versions', {})
+    model_cache = get_model_cache()
+    model_paths = {}
+    # 本次场景用到的缓存文件，下载新模型触发容量淘汰时不会删除它们
+    pinned = set()
+    # 需要请求服务器的模型: {UUID: 缓存副本的 ETag}，缓存中没有时为 None
+    to_fetch = {}
+    for model_uuid in dict.fromkeys(node.model_uuid for node in scene.models):
+        version = model_versions.get(model_uuid)
+        cached = model_cache.lookup(model_uuid, version)
+        if cached is None:
+            to_fetch[model_uuid] = None
             continue
-    
+        path, etag = cached
+        model_paths[model_uuid] = path
+        pinned.add(path)
+        if not version:
+            to_fetch[model_uuid] = etag
+    revalidate = sum(1 for etag in to_fetch.values() if etag is not None)
+    print(f"模型缓存命中 {len(model_paths)} 个 (其中 {revalidate} 个需向服务器确认)，"
+          f"需要下载 {len(to_fetch) - revalidate} 个")
+
+    if to_fetch:
+        api_settings = settings.get('api', {})
+        client = ModelAPIClient(api_base_url, api_version, api_key,
+                                max_workers=api_settings.get('MAX_CONCURRENT_REQUESTS', 8),
+                                connect_timeout=api_settings.get('CONNECT_TIMEOUT', 10.0),
+                                read_timeout=api_settings.get('READ_TIMEOUT', 300.0))
+
+        def fetch(model_uuid):
+            return client.download_untransformed(
+                model_uuid,
+                lambda chunks, etag: model_cache.put_chunks(model_uuid, chunks, model_versions.get(model_uuid), etag,
+                                                            protect=pinned),
+                etag=to_fetch[model_uuid])
+
+        with client:
+            for model_uuid, path, error in client.map_ordered(fetch, list(to_fetch)):
+                if error is not None:
+                    if model_uuid in model_paths:
+                        print(f"确认模型 {model_uuid} 是否更新失败，使用本地缓存: {error}")
+                    else:
+                        print(f"下载模型 {model_uuid} 失败: {error}")
+                    continue
+                if path is None:
+                    # 服务器返回 304，缓存的副本仍是最新
+                    continue
+                model_paths[model_uuid] = path
+                print(f"模型 {model_uuid} 下载成功，已存入本地缓存")
+
+    used_model_files = set()
+
+    # 大型内联三角网格转换为二进制 PLY 文件，模型中改为 plymesh 引用；
+    # 转换结果按模型内容缓存，PLY 文件与模型文件一起放在场景目录中
+    if scene_settings.get('PLY_MESHES', False):
+        if layout == 'single':
+            print("PLY 网格需要 import / include 布局 (PLY 文件随场景目录一起打包)，跳过转换")
+        else:
+            for model_uuid, path in list(model_paths.items()):
+                try:
+                    model_path, mesh_paths = convert_model_meshes(
+                        path, scene_settings.get('PLY_MIN_VERTICES', PLY_MIN_VERTICES),
+                        scene_settings.get('PLY_COMPRESS', False))
+                except (ValueError, OSError) as e:
+                    print(f"模型 {model_uuid} 的网格转换失败，使用原始文件: {e}")
+                    continue
+                model_paths[model_uuid] = model_path
+                used_model_files |= install_mesh_files(scene_dir, mesh_paths)
+                if mesh_paths:
+                    print(f"模型 {model_uuid} 的 {len(mesh_paths)} 个网格已转换为 PLY")
+
+    # 按配对顺序在本地把模型放置到卫星位置，流式写入合并文件；
+    # 命名材料、纹理与对象在写入过程中逐块加上模型的命名空间，模型失败时截掉已写入的部分。
+    # 整个场景经同一个缓冲句柄写入临时文件，完成后原子替换，渲染前读取的不会是写了一半的文件
+    with PBRTWriter(output_file_path, compress=scene_settings.get('COMPRESS', False)) as f:
+        # 先写入渲染设置与天体
+        f.write(scene.header_text())
+
+        # 同一模型与多个TLE配对时 (例如星座)，几何只以 ObjectBegin 定义一次，各卫星处放置 ObjectInstance
+        used_model_files |= write_scene_models(f, scene.models, model_paths, layout, scene_dir,
+                                               instancing=scene_settings.get('INSTANCING', True))
+
+    output_file_path = f.path
     print(f"合并场景文件 {output_file_path} 生成成功")
+
+    # 压缩与未压缩的主文件只保留本次写入的一种，不留下两个相互矛盾的场景入口
+    other_variant = output_file_path[:-len('.gz')] if output_file_path.endswith('.gz') else output_file_path + '.gz'
+    if os.path.exists(other_variant):
+        os.remove(other_variant)
+
+    if layout != 'single':
+        remove_unused_model_files(scene_dir, used_model_files, (MODELS_SUBDIR, MESHES_SUBDIR))
+        if scene_settings.get('ARCHIVE', True):
+            # 主文件与本次用到的模型、网格文件按清单打包为单个归档，作为一个文件提交渲染
+            manifest = used_model_files | {os.path.relpath(output_file_path, scene_dir)}
+            archive_path = package_scene(scene_dir, f"{os.path.normpath(scene_dir)}.tar.gz", manifest)
+            print(f"场景目录 {scene_dir} 已打包为 {archive_path}")
+            return archive_path
     return output_file_path
 
 # 计算文件哈希值
@@ -914,7 +888,10 @@ def render_pbrt_file(api_base_url, api_version, api_key, pbrt_file_path):
     
     # 准备文件和参数
     with open(pbrt_file_path, 'rb') as f:
-        files = {'pbrtFile': (os.path.basename(pbrt_file_path), f, 'text/plain')}
+        # Import / Include 布局的场景以 tar.gz 归档提交，其中包含主文件与各模型文件；
+        # 启用压缩时单个场景文件为 .pbrt.gz
+        content_type = 'application/gzip' if pbrt_file_path.endswith('.gz') else 'text/plain'
+        files = {'pbrtFile': (os.path.basename(pbrt_file_path), f, content_type)}
         data = {'hash': file_hash}
         
         try:
@@ -968,30 +945,6 @@ def open_exr_file(exr_path):
         print(f"无法自动打开EXR文件: {e}")
         print(f"请手动打开文件: {exr_path}")
 
-# 在transform_and_create_scene_files函数末尾添加文件后处理步骤
-def post_process_pbrt_file(output_file_path):
-    """后处理PBRT文件，确保AttributeEnd和AttributeBegin之间有换行
-    
-    Args:
-        output_file_path: PBRT文件路径
-    """
-    try:
-        with open(output_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 替换 AttributeEndAttributeBegin 为 AttributeEnd\nAttributeBegin
-        modified_content = content.replace('AttributeEndAttributeBegin', 'AttributeEnd\nAttributeBegin')
-        
-        # 如果内容发生变化，则重新写入文件
-        if modified_content != content:
-            with open(output_file_path, 'w', encoding='utf-8') as f:
-                f.write(modified_content)
-            print(f"已处理文件 {output_file_path}，添加了换行")
-        else:
-            print(f"文件 {output_file_path} 无需修改")
-    except Exception as e:
-        print(f"处理文件 {output_file_path} 时发生错误: {e}")
-
 def cleanup_tk_resources():
     """清理Tkinter资源，确保在后续线程中不会出现tkinter问题"""
     try:
@@ -1048,29 +1001,18 @@ if selection_result:
     # 处理模型变换、下载并生成场景文件
     pbrt_file_path = transform_and_create_scene_files(selection_result, api_base_url, api_version, api_key)
     
-    # 后处理PBRT文件
-    post_process_pbrt_file(pbrt_file_path)
-    
     # 如果成功生成场景文件，则提交渲染
     if pbrt_file_path:
         # 准备卫星位置数据字典
+        sat_names = [sat_name for model_name, sat_name, model_uuid in selection_result['pairs']]
+        render_time = utc_time(ts, selection_result['time'])
+        sat_positions = geocentric_to_gcrs_km(
+            propagate_gcrs_km([selection_result['tles'][sat_name] for sat_name in sat_names], render_time)[:, 0, :],
+            get_body('earth').at(render_time).position.km, render_time)
         satellite_positions = {}
-        for model_name, sat_name, model_uuid in selection_result['pairs']:
-            # 获取并创建卫星对象
-            satellite = EarthSatellite(latest_tle_data[sat_name][0], latest_tle_data[sat_name][1], sat_name, ts)
-            
-            # 计算卫星位置
-            satellite_position = (earth + satellite).at(time_utc).position
-            sat_icrs = skyfield_to_icrs(satellite_position)
-            sat_icrs_km = convert_au_to_km(sat_icrs)
-            sat_gcrs_km = icrs_to_gcrs(sat_icrs_km, time_utc.utc_iso())
-            
+        for sat_name, position in zip(sat_names, sat_positions):
             # 存储卫星位置
-            satellite_positions[sat_name] = [
-                float(sat_gcrs_km.x.value), 
-                float(sat_gcrs_km.y.value), 
-                float(sat_gcrs_km.z.value)
-            ]
+            satellite_positions[sat_name] = [float(position[0]), float(position[1]), float(position[2])]
         
         # 提交渲染之前，先清理所有Tkinter资源
         cleanup_tk_resources()
@@ -1083,7 +1025,7 @@ if selection_result:
             satellite_positions,
             latest_tle_data,  # 传递TLE数据
             ts,  # 传递时间尺度对象
-            earth  # 传递地球对象
+            get_body('earth')  # 传递地球对象
         )
         
         # 提交渲染 - 这是一个阻塞操作，让它在可视化生成的同时进行
@@ -1101,6 +1043,8 @@ if selection_result:
             print("正在等待轨道可视化完成...")
             visualization_done.wait(30)  # 最多等待30秒
             
+        registry_stats = get_registry().stats()
+        print(f"卫星注册表: 命中 {registry_stats['hits']} 次, 未命中 {registry_stats['misses']} 次")
         print("流程完成。")
     else:
         print("场景文件生成失败，无法渲染")
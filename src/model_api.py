@@ -0,0 +1,140 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .scene_assembly import STREAM_CHUNK_SIZE
+
+# 请求未经变换的模型时附加的查询参数 (零平移)
+UNTRANSFORMED_PARAMS = {'translate': '0,0,0'}
+
+class ModelAPIClient:
+    """模型服务客户端
+
+    所有请求共享一个保持连接的 requests.Session，并由有界线程池并发执行。
+    """
+
+    def __init__(self, api_base_url, api_version, api_key, max_workers=8,
+                 connect_timeout=10.0, read_timeout=300.0):
+        """初始化客户端
+
+        Args:
+            api_base_url (str): API基础URL
+            api_version (str): API版本
+            api_key (str): API密钥
+            max_workers (int): 同时进行的请求数量上限
+            connect_timeout (float): 建立连接的超时时间 (秒)
+            read_timeout (float): 等待响应数据的超时时间 (秒)
+        """
+        self.base_url = f"{api_base_url}{api_version}"
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+        # 连接池大小与并发数一致，避免并发请求互相等待连接或反复新建连接
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def from_settings(cls, api_settings):
+        """由配置文件中的 api 设置创建客户端
+
+        Args:
+            api_settings (dict): settings.yaml 中的 api 部分
+
+        Returns:
+            ModelAPIClient: 客户端
+        """
+        return cls(api_settings['API_BASE_URL'], api_settings['API_VERSION'], api_settings['API_KEY'],
+                   max_workers=api_settings.get('MAX_CONCURRENT_REQUESTS', 8),
+                   connect_timeout=api_settings.get('CONNECT_TIMEOUT', 10.0),
+                   read_timeout=api_settings.get('READ_TIMEOUT', 300.0))
+
+    def transform(self, model_uuid, translate):
+        """请求服务端对模型做平移变换
+
+        Args:
+            model_uuid (str): 模型UUID
+            translate (list): 平移量 [x, y, z] (km)
+        """
+        response = self.session.post(f"{self.base_url}/transform",
+                                     json={"uuid": model_uuid, "translate": translate},
+                                     timeout=self.timeout)
+        response.raise_for_status()
+
+    def download_model(self, model_uuid, consume, params=None, etag=None):
+        """以流的方式下载模型文件
+
+        Args:
+            model_uuid (str): 模型UUID
+            consume: 接收 (内容块迭代器, ETag) 的函数，在响应关闭前读完内容
+            params (dict, optional): 附加的查询参数
+            etag (str, optional): 本地副本的 ETag，作为 If-None-Match 发送
+
+        Returns:
+            consume 的返回值；服务器返回 304 (本地副本仍是最新) 时为 None
+        """
+        headers = {'If-None-Match': etag} if etag else None
+        with self.session.get(f"{self.base_url}/model/momo/{model_uuid}", params=params, headers=headers,
+                              timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+            return consume(response.iter_content(STREAM_CHUNK_SIZE), response.headers.get('ETag'))
+
+    def download_untransformed(self, model_uuid, consume, etag=None):
+        """下载未经平移的模型，供本地缓存后自行放置
+
+        零平移在下载请求中直接给出，不调用 /transform，服务端保存的变换状态不受影响，
+        也不会被同时进行的其他渲染改动。
+
+        Args:
+            model_uuid (str): 模型UUID
+            consume: 接收 (内容块迭代器, ETag) 的函数
+            etag (str, optional): 本地副本的 ETag，用于条件请求
+
+        Returns:
+            consume 的返回值；本地副本仍是最新时为 None
+        """
+        return self.download_model(model_uuid, consume, params=UNTRANSFORMED_PARAMS, etag=etag)
+
+    def map_ordered(self, func, jobs):
+        """并发执行任务，并按任务顺序逐个返回结果
+
+        同时提交的任务数不超过并发数的两倍，已完成但尚未轮到的结果不会无限堆积。
+
+        Args:
+            func: 对每个任务调用的函数
+            jobs (iterable): 任务参数
+
+        Yields:
+            tuple: (任务参数, 结果, 异常)，成功时异常为 None，失败时结果为 None
+        """
+        window = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for job in jobs:
+                window.append((job, executor.submit(func, job)))
+                if len(window) >= self.max_workers * 2:
+                    yield self._result(*window.popleft())
+            while window:
+                yield self._result(*window.popleft())
+
+    @staticmethod
+    def _result(job, future):
+        try:
+            return job, future.result(), None
+        except Exception as e:
+            return job, None, e
+
+    def close(self):
+        """关闭会话与连接池"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
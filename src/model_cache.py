@@ -0,0 +1,304 @@
+"""
+本地模型缓存
+未经变换的模型文件按内容的 SHA-256 存放，索引记录 (UUID, 版本) 到内容的映射，
+超过容量上限时按最近使用时间淘汰。模型在本地用 Translate 放置到卫星位置，
+同一模型在不同历元渲染时无需重新下载。模型列表没有给出版本号时，
+缓存条目记录服务器返回的 ETag，使用前以条件请求确认内容仍是最新。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from .file_lock import FileLock
+
+# 项目根目录
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 模型缓存目录
+MODEL_CACHE_DIR = os.path.join(PROJECT_ROOT, 'model_cache')
+
+# 默认容量上限 (MB)
+MODEL_CACHE_MAX_MB = 2048
+
+# 模型列表中可用作版本号的字段，按优先级排列
+_VERSION_FIELDS = ('version', 'updated_at', 'hash')
+
+def model_version(model):
+    """从云端模型列表的条目中取出版本号
+
+    Args:
+        model (dict): 模型信息
+
+    Returns:
+        str: 版本号，条目中没有版本信息时为 None
+    """
+    for field in _VERSION_FIELDS:
+        value = model.get(field)
+        if value:
+            return str(value)
+    return None
+
+def derived_dir(object_path):
+    """由缓存内容派生的文件 (例如转换后的 PLY 网格) 所在目录，随内容一起淘汰
+
+    Args:
+        object_path (str): 缓存中的模型文件路径
+    """
+    return os.path.splitext(object_path)[0] + '.derived'
+
+def _atomic_write(path, data):
+    """先写同目录的临时文件再原子替换"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.' + os.path.basename(path) + '.',
+                                     suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+class ModelCache:
+    """按内容寻址、容量有限的本地模型缓存"""
+
+    def __init__(self, directory=MODEL_CACHE_DIR, max_bytes=MODEL_CACHE_MAX_MB * 1024 * 1024):
+        """初始化模型缓存
+
+        Args:
+            directory (str): 缓存目录
+            max_bytes (int): 缓存内容的总大小上限 (字节)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(directory, 'objects')
+        self.index_path = os.path.join(directory, 'index.json')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest + '.pbrt')
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        _atomic_write(self.index_path, json.dumps(index, ensure_ascii=False, indent=1).encode('utf-8'))
+
+    def _update_index(self, update):
+        """在进程内与进程间的锁保护下读取、修改并写回索引
+
+        Args:
+            update: 接收索引字典并就地修改的函数，返回值原样返回
+        """
+        with self._lock, FileLock(self.index_path + '.lock'):
+            index = self._load_index()
+            result = update(index)
+            self._save_index(index)
+            return result
+
+    @staticmethod
+    def _key(model_uuid, version):
+        return f"{model_uuid}@{version}" if version else model_uuid
+
+    def path(self, model_uuid, version=None):
+        """查找已缓存模型的文件路径并更新其最近使用时间
+
+        Args:
+            model_uuid (str): 模型UUID
+            version (str, optional): 模型版本；未知时使用该UUID最近缓存的任一版本
+
+        Returns:
+            str: 缓存文件路径，未命中时为 None
+        """
+        entry = self.lookup(model_uuid, version)
+        return entry[0] if entry else None
+
+    def lookup(self, model_uuid, version=None):
+        """查找已缓存模型并更新其最近使用时间
+
+        没有版本号的条目可能已经过期，调用方应以返回的 ETag 向服务器确认后再使用。
+
+        Args:
+            model_uuid (str): 模型UUID
+            version (str, optional): 模型版本；未知时使用该UUID最近缓存的任一版本
+
+        Returns:
+            tuple: (缓存文件路径, 下载时服务器返回的 ETag)，未命中时为 None
+        """
+        def touch(index):
+            if version:
+                key = self._key(model_uuid, version)
+                entry = index.get(key)
+            else:
+                candidates = [(entry['last_used'], key) for key, entry in index.items()
+                              if entry['uuid'] == model_uuid]
+                key = max(candidates)[1] if candidates else None
+                entry = index.get(key) if key else None
+            if entry is None:
+                return None
+            path = self._object_path(entry['sha256'])
+            if not os.path.exists(path):
+                # 内容文件已被外部删除，索引条目随之失效
+                del index[key]
+                return None
+            entry['last_used'] = time.time()
+            return path, entry.get('etag')
+
+        return self._update_index(touch)
+
+    def get(self, model_uuid, version=None):
+        """读取已缓存的模型内容
+
+        Returns:
+            bytes: 模型文件内容，未命中时为 None
+        """
+        path = self.path(model_uuid, version)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def put(self, model_uuid, content, version=None, etag=None, protect=None):
+        """存入模型内容
+
+        Args:
+            model_uuid (str): 模型UUID
+            content (bytes): 未经变换的模型文件内容
+            version (str, optional): 模型版本，未知时以服务器返回的 ETag 记录
+            etag (str, optional): 服务器返回的 ETag
+            protect (set, optional): 见 put_chunks
+
+        Returns:
+            str: 缓存文件路径
+        """
+        return self.put_chunks(model_uuid, [content], version, etag, protect)
+
+    def put_chunks(self, model_uuid, chunks, version=None, etag=None, protect=None):
+        """以流的方式存入模型内容，边写入临时文件边计算哈希
+
+        Args:
+            model_uuid (str): 模型UUID
+            chunks (iterable): 模型文件内容 (bytes 块)
+            version (str, optional): 模型版本
+            etag (str, optional): 服务器返回的 ETag
+            protect (set, optional): 当前场景正在使用的缓存文件路径，淘汰时跳过这些内容；
+                                     新存入的路径在淘汰前 (于缓存锁内) 加入其中
+
+        Returns:
+            str: 缓存文件路径
+        """
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.objects_dir, prefix='.download.', suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            digest = sha256.hexdigest()
+            path = self._object_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(temp_path, 0o644)
+                os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        def insert(index):
+            key = self._key(model_uuid, version)
+            replaced = index.get(key)
+            index[key] = {
+                'uuid': model_uuid,
+                'version': version,
+                'etag': etag,
+                'sha256': digest,
+                'size': size,
+                'last_used': time.time(),
+            }
+            if protect is not None:
+                protect.add(path)
+            if replaced is not None and replaced['sha256'] != digest:
+                # 同一键的旧内容 (例如服务器上已更新的无版本模型) 已被新内容取代，
+                # 不再被其他条目引用时立即删除
+                if self._remove_unreferenced(index, replaced['sha256']) and protect is not None:
+                    protect.discard(self._object_path(replaced['sha256']))
+            self._evict(index, protect or ())
+
+        self._update_index(insert)
+        return path
+
+    def _evict(self, index, protect=()):
+        """按最近使用时间淘汰条目，直到内容总大小不超过上限
+
+        多个条目可能指向同一份内容，只有不再被引用的内容文件才会删除。
+        受保护的内容 (当前场景正在使用) 及其派生目录不会被淘汰。
+
+        Args:
+            index (dict): 索引
+            protect (iterable): 受保护的缓存文件路径
+        """
+        protected = {os.path.splitext(os.path.basename(path))[0] for path in protect}
+        sizes = {entry['sha256']: entry['size'] for entry in index.values()}
+        total = sum(sizes.values())
+        for key, entry in sorted(index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes or len(index) <= 1:
+                break
+            digest = entry['sha256']
+            if digest in protected:
+                continue
+            del index[key]
+            if self._remove_unreferenced(index, digest):
+                total -= sizes[digest]
+                print(f"模型缓存已满，淘汰 {entry['uuid']} ({entry['size'] / 1024:.0f} KB)")
+
+    def _remove_unreferenced(self, index, digest):
+        """删除不再被任何条目引用的内容文件及其派生目录
+
+        Returns:
+            bool: 是否删除了内容
+        """
+        path = self._object_path(digest)
+        if any(entry['sha256'] == digest for entry in index.values()):
+            return False
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        shutil.rmtree(derived_dir(path), ignore_errors=True)
+        return True
+
+# 进程级共享的模型缓存，首次使用时创建
+_model_cache = None
+_model_cache_lock = threading.Lock()
+
+def get_model_cache():
+    """获取进程级共享的模型缓存。"""
+    global _model_cache
+    with _model_cache_lock:
+        if _model_cache is None:
+            _model_cache = ModelCache()
+        return _model_cache
+
+def configure_model_cache(directory=MODEL_CACHE_DIR, max_mb=MODEL_CACHE_MAX_MB):
+    """以新的目录与容量上限重建进程级模型缓存
+
+    Args:
+        directory (str): 缓存目录，相对路径相对于项目根目录
+        max_mb (float): 容量上限 (MB)
+    """
+    global _model_cache
+    if not os.path.isabs(directory):
+        directory = os.path.join(PROJECT_ROOT, directory)
+    with _model_cache_lock:
+        _model_cache = ModelCache(directory, int(max_mb * 1024 * 1024))
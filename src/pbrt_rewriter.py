@@ -0,0 +1,203 @@
+"""
+PBRT 场景文件的流式分词与改写
+按 PBRT 的词法 (关键字、字符串、数值、方括号、注释) 单遍扫描模型文件，
+把模型自己定义的命名材料、纹理与对象加上模型的命名空间，
+空字符串命名的材料依次生成唯一名称。注释与字符串中的内容不会被误改。
+"""
+
+import re
+
+# 单个词法单元：空白、注释、字符串 (可能未闭合)、方括号、关键字或数值
+_TOKEN = re.compile(r'\s+|#[^\n]*|"(?:[^"\\\n]|\\.)*(?P<close>")?|\[|\]|[^\s"\[\]#]+')
+
+# 各指令开头的位置参数 (字符串) 个数，未列出的指令为 1 个
+POSITIONAL_ARGS = {
+    'Texture': 3,
+    'MediumInterface': 2,
+    'Option': 0,
+}
+
+# 定义与引用命名实体的指令：{指令: (实体类型, 是否为定义)}
+_NAMED_DIRECTIVES = {
+    'MakeNamedMaterial': ('material', True),
+    'NamedMaterial': ('material', False),
+    'Texture': ('texture', True),
+    'ObjectBegin': ('object', True),
+    'ObjectInstance': ('object', False),
+}
+
+# 不能出现在 ObjectBegin/ObjectEnd 实例定义中的指令
+INSTANCE_UNSUPPORTED = ('ObjectBegin', 'ObjectInstance', 'LightSource', 'AreaLightSource')
+
+# 不是指令的裸词 (布尔参数值)
+_BARE_VALUES = ('true', 'false')
+
+class PBRTRewriter:
+    """为单个模型的命名实体加上命名空间的流式改写器"""
+
+    def __init__(self, namespace):
+        """初始化改写器
+
+        Args:
+            namespace (str): 命名空间，通常为模型UUID
+        """
+        self.namespace = namespace
+        self.defined = {'material': set(), 'texture': set(), 'object': set()}
+        self.anonymous_materials = 0
+        # 模型能否整体放入 ObjectBegin/ObjectEnd 作为实例定义
+        self.instanceable = True
+        self._anonymous = None
+        self._pending = ''
+
+        self._directive = None
+        self._positional = 0
+        self._param = False
+        self._param_kind = None
+        self._in_list = False
+        self._list_kind = None
+
+    def _name(self, name):
+        return f"{self.namespace}:{name}"
+
+    def _define(self, kind, name):
+        if kind == 'material' and name == '':
+            # 每个空字符串命名的材料都是新的材料，随后的 NamedMaterial "" 引用最近的一个
+            self.anonymous_materials += 1
+            self._anonymous = self._name(f"anonymous-{self.anonymous_materials}")
+            return self._anonymous
+        self.defined[kind].add(name)
+        return self._name(name)
+
+    def _reference(self, token, close, kind):
+        """改写对命名实体的引用，模型未定义的名称 (场景中的全局实体) 保持不变"""
+        if kind is None or close is None:
+            return token
+        name = token[1:-1]
+        if kind == 'material' and name == '' and self._anonymous:
+            return f'"{self._anonymous}"'
+        if name in self.defined[kind]:
+            return f'"{self._name(name)}"'
+        return token
+
+    def _start_directive(self, name):
+        self._directive = name
+        if name in INSTANCE_UNSUPPORTED:
+            self.instanceable = False
+        self._positional = POSITIONAL_ARGS.get(name, 1)
+        self._param = False
+        self._in_list = False
+
+    def _string(self, token, close):
+        if self._in_list:
+            return self._reference(token, close, self._list_kind)
+
+        if self._positional:
+            # 指令的位置参数
+            index = POSITIONAL_ARGS.get(self._directive, 1) - self._positional
+            self._positional -= 1
+            named = _NAMED_DIRECTIVES.get(self._directive)
+            if index != 0 or named is None or close is None:
+                return token
+            kind, is_definition = named
+            if is_definition:
+                return f'"{self._define(kind, token[1:-1])}"'
+            return self._reference(token, close, kind)
+
+        if not self._param:
+            # 参数声明，例如 "texture reflectance" 或 "string materials"
+            self._param = True
+            declaration = token[1:-1].split()
+            if len(declaration) == 2 and declaration[0] == 'texture':
+                self._param_kind = 'texture'
+            elif declaration == ['string', 'materials']:
+                self._param_kind = 'material'
+            else:
+                self._param_kind = None
+            return token
+
+        # 不带方括号的单个参数值
+        self._param = False
+        return self._reference(token, close, self._param_kind)
+
+    def _process(self, text, out, final):
+        """处理缓冲区中的完整词法单元
+
+        Returns:
+            int: 已处理到的位置，之后的内容可能是不完整的词法单元
+        """
+        pos = 0
+        length = len(text)
+        while pos < length:
+            if self._in_list and self._list_kind is None:
+                # 与命名实体无关的数值列表 (顶点、索引等) 原样整段复制，不逐个分词
+                # 直到列表结束或遇到注释、字符串为止
+                stop = length
+                for char in (']', '#', '"'):
+                    found = text.find(char, pos, stop)
+                    if found >= 0:
+                        stop = found
+                if stop > pos:
+                    out.append(text[pos:stop])
+                    pos = stop
+                    continue
+
+            match = _TOKEN.match(text, pos)
+            token = match.group()
+            close = match.group('close')
+            if not final:
+                if match.end() == length:
+                    return pos
+                if token[0] == '"' and close is None and match.end() >= length - 1:
+                    # 字符串在缓冲区末尾被截断
+                    return pos
+            pos = match.end()
+
+            first = token[0]
+            if first.isspace() or first == '#':
+                out.append(token)
+            elif first == '"':
+                out.append(self._string(token, close))
+            elif first == '[':
+                self._in_list = True
+                self._list_kind = self._param_kind if self._param else None
+                out.append(token)
+            elif first == ']':
+                self._in_list = False
+                self._list_kind = None
+                self._param = False
+                out.append(token)
+            elif token == 'AttributeEndAttributeBegin':
+                # 相邻模型首尾相连时补上换行
+                self._start_directive('AttributeBegin')
+                out.append('AttributeEnd\nAttributeBegin')
+            elif first.isalpha() and token not in _BARE_VALUES:
+                self._start_directive(token)
+                out.append(token)
+            else:
+                # 数值或布尔值
+                if not self._in_list:
+                    self._param = False
+                out.append(token)
+        return pos
+
+    def feed(self, text):
+        """处理一段文本
+
+        Args:
+            text (str): 新到达的文本
+
+        Returns:
+            str: 可以直接写出的改写结果
+        """
+        text = self._pending + text
+        out = []
+        pos = self._process(text, out, final=False)
+        self._pending = text[pos:]
+        return ''.join(out)
+
+    def flush(self):
+        """处理并返回缓冲区中剩余的文本"""
+        text, self._pending = self._pending, ''
+        out = []
+        self._process(text, out, final=True)
+        return ''.join(out)
@@ -0,0 +1,521 @@
+"""
+内联三角网格转换为二进制 PLY
+云端返回的模型为文本 PBRT，大型 Shape "trianglemesh" 的顶点与索引数组传输慢、pbrt 解析也慢。
+本模块在场景组装前把顶点数超过阈值的内联网格写为二进制 (可选 gzip 压缩) PLY 文件，
+模型中的网格改为 Shape "plymesh" 引用。转换结果按模型内容的哈希缓存在模型缓存中，
+同一模型内容只转换一次；PLY 文件以自身内容的哈希命名，相同的网格只保存一份。
+"""
+
+import codecs
+import gzip
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from array import array
+
+from .model_cache import derived_dir
+from .pbrt_rewriter import _BARE_VALUES, _TOKEN
+from .scene_assembly import iter_file_chunks
+
+# 场景目录中存放 PLY 网格文件的子目录 (plymesh 的路径相对于主场景文件)
+MESHES_SUBDIR = 'meshes'
+
+# 顶点数不少于该值的内联网格才转换为 PLY
+PLY_MIN_VERTICES = 1024
+
+# 可以写入 PLY 的网格参数：{参数名: (允许的类型, 是否为整数)}
+_MESH_PARAMS = {
+    'P': (('point3', 'point'), False),
+    'indices': (('integer',), True),
+    'N': (('normal', 'normal3'), False),
+    'uv': (('point2', 'float'), False),
+    'faceIndices': (('integer',), True),
+}
+
+# plymesh 不支持的网格参数，含有这些参数的网格保持原样
+_UNSUPPORTED_PARAMS = ('S',)
+
+# 网格语句原文在内存中保留的最大字符数，超过后转存到临时文件
+_RAW_SPOOL_SIZE = 1024 * 1024
+
+def _little_endian(values):
+    """返回小端字节序的数组 (大端平台上复制后交换字节序)"""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+def _ply_bytes(points, indices, normals=None, uvs=None, face_indices=None):
+    """把网格数据编码为 binary_little_endian 格式的 PLY 文件内容
+
+    Args:
+        points (array): 顶点坐标 array('f')
+        indices (array): 三角形顶点索引 array('i')
+        normals (array, optional): 法线 array('f')
+        uvs (array, optional): 纹理坐标 array('f')
+        face_indices (array, optional): 面编号 array('i')
+    """
+    vertex_count = len(points) // 3
+    face_count = len(indices) // 3
+
+    header = ['ply', 'format binary_little_endian 1.0', f'element vertex {vertex_count}',
+              'property float x', 'property float y', 'property float z']
+    columns = [points[0::3], points[1::3], points[2::3]]
+    if normals:
+        header += ['property float nx', 'property float ny', 'property float nz']
+        columns += [normals[0::3], normals[1::3], normals[2::3]]
+    if uvs:
+        header += ['property float u', 'property float v']
+        columns += [uvs[0::2], uvs[1::2]]
+    header += [f'element face {face_count}', 'property list uchar int vertex_indices']
+    if face_indices:
+        header.append('property int face_indices')
+    header.append('end_header')
+
+    # 顶点属性按顶点交错排列
+    stride = len(columns)
+    vertices = array('f', bytes(4 * vertex_count * stride))
+    for offset, column in enumerate(columns):
+        vertices[offset::stride] = column
+
+    # 每个面为 1 字节的顶点数 (3) 加上各个 4 字节整数，按字节交错写入
+    face_columns = [indices[0::3], indices[1::3], indices[2::3]]
+    if face_indices:
+        face_columns.append(face_indices)
+    record = 1 + 4 * len(face_columns)
+    faces = bytearray(record * face_count)
+    faces[0::record] = bytes([3]) * face_count
+    for column_index, column in enumerate(face_columns):
+        data = _little_endian(column).tobytes()
+        for byte in range(4):
+            faces[1 + 4 * column_index + byte::record] = data[byte::4]
+
+    return ('\n'.join(header) + '\n').encode('ascii') + _little_endian(vertices).tobytes() + bytes(faces)
+
+def _skipped(reason):
+    """记录未转换的网格，网格保持原样写出"""
+    print(f"内联网格未转换为 PLY，保持原样: {reason}")
+    return None
+
+class _MeshStatement:
+    """正在读取的 Shape "trianglemesh" 语句
+
+    网格参数的数值随词法单元到达直接存入 array('f') / array('i')；其余参数 (例如 alpha)
+    去掉注释后原样保留。语句原文另外保存 (较大时转存到临时文件)，网格不转换时原样写出。
+    """
+
+    def __init__(self, head):
+        self.values = {}
+        self.passthrough = []
+        self._pieces = [head]
+        self._size = len(head)
+        self._file = None
+        # 正在读取的参数：'declaration' 等待参数声明，'value' 等待单个值或列表，'list' 在列表中
+        self._state = 'declaration'
+        self._name = None
+        self._array = None
+        self._param_text = None
+
+    def _keep(self, text):
+        """保存语句原文"""
+        if self._file is not None:
+            self._file.write(text)
+            return
+        self._pieces.append(text)
+        self._size += len(text)
+        if self._size > _RAW_SPOOL_SIZE:
+            self._file = tempfile.TemporaryFile('w+', encoding='utf-8', newline='')
+            self._file.writelines(self._pieces)
+            self._pieces = None
+
+    def text(self):
+        """语句原文"""
+        if self._file is None:
+            return ''.join(self._pieces)
+        self._file.seek(0)
+        return self._file.read()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    @property
+    def complete(self):
+        """最后一个参数是否完整"""
+        return self._state == 'declaration'
+
+    def _end_param(self):
+        if self._param_text is not None:
+            self.passthrough.append(''.join(self._param_text))
+        self._state = 'declaration'
+        self._name = self._array = self._param_text = None
+
+    def numbers(self, text):
+        """处理列表中一段完整的数值文本
+
+        Returns:
+            str: 网格不能转换的原因，可以继续时为 None
+        """
+        self._keep(text)
+        if self._param_text is not None:
+            self._param_text.append(text)
+            return None
+        try:
+            self._array.extend(map(int if self._array.typecode == 'i' else float, text.split()))
+        except (ValueError, OverflowError):
+            return f"参数 {self._name} 含有无法解析的数值"
+        return None
+
+    def token(self, token, closed):
+        """处理一个词法单元
+
+        Args:
+            token (str): 词法单元
+            closed (bool): 字符串是否有结束的引号
+
+        Returns:
+            str: 网格不能转换的原因，可以继续时为 None
+        """
+        self._keep(token)
+        first = token[0]
+        if first == '#':
+            return None
+        if first.isspace():
+            if self._param_text is not None:
+                self._param_text.append(token)
+            return None
+
+        if self._state == 'declaration':
+            if first != '"' or not closed:
+                return "参数列表无法解析"
+            declaration = token[1:-1].split()
+            if len(declaration) != 2:
+                return f"参数声明 {token[1:-1]!r} 无法解析"
+            param_type, name = declaration
+            if name in _UNSUPPORTED_PARAMS:
+                return f"plymesh 不支持参数 {name}"
+            self._state = 'value'
+            if name not in _MESH_PARAMS:
+                # 其余参数 (例如 alpha) plymesh 同样支持，原样保留
+                self._param_text = [token]
+                return None
+            types, integer = _MESH_PARAMS[name]
+            if param_type not in types:
+                return f"参数 {name} 的类型 {param_type} 不受支持"
+            self._name = name
+            self._array = self.values[name] = array('i' if integer else 'f')
+            return None
+
+        if first == '[' or first == ']':
+            if (first == '[') != (self._state == 'value'):
+                return "参数列表无法解析"
+            if self._param_text is not None:
+                self._param_text.append(token)
+            if first == '[':
+                self._state = 'list'
+            else:
+                self._end_param()
+            return None
+
+        if self._param_text is not None:
+            self._param_text.append(token)
+        elif first == '"':
+            return f"参数 {self._name} 含有无法解析的数值"
+        else:
+            try:
+                self._array.append(int(token) if self._array.typecode == 'i' else float(token))
+            except (ValueError, OverflowError):
+                return f"参数 {self._name} 含有无法解析的数值"
+        if self._state == 'value':
+            self._end_param()
+        return None
+
+class TriangleMeshExtractor:
+    """把大型内联三角网格流式替换为 plymesh 引用的转换器"""
+
+    def __init__(self, mesh_dir, min_vertices=PLY_MIN_VERTICES, compress=False):
+        """初始化转换器
+
+        Args:
+            mesh_dir (str): 写入 PLY 文件的目录
+            min_vertices (int): 转换的最小顶点数
+            compress (bool): 是否写为 gzip 压缩的 .ply.gz
+        """
+        self.mesh_dir = mesh_dir
+        self.min_vertices = min_vertices
+        self.compress = compress
+        # 已写出的 PLY 文件名
+        self.meshes = []
+        self._pending = ''
+
+        self._in_list = False
+        # 尚未读到形状类型的 Shape 语句，None 表示不在 Shape 语句开头
+        self._shape = None
+        # 正在读取的网格语句
+        self._mesh = None
+
+    def _write_mesh(self, data):
+        """写出 PLY 文件，返回相对于主场景文件的路径"""
+        filename = hashlib.sha256(data).hexdigest()[:16] + ('.ply.gz' if self.compress else '.ply')
+        path = os.path.join(self.mesh_dir, filename)
+        if not os.path.exists(path):
+            if self.compress:
+                with open(path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+                    f.write(data)
+            else:
+                with open(path, 'wb') as f:
+                    f.write(data)
+            self.meshes.append(filename)
+        return f"{MESHES_SUBDIR}/{filename}"
+
+    def _convert(self, mesh):
+        """把读完的网格语句转换为 plymesh 引用
+
+        Returns:
+            str: 替换后的语句，网格过小或含有不能转换的内容时为 None
+        """
+        if not mesh.complete:
+            return _skipped("参数列表无法解析")
+        values = mesh.values
+        points = values.get('P')
+        indices = values.get('indices')
+        if not points or not indices or len(points) % 3 or len(indices) % 3:
+            return _skipped("缺少顶点或索引，或数量不是 3 的倍数")
+        vertex_count = len(points) // 3
+        if vertex_count < self.min_vertices:
+            return None
+        normals, uvs, face_indices = values.get('N'), values.get('uv'), values.get('faceIndices')
+        if ((normals and len(normals) != len(points)) or (uvs and len(uvs) != 2 * vertex_count)
+                or (face_indices and len(face_indices) != len(indices) // 3)
+                or min(indices) < 0 or max(indices) >= vertex_count):
+            return _skipped("法线、纹理坐标或索引的数量与顶点不符")
+
+        relative_path = self._write_mesh(_ply_bytes(points, indices, normals, uvs, face_indices))
+        statement = f'Shape "plymesh" "string filename" "{relative_path}"'
+        if mesh.passthrough:
+            statement += ' ' + ' '.join(mesh.passthrough)
+        return statement + '\n'
+
+    def _release(self, reason=None):
+        """结束当前网格语句，返回转换后的或原样的文本
+
+        Args:
+            reason (str, optional): 网格不能转换的原因；给出时直接写出原文
+        """
+        mesh, self._mesh = self._mesh, None
+        try:
+            converted = _skipped(reason) if reason else self._convert(mesh)
+            return converted or mesh.text()
+        finally:
+            mesh.close()
+
+    def _end_statement(self, out):
+        """新的指令结束正在读取的 Shape 语句"""
+        if self._shape is not None:
+            out.append(''.join(self._shape))
+            self._shape = None
+        if self._mesh is not None:
+            out.append(self._release())
+
+    def _process(self, text, out, final):
+        """处理缓冲区中的完整词法单元
+
+        Returns:
+            int: 已处理到的位置，之后的内容可能是不完整的词法单元
+        """
+        pos = 0
+        length = len(text)
+        while pos < length:
+            if self._in_list:
+                # 方括号列表中的数值整段处理，直到列表结束或遇到注释、字符串为止
+                stop = length
+                for char in (']', '#', '"'):
+                    found = text.find(char, pos, stop)
+                    if found >= 0:
+                        stop = found
+                if self._mesh is not None and stop == length and not final:
+                    # 末尾的数值可能被截断，留到下一段文本
+                    stop = max(text.rfind(char, pos) for char in ' \t\r\n') + 1
+                    if stop <= pos:
+                        return pos
+                if stop > pos:
+                    piece = text[pos:stop]
+                    pos = stop
+                    if self._mesh is not None:
+                        reason = self._mesh.numbers(piece)
+                        if reason:
+                            out.append(self._release(reason))
+                    else:
+                        (out if self._shape is None else self._shape).append(piece)
+                    continue
+
+            match = _TOKEN.match(text, pos)
+            token = match.group()
+            close = match.group('close')
+            if not final:
+                if match.end() == length:
+                    return pos
+                if token[0] == '"' and close is None and match.end() >= length - 1:
+                    # 字符串在缓冲区末尾被截断
+                    return pos
+            pos = match.end()
+
+            first = token[0]
+            if first == '[':
+                self._in_list = True
+            elif first == ']':
+                self._in_list = False
+            elif first.isalpha() and not self._in_list and token not in _BARE_VALUES:
+                self._end_statement(out)
+                if token == 'Shape':
+                    self._shape = [token]
+                    continue
+            elif first == '"' and self._shape is not None:
+                head = ''.join(self._shape) + token
+                self._shape = None
+                if token == '"trianglemesh"':
+                    self._mesh = _MeshStatement(head)
+                else:
+                    # 其他形状不需要转换，直接写出
+                    out.append(head)
+                continue
+
+            if self._mesh is not None:
+                reason = self._mesh.token(token, close is not None)
+                if reason:
+                    out.append(self._release(reason))
+            else:
+                (out if self._shape is None else self._shape).append(token)
+        return pos
+
+    def feed(self, text):
+        """处理一段文本
+
+        Args:
+            text (str): 新到达的文本
+
+        Returns:
+            str: 可以直接写出的转换结果 (正在读取的网格语句留到语句结束后写出)
+        """
+        text = self._pending + text
+        out = []
+        pos = self._process(text, out, final=False)
+        self._pending = text[pos:]
+        return ''.join(out)
+
+    def flush(self):
+        """处理并返回缓冲区中剩余的文本"""
+        text, self._pending = self._pending, ''
+        out = []
+        self._process(text, out, final=True)
+        self._end_statement(out)
+        return ''.join(out)
+
+def _read_converted(directory):
+    """读取缓存的转换结果
+
+    Returns:
+        tuple: (转换后的模型文件路径, PLY 文件路径列表)；目录内容不完整时为 None
+    """
+    model_path = next((os.path.join(directory, filename) for filename in os.listdir(directory)
+                       if filename.endswith('.pbrt')), None)
+    mesh_dir = os.path.join(directory, MESHES_SUBDIR)
+    if model_path is None or not os.path.isdir(mesh_dir):
+        return None
+    mesh_paths = [os.path.join(mesh_dir, filename) for filename in sorted(os.listdir(mesh_dir))]
+    return model_path, mesh_paths
+
+def convert_model_meshes(source_path, min_vertices=PLY_MIN_VERTICES, compress=False):
+    """把缓存中模型的大型内联网格转换为 PLY，结果缓存在该模型内容的派生目录中
+
+    转换后的模型文件以其内容的 SHA-256 命名，与缓存中的模型文件一样可以直接用于场景组装。
+
+    Args:
+        source_path (str): 模型缓存文件路径
+        min_vertices (int): 转换的最小顶点数
+        compress (bool): 是否写为 gzip 压缩的 .ply.gz
+
+    Returns:
+        tuple: (转换后的模型文件路径, PLY 文件路径列表)
+
+    Raises:
+        ValueError: 模型不是有效的 UTF-8 文本
+        OSError: 读写缓存失败
+    """
+    variant = f"ply-{min_vertices}{'-gz' if compress else ''}"
+    parent = derived_dir(source_path)
+    directory = os.path.join(parent, variant)
+    if os.path.isdir(directory):
+        converted = _read_converted(directory)
+        if converted is not None:
+            return converted
+        # 缓存的转换结果不完整，丢弃后重新转换
+        shutil.rmtree(directory, ignore_errors=True)
+
+    os.makedirs(parent, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(dir=parent, prefix='.' + variant + '.', suffix='.part')
+    try:
+        mesh_dir = os.path.join(temp_dir, MESHES_SUBDIR)
+        os.makedirs(mesh_dir)
+        extractor = TriangleMeshExtractor(mesh_dir, min_vertices, compress)
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        sha256 = hashlib.sha256()
+        temp_path = os.path.join(temp_dir, '.model.part')
+        with open(temp_path, 'wb') as out:
+            for chunk in iter_file_chunks(source_path):
+                data = extractor.feed(decoder.decode(chunk)).encode('utf-8')
+                sha256.update(data)
+                out.write(data)
+            data = (extractor.feed(decoder.decode(b'', final=True)) + extractor.flush()).encode('utf-8')
+            sha256.update(data)
+            out.write(data)
+        os.replace(temp_path, os.path.join(temp_dir, sha256.hexdigest() + '.pbrt'))
+        try:
+            os.rename(temp_dir, directory)
+        except OSError:
+            # 其他进程已完成同一转换
+            if not os.path.isdir(directory):
+                raise
+    finally:
+        if os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+
+    converted = _read_converted(directory)
+    if converted is None:
+        raise OSError(f"模型网格的转换结果不完整: {directory}")
+    return converted
+
+def install_mesh_files(scene_dir, mesh_paths):
+    """把缓存中的 PLY 文件放入场景目录 (优先使用硬链接)
+
+    Args:
+        scene_dir (str): 场景目录
+        mesh_paths (list): 缓存中的 PLY 文件路径
+
+    Returns:
+        set: PLY 文件相对于场景目录的路径
+    """
+    mesh_dir = os.path.join(scene_dir, MESHES_SUBDIR)
+    os.makedirs(mesh_dir, exist_ok=True)
+    installed = set()
+    for source in mesh_paths:
+        filename = os.path.basename(source)
+        path = os.path.join(mesh_dir, filename)
+        if not os.path.exists(path):
+            try:
+                os.link(source, path)
+            except OSError:
+                # 跨文件系统等无法硬链接时复制
+                fd, temp_path = tempfile.mkstemp(dir=mesh_dir, prefix='.' + filename + '.', suffix='.part')
+                try:
+                    with os.fdopen(fd, 'wb') as f, open(source, 'rb') as src:
+                        shutil.copyfileobj(src, f)
+                    os.chmod(temp_path, 0o644)
+                    os.replace(temp_path, path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+        installed.add(f"{MESHES_SUBDIR}/{filename}")
+    return installed
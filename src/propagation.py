@@ -0,0 +1,64 @@
+import numpy as np
+from sgp4.api import Satrec, SatrecArray, jday
+from skyfield.sgp4lib import TEME
+
+from .satellite_registry import get_registry
+
+def satrec_from_tle(tle_lines):
+    """由TLE两行文本获取 SGP4 记录 (经进程级注册表缓存)。
+
+    Args:
+        tle_lines (list): [tle1_line, tle2_line]
+
+    Returns:
+        Satrec: 初始化后的 SGP4 记录
+    """
+    return get_registry().get_satrec(tle_lines)
+
+def _utc_jd_parts(t):
+    """返回 SGP4 所需的 UTC 儒略日整数部分与小数部分 (与 Skyfield 的 EarthSatellite 一致)。"""
+    year, month, day, hour, minute, second = (np.atleast_1d(np.asarray(value, dtype=np.float64)) for value in t.utc)
+    return jday(year, month, day, hour, minute, second)
+
+def propagate_teme_km(satrecs, t):
+    """批量传播 N 颗卫星在 M 个时刻的 TEME 位置。
+
+    Args:
+        satrecs (list): Satrec 对象列表 (N 个)
+        t: Skyfield Time 对象，可以是单个时刻或含 M 个时刻的数组
+
+    Returns:
+        tuple: (positions, errors)
+               positions 为 (N, M, 3) 的 TEME 坐标 (km)
+               errors 为 (N, M) 的 SGP4 错误码，0 表示正常
+    """
+    whole, fraction = _utc_jd_parts(t)
+    if not satrecs:
+        return np.empty((0, len(whole), 3)), np.empty((0, len(whole)), dtype=np.uint8)
+    errors, positions, _ = SatrecArray(list(satrecs)).sgp4(whole, fraction)
+    return positions, errors
+
+def propagate_gcrs_km(tles, t):
+    """批量计算 N 颗卫星在 M 个时刻的 GCRS 坐标。
+
+    一次调用完成所有卫星与时刻的 SGP4 传播，再统一做 TEME→GCRS 旋转。
+    得到的是几何地心位置，不含周年光行差；与太阳、月球放在同一场景中时
+    需再经 coordinates.geocentric_to_gcrs_km 转换。
+
+    Args:
+        tles (list): TLE 列表，每项为 [tle1_line, tle2_line] 或已初始化的 Satrec
+        t: Skyfield Time 对象，可以是单个时刻或含 M 个时刻的数组
+
+    Returns:
+        numpy.ndarray: (N, M, 3) 的 GCRS 坐标 (km)，SGP4 传播失败的点为 NaN
+    """
+    satrecs = [tle if isinstance(tle, Satrec) else satrec_from_tle(tle) for tle in tles]
+    teme, errors = propagate_teme_km(satrecs, t)
+
+    # TEME.rotation_at(t) 为 GCRS→TEME 的旋转矩阵，这里使用其转置
+    rotation = TEME.rotation_at(t)
+    if rotation.ndim == 2:
+        rotation = rotation[:, :, np.newaxis]
+    positions = np.einsum('jim,nmj->nmi', rotation, teme)
+    positions[errors != 0] = np.nan
+    return positions
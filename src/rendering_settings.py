@@ -19,8 +19,9 @@ ColorSpace "rec2020" # 使用 rec2020 色彩空间 (Use rec2020 color space)
 
 """
 
-rs_items = -7
+from .scene_graph import LookAt, Camera, Sampler, Integrator, Film, PixelFilter, ColorSpace
 
+# 以下函数是场景图节点 (见 scene_graph.py) 的适配器，返回节点序列化后的文本行
 
 def set_lookat(cam_coord, to_coord=None, up_coord=None):
     """设置 LookAt 参数。
@@ -33,15 +34,7 @@ def set_lookat(cam_coord, to_coord=None, up_coord=None):
     Returns:
         list: 包含 LookAt 参数行的列表。
     """
-    if to_coord is None:
-        to_coord = [0.0, 0.0, 0.0]
-    if up_coord is None:
-        up_coord = [0.0, 0.0, 1.0]
-    global rs_items
-    rs_items += 1
-    return [f'LookAt {cam_coord[0]}  {cam_coord[1]}  {cam_coord[2]}',
-            f'       {to_coord[0]}  {to_coord[1]}  {to_coord[2]}',
-            f'       {up_coord[0]}  {up_coord[1]}  {up_coord[2]}']
+    return LookAt(cam_coord, to_coord, up_coord).lines()
 
 def set_camera(cam_type=None, fov=None):
     """设置相机参数。
@@ -53,13 +46,7 @@ def set_camera(cam_type=None, fov=None):
     Returns:
         list: 包含相机参数行的列表。
     """
-    if cam_type is None:
-        cam_type = 'perspective'
-    if fov is None:
-        fov = 60.0
-    global rs_items
-    rs_items += 1
-    return [f'Camera "{cam_type}" "float fov" {fov}']
+    return Camera(cam_type, fov).lines()
 
 def set_sampler(type=None, samples=None):
     """设置采样器参数。
@@ -71,13 +58,7 @@ def set_sampler(type=None, samples=None):
     Returns:
         list: 包含采样器参数行的列表。
     """
-    if type is None:
-        type = 'halton'
-    if samples is None:
-        samples = 64
-    global rs_items
-    rs_items += 1
-    return [f'Sampler "{type}" "integer pixelsamples" {samples}']
+    return Sampler(type, samples).lines()
 
 def set_integrator(type=None, maxdepth=None):
     """设置积分器参数。
@@ -89,13 +70,7 @@ def set_integrator(type=None, maxdepth=None):
     Returns:
         list: 包含积分器参数行的列表。
     """
-    if type is None:
-        type = 'volpath'
-    if maxdepth is None:
-        maxdepth = 5
-    global rs_items
-    rs_items += 1
-    return [f'Integrator "{type}" "integer maxdepth" {maxdepth}']
+    return Integrator(type, maxdepth).lines()
 
 def set_film(x=None, y=None, diagonal=None):
     """设置胶片参数。
@@ -108,18 +83,7 @@ def set_film(x=None, y=None, diagonal=None):
     Returns:
         list: 包含胶片参数行的列表。
     """
-    if x is None:
-        x = 800
-    if y is None:
-        y = 600
-    if diagonal is None:
-        diagonal = 70.0 # millimeter
-    global rs_items
-    rs_items += 1
-    return [f'Film "spectral" "string filename" "1.exr"',
-            f'     "integer xresolution" [{x}]',
-            f'     "integer yresolution" [{y}]',
-            f'     "float diagonal" [{diagonal}]',]
+    return Film(x, y, diagonal).lines()
 
 def set_pixel_filter():
     """设置像素过滤器参数。
@@ -127,9 +91,7 @@ def set_pixel_filter():
     Returns:
         list: 包含像素过滤器参数行的列表。
     """
-    global rs_items
-    rs_items += 1
-    return [f'PixelFilter "gaussian" "float xradius" 1 "float yradius" 1']
+    return PixelFilter().lines()
 
 def set_color_space(space=None):
     """设置色彩空间参数。
@@ -140,22 +102,7 @@ def set_color_space(space=None):
     Returns:
         list: 包含色彩空间参数行的列表。
     """
-    if space is None:
-        space = 'rec2020'
-    global rs_items
-    rs_items += 1
-    return []#[f'ColorSpace "{space}"']
-
-def rendering_settings_checker():
-    """检查渲染设置是否已全部设置。
-
-    Returns:
-        bool: 如果渲染设置已全部设置，则返回 True，否则返回 False。
-    """
-    global rs_items
-    if rs_items >= 0:
-        return True
-    return False
+    return ColorSpace(space).lines()
 
 def r_settings_overwriter(path, list_of_lists):
     """覆盖渲染设置文件。
@@ -165,18 +112,15 @@ def r_settings_overwriter(path, list_of_lists):
         list_of_lists (list): 包含渲染设置行的列表的列表。
 
     Returns:
-        list: 如果渲染设置未更改或 list_of_lists 为空，则返回空列表。
+        list: 如果 list_of_lists 为空，则返回空列表。
     """
-    if rendering_settings_checker() is False:
-        return []
     if len(list_of_lists) >= 1:
         pass
     else:
         return []
-    from .file_write import overwrite_file, write_line_to_file_loop_with_newline
-    overwrite_file(path, "")
-    for mylist in list_of_lists:
-        for line in mylist:
-            write_line_to_file_loop_with_newline(path, line)
-        write_line_to_file_loop_with_newline(path, '')
-    print('r_settings write done')
\ No newline at end of file
+    from .file_write import PBRTWriter
+    with PBRTWriter(path) as writer:
+        for mylist in list_of_lists:
+            writer.write_lines(mylist)
+            writer.write_lines([''])
+    print('r_settings write done')
@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+from sgp4.api import Satrec
+from skyfield.api import EarthSatellite
+
+class SatelliteRegistry:
+    """进程内的 SGP4 记录注册表
+
+    以 (NORAD编号, tle1_line, tle2_line) 为键缓存已初始化的 Satrec，
+    同一组TLE在进程内只初始化一次。采用有界 LRU 淘汰，并用锁保护，
+    可在主线程与可视化线程之间共享。
+    """
+
+    def __init__(self, max_size=4096):
+        """初始化注册表
+
+        Args:
+            max_size (int): 最多缓存的记录数量
+        """
+        self.max_size = max_size
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_satrec(self, tle_lines):
+        """获取TLE对应的 Satrec，未命中时初始化并缓存
+
+        Args:
+            tle_lines (list): [tle1_line, tle2_line]
+
+        Returns:
+            Satrec: 已初始化的 SGP4 记录
+        """
+        line1, line2 = tle_lines[0], tle_lines[1]
+        key = (line1[2:7].strip(), line1, line2)
+        with self._lock:
+            satrec = self._records.get(key)
+            if satrec is not None:
+                self._records.move_to_end(key)
+                self.hits += 1
+                return satrec
+
+            self.misses += 1
+            satrec = Satrec.twoline2rv(line1, line2)
+            self._records[key] = satrec
+            if len(self._records) > self.max_size:
+                self._records.popitem(last=False)
+            return satrec
+
+    def get_satellite(self, tle_lines, name, ts):
+        """获取TLE对应的 Skyfield EarthSatellite 对象 (共享同一个 Satrec)
+
+        Args:
+            tle_lines (list): [tle1_line, tle2_line]
+            name (str): 卫星名称
+            ts: 时间刻度对象
+
+        Returns:
+            EarthSatellite: 卫星对象
+        """
+        satellite = EarthSatellite.from_satrec(self.get_satrec(tle_lines), ts)
+        satellite.name = name
+        return satellite
+
+    def invalidate(self):
+        """清空注册表 (TLE缓存刷新后调用)"""
+        with self._lock:
+            self._records.clear()
+
+    def stats(self):
+        """返回命中统计
+
+        Returns:
+            dict: 包含 hits、misses、size 的字典
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._records)}
+
+# 进程级共享注册表
+_registry = SatelliteRegistry()
+
+def get_registry():
+    """获取进程级共享的卫星注册表。"""
+    return _registry
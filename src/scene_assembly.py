@@ -0,0 +1,293 @@
+"""
+流式场景组装
+模型文件按块读取，经增量解码与命名空间改写 (见 pbrt_rewriter) 后直接写入合并场景文件，
+内存占用只与块大小有关，不再需要临时文件与整文件的后处理。
+"""
+
+import codecs
+import os
+import tarfile
+import tempfile
+from collections import Counter
+
+from .file_write import PBRTWriter
+from .pbrt_rewriter import PBRTRewriter
+
+# 读取与写入模型文件的块大小 (字节)
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+def iter_file_chunks(path, chunk_size=STREAM_CHUNK_SIZE):
+    """按块读取文件"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def model_namespace(model_uuid, copy=0):
+    """模型命名实体的命名空间
+
+    同一模型在场景中逐个放置多份时，每份使用各自的命名空间，避免命名材料等重复定义。
+
+    Args:
+        model_uuid (str): 模型UUID
+        copy (int): 该模型在场景中的第几份 (从0开始)
+    """
+    return model_uuid if copy == 0 else f"{model_uuid}#{copy}"
+
+def write_placed_model(out, chunks, model_uuid, translate, copy=0):
+    """把模型包在属性块中平移到指定位置，流式写入输出文件
+
+    Args:
+        out: 以二进制模式打开的输出文件
+        chunks (iterable): 未经变换的模型文件内容 (bytes 块)
+        model_uuid (str): 模型UUID
+        translate (list): 平移量 [x, y, z] (km)
+        copy (int): 该模型在场景中的第几份
+
+    Raises:
+        ValueError: 模型不是有效的 UTF-8 文本
+    """
+    x, y, z = translate
+    out.write(f"AttributeBegin\n  Translate {x} {y} {z}\n".encode('utf-8'))
+    _write_rewritten(out, chunks, PBRTRewriter(model_namespace(model_uuid, copy)))
+    out.write(b"\nAttributeEnd\n")
+
+def _write_rewritten(out, chunks, rewriter):
+    """逐块解码、改写并写出模型内容"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in chunks:
+        out.write(rewriter.feed(decoder.decode(chunk)).encode('utf-8'))
+    out.write((rewriter.feed(decoder.decode(b'', final=True)) + rewriter.flush()).encode('utf-8'))
+
+def instance_name(model_uuid):
+    """模型实例定义的对象名称"""
+    return f"{model_uuid}:instance"
+
+def write_instance_definition(out, chunks, model_uuid):
+    """把模型写为 ObjectBegin/ObjectEnd 实例定义，几何只在场景中出现一次
+
+    Args:
+        out: 以二进制模式打开的输出文件
+        chunks (iterable): 未经变换的模型文件内容 (bytes 块)
+        model_uuid (str): 模型UUID
+
+    Returns:
+        bool: 模型能否作为实例定义；为 False 时 (模型自身含对象实例或光源)
+              已写入的内容无效，调用方应截掉并改为逐个放置
+
+    Raises:
+        ValueError: 模型不是有效的 UTF-8 文本
+    """
+    rewriter = PBRTRewriter(model_uuid)
+    out.write(f'ObjectBegin "{instance_name(model_uuid)}"\n'.encode('utf-8'))
+    _write_rewritten(out, chunks, rewriter)
+    out.write(b"\nObjectEnd\n")
+    return rewriter.instanceable
+
+def write_instance_definition_reference(out, relative_path, model_uuid):
+    """写入由 Include 引用模型文件的实例定义 (Include 保证文件内容在 ObjectBegin 作用域内解析)
+
+    Args:
+        out: 以二进制模式打开的主场景文件
+        relative_path (str): 模型文件相对于主场景文件的路径
+        model_uuid (str): 模型UUID
+    """
+    out.write(f'ObjectBegin "{instance_name(model_uuid)}"\n  Include "{relative_path}"\nObjectEnd\n'
+              .encode('utf-8'))
+
+def write_model_instance(out, model_uuid, translate):
+    """写入平移到指定位置的模型实例
+
+    Args:
+        out: 以二进制模式打开的输出文件
+        model_uuid (str): 模型UUID
+        translate (list): 平移量 [x, y, z] (km)
+    """
+    x, y, z = translate
+    out.write(f'AttributeBegin\n  Translate {x} {y} {z}\n  ObjectInstance "{instance_name(model_uuid)}"\n'
+              f'AttributeEnd\n'.encode('utf-8'))
+
+# 场景布局：single 为单个合并文件；import / include 为每个模型单独成文件，
+# 主文件只含公共头部与 Import / Include 指令 (pbrt-v4 在独立线程中解析 Import 的文件)
+SCENE_LAYOUTS = ('single', 'import', 'include')
+
+# 场景目录中存放模型文件的子目录
+MODELS_SUBDIR = 'models'
+
+# 独立模型文件末尾记录能否作为实例定义的注释
+_INSTANCEABLE_MARKER = '# pbrtgen instanceable: '
+
+def write_scene_model_file(scene_dir, model_uuid, source_path, copy=0):
+    """把缓存中的模型改写为场景目录中的独立模型文件
+
+    文件名包含缓存内容的哈希，同一模型内容只改写一次，之后的渲染直接复用。
+    文件末尾的注释行记录模型能否作为实例定义。
+
+    Args:
+        scene_dir (str): 场景目录
+        model_uuid (str): 模型UUID
+        source_path (str): 模型缓存文件路径 (文件名为内容的 SHA-256)
+        copy (int): 该模型在场景中的第几份，逐个放置多份时每份对应单独的文件
+
+    Returns:
+        tuple: (模型文件相对于场景目录的路径, 能否作为实例定义)
+
+    Raises:
+        ValueError: 模型不是有效的 UTF-8 文本
+    """
+    digest = os.path.splitext(os.path.basename(source_path))[0]
+    suffix = f"-{copy}" if copy else ''
+    relative_path = f"{MODELS_SUBDIR}/{model_uuid}-{digest[:12]}{suffix}.pbrt"
+    path = os.path.join(scene_dir, relative_path)
+    if os.path.exists(path):
+        return relative_path, _read_instanceable_marker(path)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rewriter = PBRTRewriter(model_namespace(model_uuid, copy))
+    with PBRTWriter(path) as out:
+        _write_rewritten(out, iter_file_chunks(source_path), rewriter)
+        out.write(f"\n{_INSTANCEABLE_MARKER}{'yes' if rewriter.instanceable else 'no'}\n")
+    return relative_path, rewriter.instanceable
+
+def _read_instanceable_marker(path):
+    """读取模型文件末尾记录的实例定义标记"""
+    with open(path, 'rb') as f:
+        f.seek(max(0, os.path.getsize(path) - 64))
+        tail = f.read().decode('utf-8', errors='ignore')
+    return f"{_INSTANCEABLE_MARKER}yes" in tail
+
+def write_model_reference(out, layout, relative_path, translate):
+    """写入放置模型的属性块，模型内容由 Import / Include 引用
+
+    Args:
+        out: 以二进制模式打开的主场景文件
+        layout (str): 'import' 或 'include'
+        relative_path (str): 模型文件相对于主场景文件的路径
+        translate (list): 平移量 [x, y, z] (km)
+    """
+    directive = 'Import' if layout == 'import' else 'Include'
+    x, y, z = translate
+    out.write(f'AttributeBegin\n  Translate {x} {y} {z}\n  {directive} "{relative_path}"\nAttributeEnd\n'
+              .encode('utf-8'))
+
+def write_scene_models(out, placements, model_paths, layout='single', scene_dir=None, instancing=True):
+    """按配对顺序把模型放置到卫星位置，写入主场景文件
+
+    同一模型与多个TLE配对时 (例如星座)，几何只以 ObjectBegin 定义一次，各卫星处放置 ObjectInstance；
+    不能作为实例定义的模型改为逐个放置。某个模型失败时截掉已写入的部分，继续处理其余模型。
+
+    Args:
+        out: 支持 tell / truncate 的二进制输出 (例如 PBRTWriter)
+        placements (list): 场景中的 ModelPlacement 节点
+        model_paths (dict): 模型UUID到未经变换的模型文件路径
+        layout (str): 场景布局，见 SCENE_LAYOUTS
+        scene_dir (str, optional): 场景目录，import / include 布局时必须给出
+        instancing (bool): 是否对共享的模型使用实例定义
+
+    Returns:
+        set: 本次引用的模型文件相对于场景目录的路径
+    """
+    used_model_files = set()
+    instanced = set()
+    if instancing:
+        pair_counts = Counter(node.model_uuid for node in placements if node.model_uuid in model_paths)
+        for model_uuid, count in pair_counts.items():
+            if count < 2:
+                continue
+            start = out.tell()
+            try:
+                out.write(f"\n# {model_uuid} Instance Definition\n".encode('utf-8'))
+                if layout == 'single':
+                    instanceable = write_instance_definition(out, iter_file_chunks(model_paths[model_uuid]),
+                                                             model_uuid)
+                else:
+                    model_file, instanceable = write_scene_model_file(scene_dir, model_uuid, model_paths[model_uuid])
+                    if instanceable:
+                        used_model_files.add(model_file)
+                        write_instance_definition_reference(out, model_file, model_uuid)
+            except (ValueError, OSError) as e:
+                out.truncate(start)
+                print(f"模型 {model_uuid} 处理失败: {e}")
+                continue
+            if instanceable:
+                instanced.add(model_uuid)
+                print(f"模型 {model_uuid} 的几何只定义一次，以实例放置 {count} 处")
+            else:
+                out.truncate(start)
+                print(f"模型 {model_uuid} 含有对象实例或光源，不能作为实例定义，改为逐个放置")
+
+    copies = Counter()
+    for node in placements:
+        model_name, tle_name, model_uuid = node.model_name, node.tle_name, node.model_uuid
+        print(f"处理模型 {model_name} (UUID: {model_uuid}) 与 TLE {tle_name} 的配对...")
+        if model_uuid not in model_paths:
+            print(f"处理模型 {model_name} 失败: 模型文件不可用")
+            continue
+
+        start = out.tell()
+        try:
+            out.write(node.begin_marker().encode('utf-8'))
+            if model_uuid in instanced:
+                write_model_instance(out, model_uuid, node.translate)
+            else:
+                copy = copies[model_uuid]
+                copies[model_uuid] += 1
+                if layout == 'single':
+                    write_placed_model(out, iter_file_chunks(model_paths[model_uuid]), model_uuid,
+                                       node.translate, copy)
+                else:
+                    model_file, _ = write_scene_model_file(scene_dir, model_uuid, model_paths[model_uuid], copy)
+                    used_model_files.add(model_file)
+                    write_model_reference(out, layout, model_file, node.translate)
+            out.write(node.end_marker().encode('utf-8'))
+        except (ValueError, OSError) as e:
+            out.truncate(start)
+            print(f"模型处理失败: {e}")
+            continue
+        print(f"已处理模型 {model_name} 的命名材料、纹理与对象")
+    return used_model_files
+
+def remove_unused_model_files(scene_dir, used, subdirs=(MODELS_SUBDIR,)):
+    """删除场景目录中本次场景未引用的模型文件
+
+    Args:
+        scene_dir (str): 场景目录
+        used (set): 本次引用的文件相对路径
+        subdirs (tuple): 需要清理的子目录
+    """
+    for subdir in subdirs:
+        directory = os.path.join(scene_dir, subdir)
+        if not os.path.isdir(directory):
+            continue
+        for filename in os.listdir(directory):
+            if f"{subdir}/{filename}" not in used:
+                os.remove(os.path.join(directory, filename))
+
+def package_scene(scene_dir, archive_path, files):
+    """把场景打包为 tar.gz，便于作为单个文件上传
+
+    只打包清单中的文件 (主文件与本次写入的模型、网格文件)，场景目录中以前留下的其他文件不会混入。
+
+    Args:
+        scene_dir (str): 场景目录
+        archive_path (str): 输出的归档文件路径
+        files (iterable): 要打包的文件相对于场景目录的路径
+
+    Returns:
+        str: 归档文件路径
+    """
+    output_dir = os.path.dirname(os.path.abspath(archive_path))
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix='.' + os.path.basename(archive_path) + '.',
+                                     suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f, tarfile.open(fileobj=f, mode='w:gz') as tar:
+            for relative_path in sorted(set(files)):
+                tar.add(os.path.join(scene_dir, relative_path), arcname=relative_path)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, archive_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return archive_path
@@ -0,0 +1,356 @@
+"""
+场景图
+以带类型的节点 (相机、胶片、采样器、光源、天体、模型放置) 在内存中描述一个场景，
+最后一次性序列化为 PBRT 文本。场景之间互不影响，同一进程中可以同时构建多个场景，
+也可以比较相邻两帧场景的结构差异。
+"""
+
+# 场景文件开头的注释
+SCENE_BANNER = ['# PBRTgen 0.0.1', '# by github.com/wtflmao']
+
+def coordinates(pos):
+    """取出位置的 x, y, z 分量
+
+    Args:
+        pos (list or object): [x, y, z] 坐标列表，或具有 x, y, z 属性 (属性可能带有 value 成员) 的对象
+
+    Returns:
+        tuple: (x, y, z)
+
+    Raises:
+        ValueError: 无法从对象中提取坐标
+    """
+    if isinstance(pos, (list, tuple)):
+        x, y, z = pos
+        return x, y, z
+    try:
+        return tuple(getattr(pos, axis).value if hasattr(getattr(pos, axis), 'value') else getattr(pos, axis)
+                     for axis in ('x', 'y', 'z'))
+    except AttributeError:
+        raise ValueError("无法从对象中提取坐标数据")
+
+class SceneNode:
+    """场景节点基类
+
+    子类通过 params() 给出决定节点内容的参数，节点的比较与差异都基于这些参数。
+    """
+
+    # 节点位于 WorldBegin 之前 (options) 还是之后 (world)
+    section = 'world'
+
+    def key(self):
+        """节点在场景中的标识，同一标识的节点在两帧之间视为同一个节点"""
+        return type(self).__name__
+
+    def params(self):
+        return ()
+
+    def lines(self):
+        """序列化为 PBRT 文本行"""
+        raise NotImplementedError
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.params() == other.params()
+
+    def __hash__(self):
+        return hash((type(self).__name__, self.params()))
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.params()}"
+
+class LookAt(SceneNode):
+    """相机位置、观察点与向上方向"""
+
+    section = 'options'
+
+    def __init__(self, eye, target=None, up=None):
+        self.eye = list(eye)
+        self.target = list(target) if target is not None else [0.0, 0.0, 0.0]
+        self.up = list(up) if up is not None else [0.0, 0.0, 1.0]
+
+    def params(self):
+        return (tuple(self.eye), tuple(self.target), tuple(self.up))
+
+    def lines(self):
+        return [f'LookAt {self.eye[0]}  {self.eye[1]}  {self.eye[2]}',
+                f'       {self.target[0]}  {self.target[1]}  {self.target[2]}',
+                f'       {self.up[0]}  {self.up[1]}  {self.up[2]}']
+
+class Camera(SceneNode):
+    """相机"""
+
+    section = 'options'
+
+    def __init__(self, cam_type=None, fov=None):
+        self.cam_type = cam_type or 'perspective'
+        self.fov = fov if fov is not None else 60.0
+
+    def params(self):
+        return (self.cam_type, self.fov)
+
+    def lines(self):
+        return [f'Camera "{self.cam_type}" "float fov" {self.fov}']
+
+class Sampler(SceneNode):
+    """采样器"""
+
+    section = 'options'
+
+    def __init__(self, sampler_type=None, samples=None):
+        self.sampler_type = sampler_type or 'halton'
+        self.samples = samples if samples is not None else 64
+
+    def params(self):
+        return (self.sampler_type, self.samples)
+
+    def lines(self):
+        return [f'Sampler "{self.sampler_type}" "integer pixelsamples" {self.samples}']
+
+class Integrator(SceneNode):
+    """积分器"""
+
+    section = 'options'
+
+    def __init__(self, integrator_type=None, max_depth=None):
+        self.integrator_type = integrator_type or 'volpath'
+        self.max_depth = max_depth if max_depth is not None else 5
+
+    def params(self):
+        return (self.integrator_type, self.max_depth)
+
+    def lines(self):
+        return [f'Integrator "{self.integrator_type}" "integer maxdepth" {self.max_depth}']
+
+class Film(SceneNode):
+    """胶片"""
+
+    section = 'options'
+
+    def __init__(self, x=None, y=None, diagonal=None, filename='1.exr'):
+        self.x = x if x is not None else 800
+        self.y = y if y is not None else 600
+        self.diagonal = diagonal if diagonal is not None else 70.0  # millimeter
+        self.filename = filename
+
+    def params(self):
+        return (self.x, self.y, self.diagonal, self.filename)
+
+    def lines(self):
+        return [f'Film "spectral" "string filename" "{self.filename}"',
+                f'     "integer xresolution" [{self.x}]',
+                f'     "integer yresolution" [{self.y}]',
+                f'     "float diagonal" [{self.diagonal}]']
+
+class PixelFilter(SceneNode):
+    """像素过滤器"""
+
+    section = 'options'
+
+    def lines(self):
+        return ['PixelFilter "gaussian" "float xradius" 1 "float yradius" 1']
+
+class ColorSpace(SceneNode):
+    """色彩空间 (目前不写入场景文件，使用渲染器默认的色彩空间)"""
+
+    section = 'options'
+
+    def __init__(self, space=None):
+        self.space = space or 'rec2020'
+
+    def params(self):
+        return (self.space,)
+
+    def lines(self):
+        return []  # [f'ColorSpace "{self.space}"']
+
+# 渲染所必需的 WorldBegin 之前的节点
+REQUIRED_OPTIONS = (LookAt, Camera, Sampler, Integrator, Film)
+
+class BackgroundLight(SceneNode):
+    """星空背景光源"""
+
+    def __init__(self, filename=None, scale=1.0):
+        self.filename = filename or 'hiptyc_2020_8k_equalarea.exr'
+        self.scale = scale
+
+    def params(self):
+        return (self.filename, self.scale)
+
+    def lines(self):
+        return [f'LightSource "infinite" "string filename" "{self.filename}"',
+                f'            "float scale" [{self.scale}]']
+
+class Sun(SceneNode):
+    """太阳：远距平行光与球体几何"""
+
+    def __init__(self, pos, radius=None):
+        self.position = coordinates(pos)
+        self.radius = radius if radius is not None else 695500.0  # km
+
+    def params(self):
+        return (self.position, self.radius)
+
+    def lines(self):
+        x, y, z = self.position
+        return [f'# The sun (emitter part)',
+                f'AttributeBegin',
+                f'  LightSource "distant"',  # 使用内置 "distant" 远距平行光
+                f'              "point3 from" [0 0 0]',
+                f'              "point3 to" [{-1.0*x} {-1.0*y} {-1.0*z}]',
+                f'              "spectrum L" "sun.spd"',
+                f'              "float scale" [1.0]',
+                f'AttributeEnd',
+                f'',
+                f'# The sun (geometry part)',
+                f'AttributeBegin',
+                f'  Translate {x} {y} {z}',
+                f'  Shape "sphere" "float radius" {self.radius}',
+                f'AttributeEnd']
+
+class Earth(SceneNode):
+    """地球"""
+
+    def __init__(self, pos, rot_angle=None, rot_axis=None, radius=None):
+        if (rot_angle is None) != (rot_axis is None):
+            raise ValueError("地球自转轴倾角与自转轴须同时给出")
+        self.position = coordinates(pos)
+        self.rot_angle = rot_angle if rot_angle is not None else 23.5
+        self.rot_axis = tuple(rot_axis) if rot_axis is not None else (1, 0, 0)  # X-axis
+        self.radius = radius if radius is not None else 6340.0  # km
+
+    def params(self):
+        return (self.position, self.rot_angle, self.rot_axis, self.radius)
+
+    def lines(self):
+        x, y, z = self.position
+        return [f'# The earth',
+                f'AttributeBegin',
+                f'  Translate {x} {y} {z}',
+                f'  Rotate {self.rot_angle} {self.rot_axis[0]} {self.rot_axis[1]} {self.rot_axis[2]}',
+                f'  MakeNamedMaterial "earthMaterial"',
+                f'    "string type" "coateddiffuse"',    #  使用涂层漫反射材质模拟地球表面 (Coated Diffuse material for Earth's surface simulation)
+                f'    "rgb reflectance" [0.1 0.2 0.3]', #  地球平均反照率近似值，蓝色调为主 (Approximate Earth albedo, bluish tone)
+                f'    "float roughness" 0.15',          #  适中粗糙度 (Moderate roughness)
+                f'    "float thickness" 0.001',         #  涂层厚度 (Coating thickness)
+                f'    "rgb albedo" [0.1 0.2 0.3]',      #  涂层下的漫反射层反照率 (Albedo of diffuse base layer under coating)
+                f'    "float g" 0.0',                   #  涂层内部散射各项异性参数 (Coating internal scattering asymmetry)
+                f'    "integer maxdepth" 5',            #  涂层内部最大散射反弹次数 (Max scattering bounces inside coating)
+                f'  NamedMaterial "earthMaterial"',     #  应用命名材质 (Apply named material)
+                f'  Shape "sphere" "float radius" {self.radius}',
+                f'AttributeEnd']
+
+class Moon(SceneNode):
+    """月球"""
+
+    def __init__(self, pos, radius=None):
+        self.position = coordinates(pos)
+        self.radius = radius if radius is not None else 1737.5  # km
+
+    def params(self):
+        return (self.position, self.radius)
+
+    def lines(self):
+        x, y, z = self.position
+        return [f'# The moon',
+                f'AttributeBegin',
+                f'  Translate {x} {y} {z}',
+                f'  MakeNamedMaterial "moonMaterial"',
+                f'    "string type" "diffuse"',
+                f'    "rgb reflectance" [0.5 0.5 0.5]', #  月球平均反照率近似值，灰色调 (Approximate Moon albedo, grayish tone)
+                f'  NamedMaterial "moonMaterial"',      #  应用命名材质 (Apply named material)
+                f'  Shape "sphere" "float radius" {self.radius}',
+                f'AttributeEnd']
+
+class ModelPlacement(SceneNode):
+    """放置在卫星位置的模型
+
+    模型内容体积大，由 scene_assembly 流式写入；节点只记录放置信息。
+    """
+
+    def __init__(self, model_name, tle_name, model_uuid, translate):
+        self.model_name = model_name
+        self.tle_name = tle_name
+        self.model_uuid = model_uuid
+        self.translate = coordinates(translate)
+
+    def key(self):
+        return ('ModelPlacement', self.tle_name)
+
+    def params(self):
+        return (self.model_name, self.tle_name, self.model_uuid, self.translate)
+
+    def begin_marker(self):
+        return f"\n# {self.tle_name} - {self.model_uuid} - {self.model_name} Starts\n"
+
+    def end_marker(self):
+        return f"\n# {self.tle_name} - {self.model_uuid} - {self.model_name} Ends\n\n"
+
+class Scene:
+    """一个完整的场景"""
+
+    def __init__(self):
+        self.options = {}
+        self.world = []
+        self.models = []
+
+    def set(self, node):
+        """设置 WorldBegin 之前的节点，同类节点只保留最后设置的一个"""
+        if node.section != 'options':
+            raise ValueError(f"{type(node).__name__} 不是渲染设置节点")
+        self.options[type(node)] = node
+        return node
+
+    def add(self, node):
+        """添加世界中的节点 (光源、天体、模型放置)"""
+        if node.section != 'world':
+            raise ValueError(f"{type(node).__name__} 不是世界节点")
+        if isinstance(node, ModelPlacement):
+            self.models.append(node)
+        else:
+            self.world.append(node)
+        return node
+
+    def nodes(self):
+        """按序列化顺序返回所有节点"""
+        return list(self.options.values()) + self.world + self.models
+
+    def validate(self):
+        """检查渲染必需的节点是否都已设置
+
+        Raises:
+            ValueError: 缺少必需的节点
+        """
+        missing = [cls.__name__ for cls in REQUIRED_OPTIONS if cls not in self.options]
+        if missing:
+            raise ValueError(f"场景缺少渲染设置: {', '.join(missing)}")
+
+    def options_text(self):
+        """序列化 WorldBegin 及之前的部分"""
+        self.validate()
+        groups = [SCENE_BANNER + ['\n']] + [node.lines() for node in self.options.values()] + [['WorldBegin']]
+        return ''.join(''.join(line + '\n' for line in group) + '\n' for group in groups)
+
+    def world_text(self):
+        """序列化世界中的光源与天体 (不含模型)"""
+        return ''.join(''.join(line + '\n' for line in node.lines()) + '\n\n' for node in self.world)
+
+    def header_text(self):
+        """序列化模型之前的全部内容"""
+        return (self.options_text() + "\n# 天体设置\n\n" + self.world_text() + "\n# 模型部分开始\n\n")
+
+    def diff(self, previous):
+        """比较本场景与上一帧场景的结构差异
+
+        Args:
+            previous (Scene): 上一帧场景
+
+        Returns:
+            dict: {'added': [...], 'removed': [...], 'changed': [(旧节点, 新节点)]}
+        """
+        old = {node.key(): node for node in previous.nodes()}
+        new = {node.key(): node for node in self.nodes()}
+        return {
+            'added': [node for key, node in new.items() if key not in old],
+            'removed': [node for key, node in old.items() if key not in new],
+            'changed': [(old[key], node) for key, node in new.items() if key in old and old[key] != node],
+        }
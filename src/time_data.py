@@ -0,0 +1,171 @@
+"""
+离线地球定向参数与闰秒数据
+Skyfield 与 astropy 只使用本地的表格 (随包附带的数据或预先暂存到 iers/ 目录的文件)，
+运行时不会尝试联网下载。
+
+在可联网的机器上暂存最新表格: python -m src.time_data stage
+查看当前表格的有效期:          python -m src.time_data status
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import date
+
+import erfa
+import numpy as np
+import requests
+from astropy.time import Time
+from astropy.utils import iers
+from astropy.utils.data import conf as data_conf
+from skyfield.api import load
+from skyfield.data import iers as skyfield_iers
+from skyfield.timelib import Timescale
+
+# 获取项目根目录
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 暂存的 IERS 表格目录
+TIME_DATA_DIR = os.path.join(PROJECT_ROOT, 'iers')
+
+FINALS_FILE = 'finals2000A.all'
+LEAP_SECOND_FILE = 'Leap_Second.dat'
+
+# 距离表格失效不足该天数时给出提醒
+STALE_WARNING_DAYS = 30
+
+def _staged(filename, data_dir=TIME_DATA_DIR):
+    """返回暂存目录中的文件路径，不存在时返回 None"""
+    path = os.path.join(data_dir, filename)
+    return path if os.path.exists(path) else None
+
+def configure_astropy_offline(data_dir=TIME_DATA_DIR):
+    """配置 astropy 只使用本地的闰秒与地球定向参数表格
+
+    Args:
+        data_dir (str): 暂存目录，其中的表格优先于 astropy 附带的表格
+    """
+    iers.conf.auto_download = False
+    iers.conf.auto_max_age = None
+    iers.conf.iers_degraded_accuracy = 'warn'
+    data_conf.allow_internet = False
+
+    # ERFA 内置的闰秒表早已过期，不预先更新的话 astropy 首次处理UTC时会尝试联网更新
+    leap_file = _staged(LEAP_SECOND_FILE, data_dir) or iers.IERS_LEAP_SECOND_FILE
+    erfa.leap_seconds.update(iers.LeapSeconds.open(leap_file))
+
+    finals_file = _staged(FINALS_FILE, data_dir)
+    if finals_file:
+        iers.earth_orientation_table.set(iers.IERS_A.open(finals_file))
+
+def load_offline_timescale(data_dir=TIME_DATA_DIR):
+    """创建不需要联网的 Skyfield timescale
+
+    暂存目录中有 finals2000A.all 时由其构建，否则使用 Skyfield 附带的表格。
+
+    Args:
+        data_dir (str): 暂存目录
+
+    Returns:
+        Timescale: 时间刻度对象
+    """
+    finals_file = _staged(FINALS_FILE, data_dir)
+    if not finals_file:
+        return load.timescale(builtin=True)
+    with open(finals_file, 'rb') as f:
+        utc_mjd, dut1 = skyfield_iers.parse_dut1_from_finals_all(f)
+    daily_tt, daily_delta_t, leap_dates, leap_offsets = skyfield_iers.build_timescale_arrays(utc_mjd, dut1)
+    return Timescale((daily_tt, daily_delta_t), leap_dates, leap_offsets)
+
+def time_data_status(ts, data_dir=TIME_DATA_DIR):
+    """汇总各时间表格的来源与有效期
+
+    Args:
+        ts: Skyfield 时间刻度对象
+        data_dir (str): 暂存目录
+
+    Returns:
+        list: [(表格名称, 来源, 有效期截止日期)]
+    """
+    finals_file = _staged(FINALS_FILE, data_dir)
+    finals_source = finals_file or "Skyfield 附带"
+    # ΔT 表格 (含预测值) 覆盖到的最后一天
+    skyfield_until = Time(float(ts.delta_t_table[0][-1]), format='jd', scale='tt').utc.datetime.date()
+
+    leap_file = _staged(LEAP_SECOND_FILE, data_dir) or iers.IERS_LEAP_SECOND_FILE
+    leap_until = iers.LeapSeconds.open(leap_file).expires.datetime.date()
+
+    status = [
+        ("Skyfield ΔT/UT1", finals_source, skyfield_until),
+        ("闰秒表", leap_file, leap_until),
+    ]
+    if finals_file:
+        table = iers.earth_orientation_table.get()
+        astropy_until = Time(float(np.max(table['MJD'].value)), format='mjd').datetime.date()
+        status.append(("astropy 地球定向参数", finals_file, astropy_until))
+    return status
+
+def report_time_data_staleness(ts, data_dir=TIME_DATA_DIR, today=None):
+    """启动时检查时间表格是否过期并打印结果
+
+    Args:
+        ts: Skyfield 时间刻度对象
+        data_dir (str): 暂存目录
+        today (date, optional): 当前日期，默认为今天
+
+    Returns:
+        bool: 所有表格都仍在有效期内时返回 True
+    """
+    today = today or date.today()
+    fresh = True
+    for name, source, until in time_data_status(ts, data_dir):
+        remaining = (until - today).days
+        if remaining < 0:
+            fresh = False
+            print(f"警告: {name} 已过期 {-remaining} 天 (有效期至 {until}，来源 {source})，"
+                  f"请运行 python -m src.time_data stage 更新")
+        elif remaining < STALE_WARNING_DAYS:
+            print(f"提醒: {name} 将在 {remaining} 天后过期 (有效期至 {until}，来源 {source})")
+        else:
+            print(f"{name} 有效期至 {until} (来源 {source})")
+    return fresh
+
+def stage_time_data(data_dir=TIME_DATA_DIR, timeout=60):
+    """下载最新的 finals2000A.all 与 Leap_Second.dat 到暂存目录 (需联网)
+
+    Args:
+        data_dir (str): 暂存目录
+        timeout (float): 下载超时时间 (秒)
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    for filename, url in ((FINALS_FILE, iers.conf.iers_auto_url),
+                          (LEAP_SECOND_FILE, iers.conf.iers_leap_second_auto_url)):
+        print(f"正在下载 {url}")
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+
+        # 先写临时文件再原子替换，避免读取方看到不完整的表格
+        fd, temp_path = tempfile.mkstemp(dir=data_dir, prefix='.' + filename + '.', suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(response.content)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, os.path.join(data_dir, filename))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        print(f"已暂存 {os.path.join(data_dir, filename)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="管理离线的 IERS 与闰秒表格")
+    parser.add_argument('command', choices=['stage', 'status'], help="stage: 下载并暂存表格; status: 查看有效期")
+    parser.add_argument('--dir', default=TIME_DATA_DIR, help="暂存目录")
+    args = parser.parse_args()
+
+    if args.command == 'stage':
+        stage_time_data(args.dir)
+    configure_astropy_offline(args.dir)
+    report_time_data_staleness(load_offline_timescale(args.dir), args.dir)
+
+if __name__ == '__main__':
+    main()
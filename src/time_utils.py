@@ -1,9 +1,79 @@
-from skyfield.api import load
+from datetime import timezone
+from functools import lru_cache
+import numpy as np
+from astropy.time import Time
+
+from .time_data import configure_astropy_offline, load_offline_timescale
+
+# astropy 只使用本地的闰秒与地球定向参数表格，处理时间与坐标时不会联网
+configure_astropy_offline()
 
 def get_timescale():
-    """获取 Skyfield 的 timescale。"""
-    return load.timescale()
+    """获取 Skyfield 的 timescale (只使用本地表格，不会联网下载)。"""
+    return load_offline_timescale()
 
 def get_utc_time(ts, year, month, day, hour, minute, second):
-    """使用 Skyfield 的 timescale 创建 Time 对象。"""
-    return ts.utc(year, month, day, hour, minute, second)
\ No newline at end of file
+    """使用 Skyfield 的 timescale 创建 Time 对象 (同一时刻只创建一次)。"""
+    return _utc_epoch(ts, year, month, day, hour, minute, second)
+
+@lru_cache(maxsize=256)
+def _utc_epoch(ts, year, month, day, hour, minute, second):
+    """创建并缓存单个时刻的 Time 对象，避免重复的历法换算。"""
+    return ts.utc(year, month, day, hour, minute, second)
+
+def _calendar(epoch):
+    """返回 datetime 的 UTC 历法分量 (年, 月, 日, 时, 分, 秒)，秒包含微秒。"""
+    if epoch.tzinfo is not None:
+        epoch = epoch.astimezone(timezone.utc)
+    return (epoch.year, epoch.month, epoch.day, epoch.hour, epoch.minute,
+            epoch.second + epoch.microsecond / 1e6)
+
+def utc_time(ts, epoch, offsets=None):
+    """由 datetime (无时区时视为UTC) 与可选的秒偏移数组创建 Skyfield Time。
+
+    Args:
+        ts: 时间刻度对象
+        epoch (datetime): 基准时刻
+        offsets (array-like, optional): 相对基准时刻的偏移 (秒)，提供时返回时刻数组
+
+    Returns:
+        Time: Skyfield 时间对象
+    """
+    year, month, day, hour, minute, second = _calendar(epoch)
+    if offsets is None:
+        return _utc_epoch(ts, year, month, day, hour, minute, second)
+    # 偏移直接加在秒上，由 Skyfield 一次完成整个数组的历法与闰秒换算
+    return ts.utc(year, month, day, hour, minute, second + np.asarray(offsets, dtype=np.float64))
+
+def utc_times(ts, epochs):
+    """将一组 datetime 转换为单个 Skyfield Time 数组。
+
+    Args:
+        ts: 时间刻度对象
+        epochs (list): datetime 列表 (无时区时视为UTC)
+
+    Returns:
+        Time: 含 len(epochs) 个时刻的 Skyfield 时间对象
+    """
+    year, month, day, hour, minute, second = (np.array(column) for column in zip(*map(_calendar, epochs)))
+    return ts.utc(year, month, day, hour, minute, second)
+
+def to_astropy_time(t):
+    """将 Skyfield Time 转换为 astropy Time，不经过字符串格式化。
+
+    直接使用 TT 儒略日的两部分；单个时刻的转换结果会被缓存。
+
+    Args:
+        t: Skyfield 时间对象 (单个时刻或数组)
+
+    Returns:
+        Time: astropy 时间对象
+    """
+    if np.ndim(t.whole) == 0:
+        return _astropy_epoch(float(t.whole), float(t.tt_fraction))
+    return Time(t.whole, t.tt_fraction, format='jd', scale='tt')
+
+@lru_cache(maxsize=256)
+def _astropy_epoch(whole, tt_fraction):
+    """创建并缓存单个时刻的 astropy Time 对象。"""
+    return Time(whole, tt_fraction, format='jd', scale='tt')
@@ -1,7 +1,20 @@
-from skyfield.api import EarthSatellite, load
+from skyfield.api import load
 import os
+import hashlib
+import json
+import tempfile
+import threading
+import bisect
+import sqlite3
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import requests
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+from sgp4.api import Satrec, SatrecArray
+from .satellite_registry import get_registry
+from .file_lock import FileLock
 
 # 项目根目录
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -11,9 +24,57 @@ TLE_CACHE_DIR = os.path.join(PROJECT_ROOT, 'tle')
 # 确保TLE缓存目录存在
 os.makedirs(TLE_CACHE_DIR, exist_ok=True)
 
+# 二进制目录缓存格式版本，字段变化时递增以使旧缓存失效
+CATALOG_CACHE_VERSION = 2
+
+# 列式TLE目录的记录类型，每个字段即为一列，可直接 np.load(mmap_mode='r') 映射
+CATALOG_DTYPE = np.dtype([
+    ('norad_id', '<i4'),          # NORAD 编目号
+    ('epoch', '<f8'),             # 历元 (UTC 儒略日)
+    ('inclination', '<f8'),       # 轨道倾角 (度)
+    ('raan', '<f8'),              # 升交点赤经 (度)
+    ('eccentricity', '<f8'),      # 偏心率
+    ('arg_perigee', '<f8'),       # 近地点幅角 (度)
+    ('mean_anomaly', '<f8'),      # 平近点角 (度)
+    ('mean_motion', '<f8'),       # 平均运动 (圈/天)
+    ('bstar', '<f8'),             # B* 阻力项
+    ('intl_designator', 'U8'),    # 国际编号
+    ('name', 'U64'),              # 卫星名称
+    ('line1', 'S69'),             # TLE 第一行原文
+    ('line2', 'S69'),             # TLE 第二行原文
+    # 以下为加载目录时批量计算的派生列
+    ('period_min', '<f8'),        # 轨道周期 (分钟)
+    ('apogee_km', '<f8'),         # 远地点高度 (km)
+    ('perigee_km', '<f8'),        # 近地点高度 (km)
+    ('regime', 'i1'),             # 轨道类型，见 ORBIT_REGIMES
+    ('sgp4_error', 'i1'),         # SGP4 在目录参考历元处的错误码，0 表示正常
+    ('decayed', '?'),             # 是否已陨落或根数不可用
+])
+
+# 派生列的默认值，解析时先以此占位，再由 _fill_orbit_metadata 批量计算
+_METADATA_PLACEHOLDER = (np.nan, np.nan, np.nan, -1, 0, False)
+
+# 轨道类型代码对应的名称
+ORBIT_REGIMES = ('LEO', 'MEO', 'GEO', 'HEO')
+REGIME_LEO, REGIME_MEO, REGIME_GEO, REGIME_HEO = range(len(ORBIT_REGIMES))
+
+# 地球引力常数 (km^3/s^2) 与赤道半径 (km)，取 WGS-72 以与 SGP4 一致
+_EARTH_MU = 398600.8
+_EARTH_RADIUS_KM = 6378.135
+
+# 近地点低于该高度的目标视为已陨落 (km)
+DECAY_PERIGEE_KM = 90.0
+
+# Alpha-5 编目号首字母对应的数值 (跳过易混淆的 I 和 O)
+_ALPHA5_DIGITS = {c: i + 10 for i, c in enumerate('ABCDEFGHJKLMNPQRSTUVWXYZ')}
+
 def download_tle_file(url, filename):
     """下载TLE文件
     
+    若本地已有文件，则携带 ETag / Last-Modified 发送条件请求，服务器返回
+    304 时不再传输文件内容。响应体以流的方式写入同目录的临时文件，
+    完整写入后再原子替换原文件，读取方不会看到写了一半的文件。
+    
     Args:
         url (str): TLE文件下载地址
         filename (str): 保存的文件名
@@ -22,19 +83,72 @@ def download_tle_file(url, filename):
         str: 下载的文件路径
     """
     filepath = os.path.join(TLE_CACHE_DIR, filename)
+    metadata = _read_download_metadata(filepath) if os.path.exists(filepath) else {}
+    
+    headers = {}
+    if metadata.get('url') == url:
+        if metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
     
+    temp_path = None
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # 检查下载是否成功
+        with requests.get(url, headers=headers, timeout=10, stream=True) as response:
+            if response.status_code == 304:
+                # 内容未变化，仅刷新文件时间以延长缓存有效期
+                os.utime(filepath, None)
+                print(f"TLE文件未变化: {filepath}")
+                return filepath
+            
+            response.raise_for_status()  # 检查下载是否成功
+            
+            with tempfile.NamedTemporaryFile('wb', dir=TLE_CACHE_DIR, prefix=f".{filename}.",
+                                             suffix='.part', delete=False) as f:
+                temp_path = f.name
+                for chunk in response.iter_content(chunk_size=65536):
+                    f.write(chunk)
+            os.replace(temp_path, filepath)
+            temp_path = None
+            
+            _write_download_metadata(filepath, {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            })
         
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
+        # TLE已更新，丢弃按旧TLE初始化的卫星记录
+        get_registry().invalidate()
         
         print(f"成功下载TLE文件: {filepath}")
         return filepath
     except Exception as e:
         print(f"下载TLE文件失败: {e}")
         return None
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _read_download_metadata(filepath):
+    """读取TLE文件的下载元数据 (ETag、Last-Modified 等)"""
+    try:
+        with open(filepath + '.meta.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_download_metadata(filepath, metadata):
+    """原子写入TLE文件的下载元数据"""
+    meta_path = filepath + '.meta.json'
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(meta_path),
+                                     prefix='.' + os.path.basename(meta_path) + '.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+        os.replace(temp_path, meta_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
 def is_tle_cache_valid(filepath, max_age_days=1):
     """检查TLE缓存文件是否有效
@@ -63,75 +177,848 @@ def get_tle_data(url, filename='active_satellites.tle'):
         filename (str): 缓存文件名
         
     Returns:
-        dict: TLE数据字典
+        TLECatalog: 列式TLE目录
     """
     filepath = os.path.join(TLE_CACHE_DIR, filename)
     
     # 检查缓存是否有效
     if is_tle_cache_valid(filepath):
         print(f"使用缓存的TLE文件: {filepath}")
-    else:
-        # 下载新的TLE文件
-        filepath = download_tle_file(url, filename)
-        if not filepath:
+        return load_tle_catalog(filepath)
+    
+    # 多个进程同时发现缓存过期时，只有拿到锁的进程负责刷新
+    lock = FileLock(filepath + '.lock')
+    if not lock.acquire(blocking=False):
+        if os.path.exists(filepath):
+            print(f"其他进程正在刷新TLE文件，使用上一版本: {filepath}")
+            return load_tle_catalog(filepath)
+        print(f"等待其他进程下载TLE文件: {filepath}")
+        lock.acquire()
+    
+    try:
+        # 拿到锁后再检查一次，其他进程可能刚刚完成刷新
+        if is_tle_cache_valid(filepath):
+            print(f"使用其他进程刷新的TLE文件: {filepath}")
+            return load_tle_catalog(filepath)
+        
+        # 记下当前目录，刷新后只需合并变化的记录
+        previous = None
+        if os.path.exists(filepath):
+            previous = _load_cached_catalog(catalog_cache_path(filepath))
+        
+        # 下载新的TLE文件 (条件请求)
+        downloaded = download_tle_file(url, filename)
+        if downloaded:
+            filepath = downloaded
+        elif os.path.exists(filepath):
+            print(f"TLE文件刷新失败，继续使用旧文件: {filepath}")
+        else:
             raise RuntimeError("无法获取TLE数据")
+        
+        # 优先使用二进制目录缓存，缺失时解析文本并写入缓存
+        return load_tle_catalog(filepath, previous)
+    finally:
+        lock.release()
+
+def tle_sources_from_settings(tle_settings):
+    """从 settings.yaml 的 tle 配置中读取TLE数据源列表
+    
+    未配置 TLE_SOURCES 时，退回到单个 CELESTRAK_TLE_URL。
+    
+    Args:
+        tle_settings (dict): settings.yaml 中 tle 部分的配置
+        
+    Returns:
+        list: 数据源列表，每项包含 name 以及 url 或 path
+    """
+    sources = tle_settings.get('TLE_SOURCES')
+    if sources:
+        return sources
+    return [{'name': 'active',
+             'url': tle_settings.get('CELESTRAK_TLE_URL'),
+             'filename': 'active_satellites.tle'}]
+
+def get_tle_catalog(sources, max_workers=4):
+    """并发获取多个TLE数据源，并合并为一个目录
+    
+    同一NORAD编号出现在多个数据源中时，保留历元最新的一组根数。
+    
+    Args:
+        sources (list): 数据源列表，每项为 {'name': ..., 'url': ...} 或 {'name': ..., 'path': ...}
+        max_workers (int): 最大并发下载数
+        
+    Returns:
+        TLECatalog: 合并后的列式TLE目录
+    """
+    catalogs = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources)))) as pool:
+        futures = [pool.submit(_load_tle_source, source) for source in sources]
+        # 按配置顺序收集结果，历元相同时靠前的数据源优先
+        for source, future in zip(sources, futures):
+            try:
+                catalog = future.result()
+            except Exception as e:
+                print(f"获取TLE数据源 {source.get('name')} 失败: {e}")
+                continue
+            if catalog is not None and len(catalog):
+                catalogs.append(catalog)
+    
+    if not catalogs:
+        raise RuntimeError("无法获取TLE数据")
+    
+    catalog = merge_catalogs(catalogs)
+    print(f"已合并 {len(catalogs)} 个TLE数据源，共 {len(catalog)} 个卫星")
     
-    # 解析TLE文件
-    return parse_tle_file(filepath)
+    # 追加到历史档案，供按渲染时刻回溯使用
+    try:
+        added = get_tle_archive().append(catalog)
+        if added:
+            print(f"历史TLE档案新增 {added} 条记录")
+    except Exception as e:
+        print(f"写入历史TLE档案失败: {e}")
+    return catalog
+
+def _load_tle_source(source):
+    """获取单个TLE数据源的目录"""
+    name = source.get('name', 'tle')
+    if source.get('path'):
+        filepath = source['path']
+        if not os.path.isabs(filepath):
+            filepath = os.path.join(PROJECT_ROOT, filepath)
+        if not os.path.exists(filepath):
+            print(f"本地TLE文件不存在，跳过: {filepath}")
+            return None
+        return load_tle_catalog(filepath)
+    return get_tle_data(source['url'], source.get('filename', f"{name}.tle"))
+
+def merge_catalogs(catalogs):
+    """合并多个TLE目录，按NORAD编号去重并保留历元最新的记录
+    
+    Args:
+        catalogs (list): TLECatalog 列表
+        
+    Returns:
+        TLECatalog: 合并后的目录，各卫星按其NORAD编号首次出现的顺序排列
+    """
+    records = np.concatenate([np.asarray(catalog.records) for catalog in catalogs])
+    if not len(records):
+        return TLECatalog(records)
+    
+    # 先按NORAD编号、再按历元降序排序；lexsort 是稳定排序，历元相同时保留先出现的记录
+    order = np.lexsort((-records['epoch'], records['norad_id']))
+    sorted_ids = records['norad_id'][order]
+    newest = np.ones(len(order), dtype=bool)
+    newest[1:] = sorted_ids[1:] != sorted_ids[:-1]
+    
+    # 每组的最新记录按该编号首次出现的位置排序 (np.unique 的结果与 newest 同为编号升序)
+    _, first_seen = np.unique(records['norad_id'], return_index=True)
+    return TLECatalog(records[order[newest][np.argsort(first_seen)]])
 
-def parse_tle_file(filepath):
+class TLEParseStats:
+    """TLE解析统计"""
+    
+    def __init__(self):
+        self.records = 0            # 成功解析的记录数
+        self.checksum_errors = 0    # 校验和错误的记录数
+        self.id_mismatches = 0      # 两行编目号不一致的记录数
+        self.orphan_lines = 0       # 缺少配对行的孤立行数
+        self.invalid_elements = 0   # 根数字段无法解析的记录数
+    
+    @property
+    def malformed(self):
+        """格式错误的记录总数"""
+        return self.checksum_errors + self.id_mismatches + self.orphan_lines + self.invalid_elements
+    
+    def __str__(self):
+        return (f"{self.records} 条有效, {self.malformed} 条格式错误 "
+                f"(校验和 {self.checksum_errors}, 编号不一致 {self.id_mismatches}, "
+                f"孤立行 {self.orphan_lines}, 根数无效 {self.invalid_elements})")
+
+def parse_tle_file(filepath, stats=None):
     """解析TLE文件
     
     Args:
         filepath (str): TLE文件路径
+        stats (TLEParseStats, optional): 解析统计，传入时累加计数
         
     Returns:
-        dict: 解析后的TLE数据字典
+        TLECatalog: 解析后的列式TLE目录
     """
-    tle_data = {}
-    
+    stats = stats if stats is not None else TLEParseStats()
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # 每3行为一组TLE数据
-        for i in range(0, len(lines), 3):
-            if i + 2 < len(lines):
-                sat_name = lines[i].strip()
-                tle_line1 = lines[i+1].strip()
-                tle_line2 = lines[i+2].strip()
-                
-                tle_data[sat_name] = [tle_line1, tle_line2]
-        
-        print(f"成功解析 {len(tle_data)} 个卫星的TLE数据")
-        return tle_data
+        # 记录由生成器逐条产出，直接填入结构化数组，不构建中间列表
+        records = np.fromiter(iter_tle_records(filepath, stats), dtype=CATALOG_DTYPE)
+        _fill_orbit_metadata(records)
+        catalog = TLECatalog(records)
+        print(f"成功解析 {len(catalog)} 个卫星的TLE数据")
+        if stats.malformed:
+            print(f"TLE文件 {filepath} 中存在格式错误的记录: {stats}")
+        return catalog
     except Exception as e:
         print(f"解析TLE文件失败: {e}")
-        return {}
+        return TLECatalog(np.empty(0, dtype=CATALOG_DTYPE))
+
+def iter_tle_records(filepath, stats=None):
+    """逐条产出可直接写入 CATALOG_DTYPE 的目录记录
+    
+    Args:
+        filepath (str): TLE文件路径
+        stats (TLEParseStats, optional): 解析统计
+        
+    Yields:
+        tuple: 与 CATALOG_DTYPE 字段顺序一致的记录
+    """
+    stats = stats if stats is not None else TLEParseStats()
+    for name, line1, line2 in iter_tle_groups(filepath, stats):
+        try:
+            record = _make_record(name, line1, line2)
+        except (ValueError, KeyError, UnicodeEncodeError):
+            stats.records -= 1
+            stats.invalid_elements += 1
+            continue
+        yield record
+
+def iter_tle_groups(filepath, stats=None):
+    """流式读取TLE文件，逐组产出经过校验的原始文本
+    
+    自动识别两行 (无名称) 与三行 (名称 + 两行) 格式，也接受以 "0 " 开头的名称行。
+    每组都校验两行的校验和以及编目号是否一致；缺行或错行只会丢弃当前一组，
+    不会使后续记录错位。
+    
+    Args:
+        filepath (str): TLE文件路径
+        stats (TLEParseStats, optional): 解析统计
+        
+    Yields:
+        tuple: (卫星名, tle1_line, tle2_line)
+    """
+    stats = stats if stats is not None else TLEParseStats()
+    name = None
+    line1 = None
+    
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for raw in f:
+            line = raw.rstrip()
+            if not line:
+                continue
+            
+            if _is_tle_line(line, '2'):
+                if line1 is None:
+                    stats.orphan_lines += 1
+                elif not (_tle_checksum_ok(line1) and _tle_checksum_ok(line)):
+                    stats.checksum_errors += 1
+                elif line1[2:7] != line[2:7]:
+                    stats.id_mismatches += 1
+                else:
+                    stats.records += 1
+                    # 两行格式没有名称行，以编目号作为名称
+                    yield (name if name is not None else line1[2:7].strip()), line1, line
+                name = None
+                line1 = None
+                continue
+            
+            if line1 is not None:
+                # 第一行之后没有紧跟第二行
+                stats.orphan_lines += 1
+                line1 = None
+                name = None
+            
+            if _is_tle_line(line, '1'):
+                line1 = line
+            else:
+                if name is not None:
+                    # 名称行之后没有TLE数据
+                    stats.orphan_lines += 1
+                name = line[2:].strip() if line.startswith('0 ') else line.strip()
+    
+    if line1 is not None or name is not None:
+        stats.orphan_lines += 1
+
+def _is_tle_line(line, number):
+    """判断是否为指定行号的TLE数据行 (以 "1 " 或 "2 " 开头的69列文本)"""
+    return len(line) == 69 and line[0] == number and line[1] == ' '
+
+def _tle_checksum_ok(line):
+    """校验TLE行的模10校验和 (数字按值累加，负号计为1)"""
+    checksum = 0
+    for c in line[:68]:
+        if c.isdigit():
+            checksum += int(c)
+        elif c == '-':
+            checksum += 1
+    return line[68].isdigit() and checksum % 10 == int(line[68])
+
+def update_tle_catalog(previous, filepath):
+    """按NORAD编号将新的TLE文本增量合并到已有目录
+    
+    只对新增或内容变化的记录解析轨道根数，未变化的记录直接从旧目录复制。
+    
+    Args:
+        previous (TLECatalog): 刷新前的目录
+        filepath (str): 刷新后的TLE文本文件路径
+        
+    Returns:
+        TLECatalog: 与新文本内容一致的目录
+    """
+    stats = TLEParseStats()
+    groups = list(iter_tle_groups(filepath, stats))
+    old = previous.records
+    
+    names = np.array([group[0] for group in groups], dtype=CATALOG_DTYPE['name'])
+    line1 = np.array([group[1].encode('ascii') for group in groups], dtype=CATALOG_DTYPE['line1'])
+    line2 = np.array([group[2].encode('ascii') for group in groups], dtype=CATALOG_DTYPE['line2'])
+    norad_ids = np.array([_parse_norad_id(group[1][2:7]) for group in groups], dtype=CATALOG_DTYPE['norad_id'])
+    
+    # 在旧目录中按NORAD编号查找对应记录
+    order = np.argsort(old['norad_id'], kind='stable')
+    sorted_ids = old['norad_id'][order]
+    position = np.minimum(np.searchsorted(sorted_ids, norad_ids), max(len(old) - 1, 0))
+    if len(old):
+        candidate = order[position]
+        unchanged = ((sorted_ids[position] == norad_ids)
+                     & (old['line1'][candidate] == line1)
+                     & (old['line2'][candidate] == line2)
+                     & (old['name'][candidate] == names))
+    else:
+        candidate = position
+        unchanged = np.zeros(len(groups), dtype=bool)
+    
+    records = np.empty(len(groups), dtype=CATALOG_DTYPE)
+    records[unchanged] = old[candidate[unchanged]]
+    changed = np.flatnonzero(~unchanged)
+    if len(changed):
+        records[changed] = np.array([_make_record(*groups[i]) for i in changed], dtype=CATALOG_DTYPE)
+        _fill_orbit_metadata(records, changed)
+    
+    print(f"增量更新TLE目录: {len(changed)} 条记录变化, {int(unchanged.sum())} 条未变")
+    if stats.malformed:
+        print(f"TLE文件 {filepath} 中存在格式错误的记录: {stats}")
+    return TLECatalog(records)
+
+def load_tle_catalog(filepath, previous=None):
+    """加载TLE目录，命中二进制缓存时跳过文本解析
+    
+    缓存文件与文本文件同目录，文件名包含源文件的SHA-256，
+    因此源文件内容变化后旧缓存自然失效。
+    
+    Args:
+        filepath (str): TLE文本文件路径
+        previous (TLECatalog, optional): 刷新前的目录，提供时只合并变化的记录
+        
+    Returns:
+        TLECatalog: 列式TLE目录
+    """
+    cache_path = catalog_cache_path(filepath)
+    
+    catalog = _load_cached_catalog(cache_path)
+    if catalog is not None:
+        print(f"使用TLE目录缓存: {cache_path}")
+        return catalog
+    
+    if previous is not None and len(previous):
+        try:
+            catalog = update_tle_catalog(previous, filepath)
+        except Exception as e:
+            print(f"增量更新TLE目录失败，改为完整解析: {e}")
+            catalog = parse_tle_file(filepath)
+    else:
+        catalog = parse_tle_file(filepath)
+    
+    # 解析期间文本文件可能已被其他进程替换，此时不能以旧哈希写入缓存
+    if len(catalog) and catalog_cache_path(filepath) == cache_path:
+        save_tle_catalog(catalog, cache_path)
+    return catalog
+
+def _load_cached_catalog(cache_path):
+    """以内存映射方式读取二进制目录缓存，不存在或格式不符时返回 None"""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        records = np.load(cache_path, mmap_mode='r')
+        if records.dtype == CATALOG_DTYPE:
+            return TLECatalog(records)
+    except Exception as e:
+        print(f"读取TLE目录缓存失败: {e}")
+    return None
+
+def save_tle_catalog(catalog, cache_path):
+    """将TLE目录写入二进制缓存，并清理同一源文件的旧缓存
+    
+    Args:
+        catalog (TLECatalog): TLE目录
+        cache_path (str): 缓存文件路径
+    """
+    temp_path = None
+    try:
+        # 先写临时文件再原子替换，避免其他读取方看到不完整的缓存；
+        # 临时文件名唯一，多个进程同时写入同一缓存也不会互相覆盖
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path),
+                                         prefix='.' + os.path.basename(cache_path) + '.', suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.ascontiguousarray(catalog.records))
+        os.replace(temp_path, cache_path)
+        temp_path = None
+    except Exception as e:
+        print(f"写入TLE目录缓存失败: {e}")
+        return
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    # 清理同一源文件的旧版本缓存
+    cache_dir = os.path.dirname(cache_path)
+    prefix = os.path.basename(cache_path).rsplit('.', 2)[0] + '.'
+    for entry in os.listdir(cache_dir):
+        stale = os.path.join(cache_dir, entry)
+        if entry.startswith(prefix) and entry.endswith('.npy') and stale != cache_path:
+            try:
+                os.remove(stale)
+            except OSError:
+                # 旧缓存可能仍被内存映射占用 (Windows)，下次再清理
+                pass
+
+def catalog_cache_path(filepath):
+    """计算TLE文本文件对应的二进制目录缓存路径
+    
+    Args:
+        filepath (str): TLE文本文件路径
+        
+    Returns:
+        str: 缓存文件路径
+    """
+    digest = file_sha256(filepath)[:16]
+    return f"{filepath}.v{CATALOG_CACHE_VERSION}-{digest}.npy"
+
+def file_sha256(filepath):
+    """计算文件的SHA-256哈希值
+    
+    Args:
+        filepath (str): 文件路径
+        
+    Returns:
+        str: 十六进制哈希值
+    """
+    sha256_hash = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for byte_block in iter(lambda: f.read(65536), b""):
+            sha256_hash.update(byte_block)
+    return sha256_hash.hexdigest()
+
+def _parse_norad_id(field):
+    """解析NORAD编目号，支持Alpha-5格式 (如 A0001 = 100001)"""
+    field = field.strip()
+    if field and field[0].isalpha():
+        return _ALPHA5_DIGITS[field[0].upper()] * 10000 + int(field[1:])
+    return int(field)
+
+def _parse_tle_float(field):
+    """解析TLE中隐含小数点和指数的数值字段 (如 ' 15777-2' = 0.15777e-2)"""
+    field = field.strip()
+    if not field:
+        return 0.0
+    sign = -1.0 if field[0] == '-' else 1.0
+    field = field.lstrip('+-')
+    mantissa, exponent = field[:-2], field[-2:]
+    return sign * float(f"0.{mantissa}e{exponent}")
+
+def _parse_epoch(field):
+    """将TLE历元 (YYDDD.DDDDDDDD) 转换为UTC儒略日"""
+    two_digit_year = int(field[:2])
+    year = 2000 + two_digit_year if two_digit_year < 57 else 1900 + two_digit_year
+    # date.toordinal() 以公元1年1月1日为1，加上 1721424.5 即得该日0时的儒略日
+    return date(year, 1, 1).toordinal() + 1721424.5 + float(field[2:]) - 1.0
+
+def _make_record(name, line1, line2):
+    """由一组TLE文本生成目录记录
+    
+    Args:
+        name (str): 卫星名称
+        line1 (str): TLE第一行
+        line2 (str): TLE第二行
+        
+    Returns:
+        tuple: 与 CATALOG_DTYPE 字段顺序一致的记录
+    """
+    return (
+        _parse_norad_id(line1[2:7]),
+        _parse_epoch(line1[18:32]),
+        float(line2[8:16]),
+        float(line2[17:25]),
+        float('0.' + line2[26:33].strip()),
+        float(line2[34:42]),
+        float(line2[43:51]),
+        float(line2[52:63]),
+        _parse_tle_float(line1[53:61]),
+        line1[9:17].strip(),
+        name,
+        line1.encode('ascii'),
+        line2.encode('ascii'),
+    ) + _METADATA_PLACEHOLDER
+
+def _fill_orbit_metadata(records, rows=None):
+    """批量计算目录的派生列 (周期、远近地点、轨道类型、SGP4 状态)
+    
+    Args:
+        records (numpy.ndarray): dtype 为 CATALOG_DTYPE 的记录数组，原地写入
+        rows (numpy.ndarray, optional): 只计算这些行，默认计算全部
+    """
+    if rows is None:
+        rows = np.arange(len(records))
+    if not len(rows):
+        return
+    
+    mean_motion = records['mean_motion'][rows]
+    eccentricity = records['eccentricity'][rows]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        period_min = 1440.0 / mean_motion
+        # 开普勒第三定律: a = (mu / n^2)^(1/3)，n 为弧度/秒
+        semi_major_km = np.cbrt(_EARTH_MU / (mean_motion * 2 * np.pi / 86400.0) ** 2)
+    apogee_km = semi_major_km * (1 + eccentricity) - _EARTH_RADIUS_KM
+    perigee_km = semi_major_km * (1 - eccentricity) - _EARTH_RADIUS_KM
+    
+    # 与可视化中的轨道周期分档一致: 3 小时以内为 LEO，12 小时以内为 MEO
+    regime = np.full(len(rows), REGIME_HEO, dtype=np.int8)
+    regime[period_min <= 720] = REGIME_MEO
+    regime[period_min <= 180] = REGIME_LEO
+    regime[(np.abs(period_min - 1436.1) < 30) & (eccentricity < 0.1)] = REGIME_GEO
+    
+    # 所有记录组成一个 SatrecArray，在目录参考历元 (全部记录中最新的历元) 一次调用完成传播；
+    # 根数无效或早已陨落的目标在该时刻返回非零错误码
+    satrecs = SatrecArray([Satrec.twoline2rv(line1.decode('ascii'), line2.decode('ascii'))
+                           for line1, line2 in zip(records['line1'][rows], records['line2'][rows])])
+    reference_jd = records['epoch'].max()
+    errors, _, _ = satrecs.sgp4(np.array([np.floor(reference_jd)]), np.array([reference_jd - np.floor(reference_jd)]))
+    sgp4_error = errors[:, 0].astype(np.int8)
+    
+    records['period_min'][rows] = period_min
+    records['apogee_km'][rows] = apogee_km
+    records['perigee_km'][rows] = perigee_km
+    records['regime'][rows] = regime
+    records['sgp4_error'][rows] = sgp4_error
+    records['decayed'][rows] = (sgp4_error != 0) | ~(perigee_km >= DECAY_PERIGEE_KM)
+
+class TLECatalog:
+    """列式TLE目录
+    
+    各列以 NumPy 数组保存 (可以是内存映射)，同时保留按卫星名称查找的
+    字典式接口：catalog[name] 返回 [tle1_line, tle2_line]。
+    重名卫星不再互相覆盖，而是以 "名称 [NORAD编号]" 作为各自的键。
+    """
+    
+    def __init__(self, records):
+        """初始化TLE目录
+        
+        Args:
+            records (numpy.ndarray): dtype 为 CATALOG_DTYPE 的记录数组
+        """
+        self.records = records
+        self._keys = None
+        self._key_index = None
+        self._norad_index = None
+    
+    @classmethod
+    def from_dict(cls, tle_dict):
+        """由旧式 {卫星名: [tle1_line, tle2_line]} 字典构建目录"""
+        records = [_make_record(name, lines[0].strip(), lines[1].strip())
+                   for name, lines in tle_dict.items()]
+        records = np.array(records, dtype=CATALOG_DTYPE)
+        _fill_orbit_metadata(records)
+        return cls(records)
+    
+    @property
+    def norad_ids(self):
+        return self.records['norad_id']
+    
+    @property
+    def epochs(self):
+        return self.records['epoch']
+    
+    @property
+    def names(self):
+        return self.records['name']
+    
+    def epoch_age_days(self, jd=None):
+        """返回各记录历元距指定时刻的天数
+        
+        Args:
+            jd (float, optional): UTC 儒略日，默认为当前时刻
+            
+        Returns:
+            numpy.ndarray: 历元年龄 (天)
+        """
+        if jd is None:
+            jd = datetime_to_jd(datetime.utcnow())
+        return jd - self.records['epoch']
+    
+    def exclude_decayed(self):
+        """返回去除已陨落或 SGP4 无法传播的记录后的目录"""
+        decayed = self.records['decayed']
+        if not decayed.any():
+            return self
+        print(f"排除 {int(decayed.sum())} 个已陨落或根数无效的目标")
+        return TLECatalog(self.records[~decayed])
+    
+    def orbit_info(self, name):
+        """返回卫星的轨道元数据，不存在时返回 None
+        
+        Args:
+            name (str): 卫星名称
+            
+        Returns:
+            dict: 包含 period_min、apogee_km、perigee_km、regime、decayed 的字典
+        """
+        row = self.index_of(name)
+        if row is None:
+            return None
+        record = self.records[row]
+        return {
+            "period_min": float(record['period_min']),
+            "apogee_km": float(record['apogee_km']),
+            "perigee_km": float(record['perigee_km']),
+            "regime": ORBIT_REGIMES[record['regime']],
+            "decayed": bool(record['decayed']),
+        }
+    
+    def _build_index(self):
+        """构建名称键与NORAD编号到行号的索引"""
+        names = [str(name) for name in self.records['name']]
+        norad_ids = self.records['norad_id'].tolist()
+        
+        counts = {}
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+        
+        keys = []
+        key_index = {}
+        for row, (name, norad_id) in enumerate(zip(names, norad_ids)):
+            key = name if counts[name] == 1 else f"{name} [{norad_id}]"
+            keys.append(key)
+            key_index[key] = row
+        
+        # 重名卫星的原始名称指向历元最新的一条
+        epochs = self.records['epoch']
+        for row, name in enumerate(names):
+            if counts[name] > 1:
+                best = key_index.get(name)
+                if best is None or epochs[row] > epochs[best]:
+                    key_index[name] = row
+        
+        self._keys = keys
+        self._key_index = key_index
+        self._norad_index = {norad_id: row for row, norad_id in enumerate(norad_ids)}
+    
+    def keys(self):
+        """返回所有卫星的唯一键 (按文件顺序)"""
+        if self._keys is None:
+            self._build_index()
+        return list(self._keys)
+    
+    def items(self):
+        for key in self.keys():
+            yield key, self[key]
+    
+    def index_of(self, name):
+        """返回卫星名称对应的行号，不存在时返回 None"""
+        if self._key_index is None:
+            self._build_index()
+        return self._key_index.get(name)
+    
+    def index_of_norad(self, norad_id):
+        """返回NORAD编号对应的行号，不存在时返回 None"""
+        if self._norad_index is None:
+            self._build_index()
+        return self._norad_index.get(int(norad_id))
+    
+    def lines(self, row):
+        """返回指定行的TLE两行文本"""
+        record = self.records[row]
+        return [record['line1'].decode('ascii'), record['line2'].decode('ascii')]
+    
+    def get(self, name, default=None):
+        row = self.index_of(name)
+        if row is None:
+            return default
+        return self.lines(row)
+    
+    def __getitem__(self, name):
+        row = self.index_of(name)
+        if row is None:
+            raise KeyError(name)
+        return self.lines(row)
+    
+    def __contains__(self, name):
+        return self.index_of(name) is not None
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    def __len__(self):
+        return len(self.records)
+
+class TLEArchive:
+    """只追加的本地历史TLE档案
+    
+    每次获取到的TLE都写入 SQLite (主键为 NORAD编号+历元，重复写入会被忽略)。
+    查询时在内存中按卫星维护有序的历元索引，用二分查找选出与渲染时刻
+    最接近的一组根数，避免把当天的TLE向过去传播数周。
+    """
+    
+    def __init__(self, path=None):
+        """初始化历史档案
+        
+        Args:
+            path (str, optional): SQLite 文件路径。默认为 TLE_CACHE_DIR 下的 tle_archive.sqlite
+        """
+        self.path = path or os.path.join(TLE_CACHE_DIR, 'tle_archive.sqlite')
+        self._lock = threading.Lock()
+        self._index = None
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS tle_history (
+                                norad_id INTEGER NOT NULL,
+                                epoch REAL NOT NULL,
+                                name TEXT,
+                                line1 TEXT NOT NULL,
+                                line2 TEXT NOT NULL,
+                                PRIMARY KEY (norad_id, epoch)
+                            ) WITHOUT ROWID""")
+    
+    def _connect(self):
+        """打开数据库连接；多个进程同时写入时等待对方的写锁而不是立即失败"""
+        return sqlite3.connect(self.path, timeout=30)
+    
+    def append(self, catalog):
+        """将目录中的所有TLE追加到档案
+        
+        Args:
+            catalog (TLECatalog): TLE目录
+            
+        Returns:
+            int: 新增的记录数
+        """
+        records = catalog.records
+        rows = zip(records['norad_id'].tolist(),
+                   records['epoch'].tolist(),
+                   [str(name) for name in records['name']],
+                   [line.decode('ascii') for line in records['line1']],
+                   [line.decode('ascii') for line in records['line2']])
+        with self._lock, closing(self._connect()) as conn, conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO tle_history VALUES (?, ?, ?, ?, ?)", rows)
+            added = conn.total_changes - before
+            if added:
+                self._index = None
+        return added
+    
+    def _load_index(self):
+        """加载 (NORAD编号, 历元) 有序索引"""
+        with self._lock:
+            if self._index is None:
+                with closing(self._connect()) as conn:
+                    rows = conn.execute("SELECT norad_id, epoch FROM tle_history ORDER BY norad_id, epoch").fetchall()
+                index = np.array(rows, dtype=np.float64).reshape(-1, 2)
+                self._index = (index[:, 0].astype(np.int64), index[:, 1].copy())
+            return self._index
+    
+    def nearest(self, norad_id, jd):
+        """查找指定卫星在给定时刻最接近的历元的TLE
+        
+        Args:
+            norad_id (int): NORAD编号
+            jd (float): 渲染时刻 (UTC 儒略日)
+            
+        Returns:
+            tuple: (历元, 卫星名, tle1_line, tle2_line)，档案中没有该卫星时返回 None
+        """
+        ids, epochs = self._load_index()
+        start = np.searchsorted(ids, norad_id, side='left')
+        end = np.searchsorted(ids, norad_id, side='right')
+        if start == end:
+            return None
+        
+        # 在该卫星的有序历元中二分查找，再比较左右两个邻居
+        i = start + bisect.bisect_left(epochs[start:end], jd)
+        candidates = [j for j in (i - 1, i) if start <= j < end]
+        best = min(candidates, key=lambda j: abs(epochs[j] - jd))
+        
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT epoch, name, line1, line2 FROM tle_history WHERE norad_id = ? AND epoch = ?",
+                               (int(norad_id), float(epochs[best]))).fetchone()
+        return row
+
+# 进程级共享的历史档案，首次使用时创建
+_archive = None
+_archive_lock = threading.Lock()
+
+def get_tle_archive():
+    """获取进程级共享的历史TLE档案。"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = TLEArchive()
+        return _archive
+
+def datetime_to_jd(value):
+    """将 datetime (视为UTC) 转换为儒略日
+    
+    Args:
+        value (datetime): 时间
+        
+    Returns:
+        float: UTC 儒略日
+    """
+    seconds = value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+    return value.toordinal() + 1721424.5 + seconds / 86400.0
+
+def tles_for_epoch(catalog, names, jd, archive=None):
+    """为每颗卫星选出历元最接近渲染时刻的TLE
+    
+    当前目录中的根数与历史档案中的根数比较，取历元离渲染时刻更近的一组。
+    
+    Args:
+        catalog (TLECatalog): 当前TLE目录
+        names (list): 卫星名称列表
+        jd (float): 渲染时刻 (UTC 儒略日)
+        archive (TLEArchive, optional): 历史档案，默认使用进程级共享档案
+        
+    Returns:
+        list: 与 names 顺序一致的 [tle1_line, tle2_line] 列表
+    """
+    archive = archive or get_tle_archive()
+    tles = []
+    for name in names:
+        row = catalog.index_of(name)
+        tle_lines = catalog.lines(row)
+        current_epoch = float(catalog.epochs[row])
+        
+        archived = archive.nearest(int(catalog.norad_ids[row]), jd)
+        if archived is not None and abs(archived[0] - jd) < abs(current_epoch - jd):
+            print(f"卫星 {name} 使用历史TLE (历元相差 {abs(archived[0] - jd):.2f} 天)")
+            tle_lines = [archived[2], archived[3]]
+        tles.append(tle_lines)
+    return tles
 
 def load_tle_data(tle_data):
     """加载 TLE 数据。
     
     Args:
-        tle_data (dict): TLE数据字典，格式为 {卫星名: [tle1_line, tle2_line]}
+        tle_data (TLECatalog or dict): TLE目录，或格式为 {卫星名: [tle1_line, tle2_line]} 的字典
         
     Returns:
-        dict: 处理后的TLE数据字典
+        TLECatalog: 列式TLE目录
     """
-    tle = {}
-    for key, value in tle_data.items():
-        tle[key] = value
-    return tle
+    if isinstance(tle_data, TLECatalog):
+        return tle_data
+    return TLECatalog.from_dict(tle_data)
 
 def get_satellite(tle, name, ts):
     """从 TLE 数据创建 EarthSatellite 对象。
     
     Args:
-        tle (dict): TLE数据字典，格式为 {卫星名: [tle1_line, tle2_line]}
+        tle (TLECatalog or dict): TLE目录或字典，tle[name] 为 [tle1_line, tle2_line]
         name (str): 卫星名称
         ts: 时间刻度对象
         
     Returns:
         EarthSatellite: 创建的卫星对象
     """
-    return EarthSatellite(tle[name][0], tle[name][1], name, ts)
\ No newline at end of file
+    return get_registry().get_satellite(tle[name], name, ts)
\ No newline at end of file
@@ -0,0 +1,83 @@
+import threading
+import numpy as np
+
+class TLESearchIndex:
+    """TLE目录的增量搜索索引
+
+    预先为卫星名称、NORAD编号和国际编号建立三元组 (trigram) 倒排索引，
+    查询时先求各三元组倒排表的交集得到候选，再对候选做子串校验。
+    若新查询包含上一次的查询串 (例如继续输入)，则只在上一次的结果中筛选。
+    """
+
+    def __init__(self, catalog):
+        """初始化搜索索引
+
+        Args:
+            catalog (TLECatalog): TLE目录
+        """
+        self.keys = catalog.keys()
+        norad_ids = catalog.norad_ids.tolist()
+        designators = [str(designator).upper() for designator in catalog.records['intl_designator']]
+
+        # 各字段以 \0 分隔，三元组与子串匹配都不会跨越字段边界
+        self._texts = [f"{key.upper()}\0{norad_id}\0{designator}"
+                       for key, norad_id, designator in zip(self.keys, norad_ids, designators)]
+
+        postings = {}
+        for row, text in enumerate(self._texts):
+            grams = set()
+            for field in text.split('\0'):
+                grams.update(field[i:i + 3] for i in range(len(field) - 2))
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+        self._postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+        self._all_rows = np.arange(len(self.keys), dtype=np.int32)
+
+        self._lock = threading.Lock()
+        self._last_query = ''
+        self._last_rows = self._all_rows
+
+    def search(self, query):
+        """搜索名称、NORAD编号或国际编号包含查询串的卫星
+
+        Args:
+            query (str): 查询串 (不区分大小写)
+
+        Returns:
+            list: 匹配的卫星键 (保持目录顺序)
+        """
+        return [self.keys[row] for row in self.search_rows(query)]
+
+    def search_rows(self, query):
+        """搜索并返回匹配的行号数组"""
+        query = query.strip().upper()
+        if not query:
+            return self._all_rows
+
+        with self._lock:
+            last_query, last_rows = self._last_query, self._last_rows
+
+        # 查询串被细化时，结果一定是上一次结果的子集
+        candidates = last_rows if last_query and last_query in query else None
+
+        if len(query) >= 3:
+            grams = sorted({query[i:i + 3] for i in range(len(query) - 2)},
+                           key=lambda gram: len(self._postings.get(gram, ())))
+            for gram in grams:
+                rows = self._postings.get(gram)
+                if rows is None:
+                    candidates = self._all_rows[:0]
+                    break
+                candidates = rows if candidates is None else np.intersect1d(candidates, rows, assume_unique=True)
+                if not len(candidates):
+                    break
+
+        if candidates is None:
+            candidates = self._all_rows
+
+        texts = self._texts
+        rows = np.array([row for row in candidates.tolist() if query in texts[row]], dtype=np.int32)
+
+        with self._lock:
+            self._last_query, self._last_rows = query, rows
+        return rows
@@ -164,49 +164,21 @@ AttributeEnd
 
 """
 
-ws_items = -4
+from .scene_graph import BackgroundLight, Sun, Earth, Moon
 
-from .rendering_settings import rendering_settings_checker
-
-def prerequisite_checker():
-    """检查先决条件。
-
-    Returns:
-        bool: 如果渲染设置检查通过，则返回 True，否则返回 False。
-    """
-    if rendering_settings_checker() is False:
-        return False
-    return True
-
-def world_settings_checker():
-    """检查世界设置是否已更改。
-
-    Returns:
-        bool: 如果世界设置已更改，则返回 True，否则返回 False。
-    """
-    global ws_items
-    if ws_items >= 0:
-        return True
-    return False
+# 以下函数是场景图节点 (见 scene_graph.py) 的适配器，返回节点序列化后的文本行
 
 def set_bkg_light_source(filename=None, scale=1.0):
     """设置背景光源。
 
     Args:
-        filename (str, optional): 背景光源文件名。默认为 'milkyway_2020_8k_equalarea.exr'。
+        filename (str, optional): 背景光源文件名。默认为 'hiptyc_2020_8k_equalarea.exr'。
         scale (float, optional): 光源缩放比例。默认为 1.0。
 
     Returns:
         list: 包含背景光源设置行的列表。
     """
-    if filename is None:
-        filename = 'hiptyc_2020_8k_equalarea.exr'
-    if prerequisite_checker() is False:
-        return []
-    global ws_items
-    ws_items += 1
-    return [f'LightSource "infinite" "string filename" "{filename}"',
-            f'            "float scale" [{scale}]']
+    return BackgroundLight(filename, scale).lines()
 
 def set_attrubute_the_sun(pos, radius=None):
     """设置太阳的属性。
@@ -218,43 +190,12 @@ def set_attrubute_the_sun(pos, radius=None):
     Returns:
         list: 包含太阳属性设置行的列表。
     """
-    if prerequisite_checker() is False:
+    try:
+        return Sun(pos, radius).lines()
+    except ValueError as e:
+        # 如果对象没有预期的属性，给出警告并返回空列表
+        print(f"警告: {e}")
         return []
-    if radius is None:
-        radius = 695500.0 # km
-    global ws_items
-    ws_items += 1
-    
-    # 处理坐标，支持列表和对象两种形式
-    if isinstance(pos, list):
-        x, y, z = pos
-    else:
-        # 假设pos是一个具有x, y, z属性的对象，并且这些属性可能有value成员
-        try:
-            x = pos.x.value if hasattr(pos.x, 'value') else pos.x
-            y = pos.y.value if hasattr(pos.y, 'value') else pos.y
-            z = pos.z.value if hasattr(pos.z, 'value') else pos.z
-        except AttributeError:
-            # 如果对象没有预期的属性，给出警告并返回空列表
-            print("警告: 无法从对象中提取坐标数据")
-            return []
-    
-    return [f'# The sun (emitter part)',
-            f'AttributeBegin',
-            #f'  CoordSysTransform "camera"',
-            f'  LightSource "distant"', #  使用内置 "distant" 远距平行光
-            f'              "point3 from" [0 0 0]',
-            f'              "point3 to" [{-1.0*x} {-1.0*y} {-1.0*z}]',
-            f'              "spectrum L" "sun.spd"',
-            f'              "float scale" [1.0]',
-            #f'  LightSource "infinite" "string filename" "sky.exr" "float scale" 8',
-            f'AttributeEnd',
-            f'',
-            f'# The sun (geometry part)',
-            f'AttributeBegin',
-            f'  Translate {x} {y} {z}',
-            f'  Shape "sphere" "float radius" {radius}',
-            f'AttributeEnd']
 
 def set_attrubute_the_earth(pos, rot_angle=None, rot_axis=None, radius=None):
     """设置地球的属性。
@@ -263,54 +204,16 @@ def set_attrubute_the_earth(pos, rot_angle=None, rot_axis=None, radius=None):
         pos (list or object): 地球的位置，可以是包含 x, y, z 属性的对象或 [x, y, z] 坐标列表。
         rot_angle (float, optional): 地球自转轴倾斜角度。默认为 23.5 度。
         rot_axis (list, optional): 地球自转轴。默认为 [1, 0, 0] (X 轴)。
-        radius (float, optional): 地球的半径。默认为 6378.0 (km)。
+        radius (float, optional): 地球的半径。默认为 6340.0 (km)。
 
     Returns:
         list: 包含地球属性设置行的列表。
     """
-    if prerequisite_checker() is False:
-        return []
-    if radius is None:
-        radius = 6340.0 # km
-    if rot_angle is None and rot_axis is None:
-        rot_angle = 23.5
-        rot_axis = [1, 0, 0] # X-axis
-    if rot_angle is None and rot_axis is not None:
+    try:
+        return Earth(pos, rot_angle, rot_axis, radius).lines()
+    except ValueError as e:
+        print(f"警告: {e}")
         return []
-    if rot_angle is not None and rot_axis is None:
-        return []
-    global ws_items
-    ws_items += 1
-    
-    # 处理坐标，支持列表和对象两种形式
-    if isinstance(pos, list):
-        x, y, z = pos
-    else:
-        # 假设pos是一个具有x, y, z属性的对象，并且这些属性可能有value成员
-        try:
-            x = pos.x.value if hasattr(pos.x, 'value') else pos.x
-            y = pos.y.value if hasattr(pos.y, 'value') else pos.y
-            z = pos.z.value if hasattr(pos.z, 'value') else pos.z
-        except AttributeError:
-            # 如果对象没有预期的属性，给出警告并返回空列表
-            print("警告: 无法从对象中提取坐标数据")
-            return []
-    
-    return [f'# The earth',
-            f'AttributeBegin',
-            f'  Translate {x} {y} {z}',
-            f'  Rotate {rot_angle} {rot_axis[0]} {rot_axis[1]} {rot_axis[2]}',
-            f'  MakeNamedMaterial "earthMaterial"',
-            f'    "string type" "coateddiffuse"',    #  使用涂层漫反射材质模拟地球表面 (Coated Diffuse material for Earth's surface simulation)
-            f'    "rgb reflectance" [0.1 0.2 0.3]', #  地球平均反照率近似值，蓝色调为主 (Approximate Earth albedo, bluish tone)
-            f'    "float roughness" 0.15',          #  适中粗糙度 (Moderate roughness)
-            f'    "float thickness" 0.001',         #  涂层厚度 (Coating thickness)
-            f'    "rgb albedo" [0.1 0.2 0.3]',      #  涂层下的漫反射层反照率 (Albedo of diffuse base layer under coating)
-            f'    "float g" 0.0',                   #  涂层内部散射各项异性参数 (Coating internal scattering asymmetry)
-            f'    "integer maxdepth" 5',            #  涂层内部最大散射反弹次数 (Max scattering bounces inside coating)
-            f'  NamedMaterial "earthMaterial"',     #  应用命名材质 (Apply named material)
-            f'  Shape "sphere" "float radius" {radius}',
-            f'AttributeEnd']
 
 def set_attrubute_the_moon(pos, radius=None):
     """设置月球的属性。
@@ -322,36 +225,11 @@ def set_attrubute_the_moon(pos, radius=None):
     Returns:
         list: 包含月球属性设置行的列表。
     """
-    if prerequisite_checker() is False:
+    try:
+        return Moon(pos, radius).lines()
+    except ValueError as e:
+        print(f"警告: {e}")
         return []
-    if radius is None:
-        radius = 1737.5 # km
-    global ws_items
-    ws_items += 1
-    
-    # 处理坐标，支持列表和对象两种形式
-    if isinstance(pos, list):
-        x, y, z = pos
-    else:
-        # 假设pos是一个具有x, y, z属性的对象，并且这些属性可能有value成员
-        try:
-            x = pos.x.value if hasattr(pos.x, 'value') else pos.x
-            y = pos.y.value if hasattr(pos.y, 'value') else pos.y
-            z = pos.z.value if hasattr(pos.z, 'value') else pos.z
-        except AttributeError:
-            # 如果对象没有预期的属性，给出警告并返回空列表
-            print("警告: 无法从对象中提取坐标数据")
-            return []
-    
-    return [f'# The moon',
-            f'AttributeBegin',
-            f'  Translate {x} {y} {z}',
-            f'  MakeNamedMaterial "moonMaterial"',
-            f'    "string type" "diffuse"',
-            f'    "rgb reflectance" [0.5 0.5 0.5]', #  月球平均反照率近似值，灰色调 (Approximate Moon albedo, grayish tone)
-            f'  NamedMaterial "moonMaterial"',      #  应用命名材质 (Apply named material)
-            f'  Shape "sphere" "float radius" {radius}',
-            f'AttributeEnd']
 
 def w_settings_appender(path, list_of_lists):
     """将世界设置附加到文件。
@@ -361,19 +239,17 @@ def w_settings_appender(path, list_of_lists):
         list_of_lists (list): 包含世界设置行的列表的列表。
 
     Returns:
-        list: 如果世界设置未更改或 list_of_lists 为空，则返回空列表。
+        list: 如果 list_of_lists 为空，则返回空列表。
     """
-    if world_settings_checker() is False:
-        return []
     if len(list_of_lists) >= 1:
         pass
     else:
         return []
-    from .file_write import write_line_to_file_loop_with_newline
-    for item in list_of_lists:
-        for line in item:
-            write_line_to_file_loop_with_newline(path, line)
-        write_line_to_file_loop_with_newline(path, '\n')
+    from .file_write import PBRTWriter
+    with PBRTWriter(path, append=True) as writer:
+        for item in list_of_lists:
+            writer.write_lines(item)
+            writer.write_lines(['\n'])
     print('w_settings write done')
 
 def define_new_coatedconductor(name, Kd, Ks, ur, vr, is_remaproughness=None):
@@ -0,0 +1,134 @@
+"""
+测试共用的工具：生成校验和正确的 TLE 文本，以及本地 HTTP 替身服务器
+"""
+
+import http.server
+import threading
+import time
+
+import pytest
+
+# ISS 的一组 TLE，作为生成测试数据的模板
+_TEMPLATE_LINE1 = "1 25544U 98067A   08264.51782528 -.00002182  00000-0 -11606-4 0  2927"
+_TEMPLATE_LINE2 = "2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537"
+
+def with_checksum(line):
+    """以正确的模10校验和替换 TLE 行的最后一列"""
+    checksum = sum(int(c) if c.isdigit() else c == '-' for c in line[:68]) % 10
+    return line[:68] + str(checksum)
+
+def make_tle(norad_id, mean_anomaly=325.0288, epoch='08264.51782528'):
+    """生成一组 TLE 两行文本
+
+    Args:
+        norad_id (int): NORAD编号 (5位以内)
+        mean_anomaly (float): 平近点角 (度)，改变它即得到内容不同的同一颗卫星
+        epoch (str): 历元字段 (YYDDD.DDDDDDDD，14 个字符)
+
+    Returns:
+        tuple: (tle1_line, tle2_line)
+    """
+    line1 = f"{_TEMPLATE_LINE1[:2]}{norad_id:05d}{_TEMPLATE_LINE1[7:18]}{epoch}{_TEMPLATE_LINE1[32:]}"
+    line2 = f"{_TEMPLATE_LINE2[:2]}{norad_id:05d}{_TEMPLATE_LINE2[7:43]}{mean_anomaly:8.4f}{_TEMPLATE_LINE2[51:]}"
+    return with_checksum(line1), with_checksum(line2)
+
+def make_tle_text(satellites):
+    """生成三行格式的 TLE 文件内容
+
+    Args:
+        satellites (list): [(名称, NORAD编号, 平近点角)] 列表
+
+    Returns:
+        bytes: TLE 文件内容
+    """
+    lines = []
+    for name, norad_id, mean_anomaly in satellites:
+        lines.append(name)
+        lines.extend(make_tle(norad_id, mean_anomaly))
+    return ('\n'.join(lines) + '\n').encode('ascii')
+
+class StandInServer:
+    """提供单个文件、支持 ETag / Last-Modified 条件请求的本地 HTTP 服务器"""
+
+    def __init__(self, body, etag='"v1"', last_modified='Mon, 10 Mar 2025 08:00:00 GMT', delay=0.0):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.delay = delay
+        # 每个请求的 (状态码, 请求头)
+        self.requests = []
+        # 每个请求的路径 (含查询参数)
+        self.paths = []
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.delay:
+                    time.sleep(server.delay)
+                with server._lock:
+                    body, etag = server.body, server.etag
+                    not_modified = self.headers.get('If-None-Match') == etag
+                    server.requests.append((304 if not_modified else 200, dict(self.headers)))
+                    server.paths.append(self.path)
+                if not_modified:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', server.last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}/"
+        self.url = f"{self.base_url}active.tle"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def publish(self, body, etag):
+        """更换服务器上的文件内容"""
+        with self._lock:
+            self.body = body
+            self.etag = etag
+
+    @property
+    def full_downloads(self):
+        """返回完整内容 (200) 的请求数"""
+        return sum(1 for status, _ in self.requests if status == 200)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+@pytest.fixture
+def stand_in_server():
+    """启动本地 HTTP 替身服务器的工厂，测试结束后自动关闭"""
+    servers = []
+
+    def start(body, **kwargs):
+        server = StandInServer(body, **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+@pytest.fixture
+def tle_cache_dir(tmp_path, monkeypatch):
+    """把 TLE 缓存目录指向临时目录"""
+    from src import tle_data
+    monkeypatch.setattr(tle_data, 'TLE_CACHE_DIR', str(tmp_path))
+    return tmp_path
@@ -0,0 +1,111 @@
+"""
+批量 ICRS→GCRS 变换、插值缓存与 astropy 参考链路的精度对比
+"""
+
+from datetime import datetime, timedelta
+
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.coordinates import GCRS, ICRS, CartesianRepresentation, get_body_barycentric
+from skyfield.api import wgs84
+
+from conftest import make_tle
+from skyfield.positionlib import ICRF
+
+from src.coordinates import (AU_KM, FRAME_CACHE_ERROR_KM, FrameTransformCache, convert_au_to_km, geocentric_to_gcrs_km,
+                             icrs_to_gcrs, icrs_to_gcrs_km, skyfield_to_gcrs_km, skyfield_to_icrs)
+from src.propagation import propagate_gcrs_km
+from src.time_utils import get_timescale, to_astropy_time, utc_time
+
+# 一年内每隔约一个月取一个历元，覆盖地球公转的不同位置
+EPOCHS = [datetime(2025, 1, 3, 5, 17, 0) + timedelta(days=31 * i, hours=7 * i) for i in range(12)]
+
+# 近地轨道与地球同步轨道高度的地心点 (纬度, 经度, 高度 m)
+GEOCENTRIC_POINTS = [(0.0, 0.0, 0.0), (51.4769, 0.0, 45.0), (-33.9, 151.2, 400e3), (10.0, -75.0, 35786e3)]
+
+@pytest.fixture(scope='module')
+def ts():
+    return get_timescale()
+
+def _barycentric(name, t):
+    """以 astropy 内置星历构造天体的 Skyfield 质心位置 (不依赖 JPL 星历文件)"""
+    km = get_body_barycentric(name, to_astropy_time(t)).xyz.to_value(u.km)
+    return ICRF(km / AU_KM, t=t, center=0)
+
+def _astropy_reference_km(barycentric_km, t):
+    """astropy 参考链路：ICRS (太阳系质心) → GCRS"""
+    xyz = np.atleast_2d(barycentric_km).T * u.km
+    gcrs = ICRS(CartesianRepresentation(xyz)).transform_to(GCRS(obstime=to_astropy_time(t)))
+    return gcrs.cartesian.xyz.to_value(u.km).T
+
+@pytest.mark.parametrize('epoch', EPOCHS, ids=lambda epoch: epoch.date().isoformat())
+def test_barycentric_bodies_match_astropy_exactly(ts, epoch):
+    t = utc_time(ts, epoch)
+    positions = [_barycentric(name, t) for name in ('earth', 'sun', 'moon')]
+
+    expected = _astropy_reference_km([p.position.km for p in positions], t)
+    # 质心天体合并为一次 astropy 变换，与逐个变换的结果一致 (只差浮点舍入)
+    assert np.allclose(skyfield_to_gcrs_km(positions, t), expected, rtol=0, atol=1e-6)
+    assert np.allclose(icrs_to_gcrs_km([p.position.km for p in positions], t), expected, rtol=0, atol=1e-6)
+
+    # 保留的旧接口经由同一引擎，结果一致
+    for position, reference in zip(positions, expected):
+        legacy = icrs_to_gcrs(convert_au_to_km(skyfield_to_icrs(position.position)), t)
+        assert np.allclose(legacy.xyz.to_value(u.km), reference, rtol=0, atol=1e-6)
+
+@pytest.mark.parametrize('epoch', EPOCHS, ids=lambda epoch: epoch.date().isoformat())
+def test_geocentric_positions_match_astropy(ts, epoch):
+    t = utc_time(ts, epoch)
+    earth_km = _barycentric('earth', t).position.km
+    positions = [wgs84.latlon(lat, lon, elevation_m=alt).at(t) for lat, lon, alt in GEOCENTRIC_POINTS]
+    expected = _astropy_reference_km([p.position.km + earth_km for p in positions], t)
+
+    # 地心位置加上地球质心坐标后与质心天体一起变换，包含周年光行差
+    assert np.allclose(skyfield_to_gcrs_km(positions, t, earth_km), expected, rtol=0, atol=1e-6)
+    geometric = np.array([p.position.km for p in positions])
+    assert np.allclose(geocentric_to_gcrs_km(geometric, earth_km, t), expected, rtol=0, atol=1e-6)
+    # 直接取用几何地心坐标会漏掉光行差 (地球同步轨道处可达数千米)
+    assert not np.allclose(geometric, expected, rtol=0, atol=0.1)
+
+def test_satellite_track_matches_astropy_per_sample(ts):
+    t = utc_time(ts, EPOCHS[4], np.arange(0.0, 5400.0, 600.0))
+    geometric = propagate_gcrs_km([list(make_tle(25544)), list(make_tle(20580, 120.0))], t)
+    earth_km = _barycentric('earth', t).position.km.T
+
+    track = geocentric_to_gcrs_km(geometric, earth_km, t)
+
+    assert track.shape == geometric.shape
+    for m in range(len(t)):
+        expected = _astropy_reference_km(geometric[:, m, :] + earth_km[m], t[m])
+        assert np.allclose(track[:, m, :], expected, rtol=0, atol=1e-6)
+
+@pytest.mark.parametrize('error_bound_km', [FRAME_CACHE_ERROR_KM, 0.01, 0.1])
+@pytest.mark.parametrize('epoch', EPOCHS, ids=lambda epoch: epoch.date().isoformat())
+def test_interpolated_track_within_error_bound(ts, epoch, error_bound_km):
+    # 24 小时内 1000 个时刻，地心距离从近地轨道到月球距离
+    t = utc_time(ts, epoch, np.linspace(0.0, 86400.0, 1000))
+    earth_km = _barycentric('earth', t).position.km.T
+    directions = np.random.default_rng(3).normal(size=(4, len(t), 3))
+    directions /= np.linalg.norm(directions, axis=-1, keepdims=True)
+    geometric = directions * np.array([6778.0, 26560.0, 42164.0, 384400.0])[:, np.newaxis, np.newaxis]
+
+    expected = geocentric_to_gcrs_km(geometric, earth_km, t)
+    cache = FrameTransformCache(error_bound_km)
+    interpolated = cache.icrs_to_gcrs_km(geometric + earth_km, t)
+
+    assert interpolated.shape == geometric.shape
+    assert np.linalg.norm(interpolated - expected, axis=-1).max() <= error_bound_km
+
+def test_frame_cache_is_bounded_and_reused(ts):
+    cache = FrameTransformCache(max_nodes=8)
+    t = utc_time(ts, EPOCHS[0], np.linspace(0.0, 30 * 86400.0, 50))
+    cache.icrs_to_gcrs_km(np.zeros((len(t), 3)), t)
+    assert len(cache._nodes) == 8
+
+    # 同一时刻再次转换只使用已缓存的节点
+    single = utc_time(ts, EPOCHS[0])
+    first = cache.icrs_to_gcrs_km([AU_KM, 0.0, 0.0], single)
+    nodes = list(cache._nodes)
+    assert np.array_equal(cache.icrs_to_gcrs_km([AU_KM, 0.0, 0.0], single), first)
+    assert sorted(cache._nodes) == sorted(nodes)
@@ -0,0 +1,63 @@
+"""
+PBRTWriter：原子替换、gzip 输出与截断
+"""
+
+import gzip
+import os
+
+import pytest
+
+from src.file_write import PBRTWriter
+
+def _leftovers(directory):
+    return [name for name in os.listdir(directory) if name.endswith('.part')]
+
+def test_gzip_round_trip(tmp_path):
+    path = tmp_path / 'popo.pbrt'
+    with PBRTWriter(str(path), compress=True) as w:
+        w.write_lines(['WorldBegin', '# 中文注释'])
+        w.write(b'Shape "sphere"\n')
+    assert w.path == str(path) + '.gz'
+    with gzip.open(w.path, 'rt', encoding='utf-8') as f:
+        assert f.read() == 'WorldBegin\n# 中文注释\nShape "sphere"\n'
+
+    with PBRTWriter(w.path, append=True, compress=True) as w:
+        w.write('AttributeEnd\n')
+    with gzip.open(w.path, 'rt', encoding='utf-8') as f:
+        assert f.read().endswith('Shape "sphere"\nAttributeEnd\n')
+    assert _leftovers(tmp_path) == []
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_failed_write_leaves_no_partial_file(tmp_path, compress):
+    path = tmp_path / 'popo.pbrt'
+    with pytest.raises(RuntimeError):
+        with PBRTWriter(str(path), compress=compress) as w:
+            w.write('WorldBegin\n')
+            raise RuntimeError('模型处理失败')
+    assert os.listdir(tmp_path) == []
+
+    # 原有文件保持不变
+    with PBRTWriter(str(path), compress=compress) as w:
+        w.write('old\n')
+    with pytest.raises(RuntimeError):
+        with PBRTWriter(str(path), compress=compress) as w:
+            w.write('new\n')
+            raise RuntimeError('模型处理失败')
+    opener = gzip.open if compress else open
+    with opener(w.path, 'rb') as f:
+        assert f.read() == b'old\n'
+    assert _leftovers(tmp_path) == []
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_truncate_discards_failed_part(tmp_path, compress):
+    path = tmp_path / 'popo.pbrt'
+    with PBRTWriter(str(path), compress=compress) as w:
+        w.write('WorldBegin\n')
+        start = w.tell()
+        w.write('AttributeBegin\n  Shape "half written')
+        w.truncate(start)
+        assert w.tell() == start
+        w.write('Shape "sphere"\n')
+    opener = gzip.open if compress else open
+    with opener(w.path, 'rb') as f:
+        assert f.read() == b'WorldBegin\nShape "sphere"\n'
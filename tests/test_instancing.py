@@ -0,0 +1,57 @@
+"""
+星座实例化：多个TLE共享的模型只定义一次，各卫星处放置 ObjectInstance
+"""
+
+from src.file_write import PBRTWriter
+from src.scene_assembly import instance_name, write_scene_models
+from src.scene_graph import ModelPlacement
+
+BUS = 'MakeNamedMaterial "panel" "string type" "diffuse"\nNamedMaterial "panel"\nShape "sphere"\n'
+# 模型自身含有光源，不能放进实例定义
+LAMP = 'LightSource "point" "rgb I" [1 1 1]\nShape "sphere"\n'
+
+def _write(tmp_path, placements, model_paths, layout='single', instancing=True):
+    path = tmp_path / 'popo.pbrt'
+    with PBRTWriter(str(path)) as out:
+        used = write_scene_models(out, placements, model_paths, layout, str(tmp_path / 'scene'), instancing)
+    return path.read_text(encoding='utf-8'), used
+
+def _models(tmp_path):
+    paths = {}
+    for model_uuid, text in (('bus', BUS), ('lamp', LAMP)):
+        path = tmp_path / f'{model_uuid}.pbrt'
+        path.write_text(text, encoding='utf-8')
+        paths[model_uuid] = str(path)
+    return paths
+
+PLACEMENTS = [ModelPlacement('Bus', f'STARLINK-{i}', 'bus', [i, 0, 0]) for i in range(3)] + \
+             [ModelPlacement('Lamp', f'LAMP-{i}', 'lamp', [0, i, 0]) for i in range(2)]
+
+def test_shared_model_is_defined_once(tmp_path):
+    text, _ = _write(tmp_path, PLACEMENTS, _models(tmp_path))
+
+    assert text.count(f'ObjectBegin "{instance_name("bus")}"') == 1
+    assert text.count('ObjectEnd') == 1
+    assert text.count('Shape "sphere"') == 1 + 2
+    assert text.count(f'ObjectInstance "{instance_name("bus")}"') == 3
+    for i in range(3):
+        assert f'Translate {i} 0 0\n  ObjectInstance "{instance_name("bus")}"' in text
+    # 不能实例化的模型逐个放置，每份使用各自的命名空间
+    assert 'ObjectInstance "lamp:instance"' not in text
+    assert text.count('LightSource "point"') == 2
+
+def test_included_definition_references_model_file_once(tmp_path):
+    text, used = _write(tmp_path, PLACEMENTS[:3], _models(tmp_path), layout='include')
+
+    assert len(used) == 1
+    model_file = used.pop()
+    assert text.count(f'ObjectBegin "{instance_name("bus")}"\n  Include "{model_file}"\nObjectEnd') == 1
+    assert text.count('ObjectInstance') == 3
+    assert 'Shape' not in text
+
+def test_instancing_can_be_disabled(tmp_path):
+    text, _ = _write(tmp_path, PLACEMENTS[:3], _models(tmp_path), instancing=False)
+
+    assert 'ObjectBegin' not in text and 'ObjectInstance' not in text
+    assert text.count('Shape "sphere"') == 3
+    assert 'NamedMaterial "bus#2:panel"' in text
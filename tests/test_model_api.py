@@ -0,0 +1,51 @@
+"""
+模型服务客户端：并发任务按提交顺序返回
+"""
+
+import threading
+import time
+
+from src.model_api import ModelAPIClient
+
+def _client(max_workers):
+    return ModelAPIClient('http://127.0.0.1:9/', 'v1', 'key', max_workers=max_workers)
+
+def test_map_ordered_keeps_input_order():
+    finished = []
+    lock = threading.Lock()
+
+    def work(job):
+        # 越靠前的任务越慢，完成顺序与提交顺序相反
+        time.sleep(0.02 * (10 - job))
+        with lock:
+            finished.append(job)
+        if job == 3:
+            raise ValueError('bad model')
+        return job * job
+
+    with _client(max_workers=4) as client:
+        results = list(client.map_ordered(work, range(10)))
+
+    assert [job for job, _, _ in results] == list(range(10))
+    assert finished != sorted(finished)
+    for job, result, error in results:
+        if job == 3:
+            assert result is None and isinstance(error, ValueError)
+        else:
+            assert result == job * job and error is None
+
+def test_map_ordered_bounds_pending_jobs():
+    pulled = 0
+
+    def jobs():
+        nonlocal pulled
+        for job in range(50):
+            pulled += 1
+            yield job
+
+    with _client(max_workers=3) as client:
+        for job, result, error in client.map_ordered(lambda job: job, jobs()):
+            # 已取出但尚未返回的任务不超过并发数的两倍
+            assert pulled - (job + 1) < 2 * 3
+            assert result == job and error is None
+    assert pulled == 50
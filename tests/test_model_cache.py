@@ -0,0 +1,86 @@
+"""
+模型缓存的容量淘汰 (当前场景使用的内容不会被淘汰) 与无版本条目的 ETag 确认
+"""
+
+import os
+
+from src.model_api import ModelAPIClient
+from src.model_cache import ModelCache, derived_dir
+
+def test_eviction_is_least_recently_used(tmp_path):
+    cache = ModelCache(str(tmp_path), max_bytes=250)
+    first = cache.put('a', b'a' * 100, 'v1')
+    second = cache.put('b', b'b' * 100, 'v1')
+    third = cache.put('c', b'c' * 100, 'v1')
+
+    assert not os.path.exists(first)
+    assert os.path.exists(second) and os.path.exists(third)
+    assert cache.path('a', 'v1') is None
+
+def test_pinned_entries_survive_eviction(tmp_path):
+    cache = ModelCache(str(tmp_path), max_bytes=250)
+    pinned = set()
+    oldest = cache.put('a', b'a' * 100, 'v1')
+    pinned.add(cache.path('a', 'v1'))
+    os.makedirs(os.path.join(derived_dir(oldest), 'ply-1024'))
+    cache.put('b', b'b' * 100, 'v1')
+
+    # 下载到的新内容同样受保护，超出容量时淘汰的是未受保护的 b
+    third = cache.put_chunks('c', [b'c' * 60, b'c' * 40], 'v1', protect=pinned)
+
+    assert third in pinned
+    assert os.path.exists(oldest) and os.path.isdir(derived_dir(oldest))
+    assert cache.path('b', 'v1') is None
+    assert cache.get('a', 'v1') == b'a' * 100
+    assert cache.get('c', 'v1') == b'c' * 100
+
+def test_eviction_removes_derived_files(tmp_path):
+    cache = ModelCache(str(tmp_path), max_bytes=150)
+    first = cache.put('a', b'a' * 100, 'v1')
+    os.makedirs(os.path.join(derived_dir(first), 'ply-1024'))
+    cache.put('b', b'b' * 100, 'v1')
+
+    assert not os.path.exists(first)
+    assert not os.path.exists(derived_dir(first))
+
+def test_unversioned_entries_are_revalidated_with_etag(tmp_path, stand_in_server):
+    server = stand_in_server(b'Shape "sphere"\n', etag='"v1"')
+    cache = ModelCache(str(tmp_path))
+
+    def fetch(client, etag=None):
+        return client.download_untransformed(
+            'uuid-1', lambda chunks, new_etag: cache.put_chunks('uuid-1', chunks, None, new_etag), etag=etag)
+
+    with ModelAPIClient(server.base_url, 'v1', 'key') as client:
+        first = fetch(client)
+        assert cache.lookup('uuid-1') == (first, '"v1"')
+
+        # 内容未变化：条件请求返回 304，继续使用缓存的副本
+        assert fetch(client, '"v1"') is None
+        assert server.requests[-1][1]['If-None-Match'] == '"v1"'
+
+        # 服务器上的模型更新后，条件请求取回新内容并替换旧副本
+        server.publish(b'Shape "sphere" "float radius" 2\n', '"v2"')
+        second = fetch(client, '"v1"')
+
+    assert second != first and not os.path.exists(first)
+    assert cache.lookup('uuid-1') == (second, '"v2"')
+    assert server.full_downloads == 2
+    # 只使用只读的 GET 请求，零平移作为查询参数给出，不改动服务器上的变换状态
+    assert server.paths == ['/v1/model/momo/uuid-1?translate=0%2C0%2C0'] * 3
+
+def test_replaced_content_is_unpinned_and_removed(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    pinned = set()
+    old = cache.put('uuid-1', b'old', etag='"v1"', protect=pinned)
+    shared = cache.put('uuid-2', b'shared', 'v1', protect=pinned)
+    os.makedirs(derived_dir(old))
+
+    new = cache.put('uuid-1', b'new', etag='"v2"', protect=pinned)
+    # 其他条目仍在引用的内容不会因替换而删除
+    cache.put('uuid-3', b'shared', etag='"a"')
+    cache.put('uuid-3', b'other', etag='"b"')
+
+    assert pinned == {new, shared}
+    assert not os.path.exists(old) and not os.path.exists(derived_dir(old))
+    assert os.path.exists(shared)
@@ -0,0 +1,89 @@
+"""
+PBRT 流式改写：命名空间、匿名材料与任意分块边界
+"""
+
+import pytest
+
+from src.pbrt_rewriter import PBRTRewriter
+
+MODEL = '''# 模型中的注释: NamedMaterial "metal" 不是指令
+AttributeBegin
+MakeNamedMaterial "metal" "string type" "conductor" "float roughness" 0.1
+MakeNamedMaterial "solar panel" "string type" "diffuse"
+Texture "checks" "spectrum" "checkerboard" "float uscale" [ 8 ] "texture tex1" "global-noise"
+MakeNamedMaterial "mix" "string type" "mix" "string materials" [ "metal" "solar panel" ] "texture amount" "checks"
+Material "diffuse" "texture reflectance" "checks"
+Material ""
+Shape "sphere" "float radius" 1
+MakeNamedMaterial "" "string type" "dielectric"
+NamedMaterial ""
+Shape "trianglemesh" "point3 P" [ 0 0 0 1 0 0 0 1 0 ] "integer indices" [ 0 1 2 ] "bool flag" true
+MakeNamedMaterial "" "string type" "diffuse"
+NamedMaterial "" # 第二个匿名材料
+NamedMaterial "metal"
+NamedMaterial "scene-global"
+ObjectBegin "bolt"
+Shape "sphere"
+ObjectEnd
+ObjectInstance "bolt"
+NamedMaterial "name \\"quoted\\""
+AttributeEnd
+'''
+
+def _rewrite(text, chunk_size=None):
+    rewriter = PBRTRewriter('uuid-1')
+    chunk_size = chunk_size or len(text)
+    out = ''.join(rewriter.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size))
+    return out + rewriter.flush(), rewriter
+
+def test_names_are_namespaced():
+    out, rewriter = _rewrite(MODEL)
+
+    assert 'MakeNamedMaterial "uuid-1:metal"' in out
+    assert 'MakeNamedMaterial "uuid-1:solar panel"' in out
+    assert 'Texture "uuid-1:checks" "spectrum" "checkerboard"' in out
+    assert '"string materials" [ "uuid-1:metal" "uuid-1:solar panel" ]' in out
+    assert '"texture amount" "uuid-1:checks"' in out
+    assert 'Material "diffuse" "texture reflectance" "uuid-1:checks"' in out
+    # 模型未定义的名称 (场景中的全局实体) 与非命名参数保持不变
+    assert '"texture tex1" "global-noise"' in out
+    assert 'NamedMaterial "scene-global"' in out
+    assert '"string type" "conductor"' in out
+    assert 'ObjectBegin "uuid-1:bolt"' in out and 'ObjectInstance "uuid-1:bolt"' in out
+    # 注释与数值列表原样保留
+    assert '# 模型中的注释: NamedMaterial "metal" 不是指令' in out
+    assert '"point3 P" [ 0 0 0 1 0 0 0 1 0 ]' in out
+    assert rewriter.defined['material'] == {'metal', 'solar panel', 'mix'}
+    assert not rewriter.instanceable
+
+def test_anonymous_materials_get_unique_names():
+    out, rewriter = _rewrite(MODEL)
+
+    assert rewriter.anonymous_materials == 2
+    assert 'MakeNamedMaterial "uuid-1:anonymous-1" "string type" "dielectric"\nNamedMaterial "uuid-1:anonymous-1"' in out
+    assert 'MakeNamedMaterial "uuid-1:anonymous-2" "string type" "diffuse"\nNamedMaterial "uuid-1:anonymous-2"' in out
+    # Material "" 不是命名材料的定义
+    assert 'Material ""\n' in out
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 16, 64, 1000])
+def test_chunk_boundaries_do_not_change_output(chunk_size):
+    expected, _ = _rewrite(MODEL)
+    assert _rewrite(MODEL, chunk_size)[0] == expected
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 9, None])
+def test_unterminated_string_at_eof_is_kept(chunk_size):
+    text = 'MakeNamedMaterial "metal" "string type" "diffuse"\nNamedMaterial "metal'
+    out, _ = _rewrite(text, chunk_size)
+    assert out == 'MakeNamedMaterial "uuid-1:metal" "string type" "diffuse"\nNamedMaterial "metal'
+
+def test_unterminated_string_does_not_swallow_following_lines():
+    text = 'NamedMaterial "broken\nMakeNamedMaterial "metal" "string type" "diffuse"\nNamedMaterial "metal"\n'
+    expected, _ = _rewrite(text)
+    assert expected == ('NamedMaterial "broken\nMakeNamedMaterial "uuid-1:metal" "string type" "diffuse"\n'
+                        'NamedMaterial "uuid-1:metal"\n')
+    for chunk_size in (1, 2, 3, 8):
+        assert _rewrite(text, chunk_size)[0] == expected
+
+def test_adjacent_models_are_split():
+    out, _ = _rewrite('AttributeBegin\nShape "sphere"\nAttributeEndAttributeBegin\nShape "disk"\nAttributeEnd\n', 4)
+    assert 'AttributeEnd\nAttributeBegin\nShape "disk"' in out
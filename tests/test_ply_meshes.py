@@ -0,0 +1,99 @@
+"""
+内联三角网格转换为二进制 PLY
+"""
+
+import os
+import struct
+
+import pytest
+
+from src import ply_meshes
+from src.model_cache import ModelCache, derived_dir
+from src.ply_meshes import TriangleMeshExtractor, convert_model_meshes
+
+VERTICES = 8
+
+def _mesh(comment=''):
+    points = ' '.join(f'{i} {i * 0.5} {-i}' for i in range(VERTICES))
+    indices = ' '.join(f'{i} {(i + 1) % VERTICES} {(i + 2) % VERTICES}' for i in range(VERTICES))
+    return (f'Shape "trianglemesh" "point3 P" [ {points} ] # 顶点\n'
+            f'  "integer indices" [ {indices} ] "float alpha" 0.5 {comment}\n')
+
+MODEL = ('AttributeBegin\nMakeNamedMaterial "m" "string type" "diffuse"\n' + _mesh('# 行尾注释 "x"')
+         + 'Shape "sphere" "float radius" 1\nAttributeEnd\n')
+
+def _convert(text, mesh_dir, chunk_size=None, min_vertices=VERTICES):
+    extractor = TriangleMeshExtractor(str(mesh_dir), min_vertices=min_vertices)
+    chunk_size = chunk_size or len(text)
+    out = ''.join(extractor.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size))
+    return out + extractor.flush(), extractor.meshes
+
+def test_mesh_with_comments_is_converted(tmp_path):
+    converted, meshes = _convert(MODEL, tmp_path)
+
+    assert len(meshes) == 1
+    assert f'Shape "plymesh" "string filename" "meshes/{meshes[0]}" "float alpha" 0.5\n' in converted
+    assert 'trianglemesh' not in converted
+    assert 'Shape "sphere" "float radius" 1' in converted
+
+    with open(tmp_path / meshes[0], 'rb') as f:
+        header, _, body = f.read().partition(b'end_header\n')
+    assert b'element vertex 8' in header and b'element face 8' in header
+    vertices = struct.unpack(f'<{VERTICES * 3}f', body[:VERTICES * 12])
+    assert vertices[3:6] == (1.0, 0.5, -1.0)
+    assert struct.unpack('<B3i', body[VERTICES * 12:VERTICES * 12 + 13]) == (3, 0, 1, 2)
+
+def test_chunking_does_not_change_output(tmp_path):
+    expected, _ = _convert(MODEL, tmp_path)
+    for chunk_size in (1, 3, 17, 64):
+        assert _convert(MODEL, tmp_path, chunk_size)[0] == expected
+
+def test_small_and_unsupported_meshes_are_kept(tmp_path):
+    small = 'Shape "trianglemesh" "point3 P" [0 0 0 1 0 0 0 1 0] "integer indices" [0 1 2]\n'
+    tangent = _mesh().replace('"float alpha"', '"vector3 S" [1 0 0] "float alpha"')
+    converted, meshes = _convert(small + tangent, tmp_path)
+    assert meshes == []
+    assert converted == small + tangent
+
+def test_vertex_attributes_are_interleaved(tmp_path):
+    normals = ' '.join('0 0 1' for _ in range(VERTICES))
+    uvs = ' '.join(f'{i} 0.25' for i in range(VERTICES))
+    faces = ' '.join(str(i * 10) for i in range(VERTICES))
+    text = _mesh().replace('"float alpha"', f'"normal N" [ {normals} ] "point2 uv" [ {uvs} ]\n'
+                                             f'  "integer faceIndices" [ {faces} ] "float alpha"')
+    for chunk_size in (None, 5):
+        converted, meshes = _convert(text, tmp_path, chunk_size)
+        assert converted.startswith('Shape "plymesh"') and len(meshes) <= 1
+    with open(tmp_path / os.listdir(tmp_path)[0], 'rb') as f:
+        header, _, body = f.read().partition(b'end_header\n')
+    assert b'property float nx' in header and b'property float u' in header
+    assert b'property int face_indices' in header
+    stride = 8 * 4
+    assert struct.unpack('<8f', body[stride:2 * stride]) == (1.0, 0.5, -1.0, 0.0, 0.0, 1.0, 1.0, 0.25)
+    assert struct.unpack('<B4i', body[VERTICES * stride + 17:VERTICES * stride + 34]) == (3, 1, 2, 3, 10)
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 7])
+def test_unconverted_statements_are_kept_verbatim(tmp_path, monkeypatch, chunk_size):
+    # 语句原文超过内存上限时转存到临时文件，仍然原样写出
+    monkeypatch.setattr(ply_meshes, '_RAW_SPOOL_SIZE', 16)
+    small = _convert(MODEL, tmp_path, chunk_size, min_vertices=VERTICES + 1)
+    invalid = MODEL.replace('1.5 -3', 'x -3')
+    unclosed = MODEL.replace('] "float alpha"', '"float alpha"')
+    for text, converted in ((MODEL, small), (invalid, _convert(invalid, tmp_path, chunk_size)),
+                            (unclosed, _convert(unclosed, tmp_path, chunk_size))):
+        assert converted == (text, [])
+
+def test_incomplete_cache_entry_is_reconverted(tmp_path):
+    cache = ModelCache(str(tmp_path / 'cache'))
+    source = cache.put('uuid-1', MODEL.encode('utf-8'))
+
+    model_path, mesh_paths = convert_model_meshes(source, VERTICES)
+    assert len(mesh_paths) == 1
+    assert convert_model_meshes(source, VERTICES) == (model_path, mesh_paths)
+
+    # 转换中断后留下的不完整目录视为未命中
+    os.remove(model_path)
+    assert os.path.isdir(os.path.join(derived_dir(source), f'ply-{VERTICES}'))
+    assert convert_model_meshes(source, VERTICES) == (model_path, mesh_paths)
+    with open(model_path, encoding='utf-8') as f:
+        assert 'plymesh' in f.read()
@@ -0,0 +1,24 @@
+"""
+批量 SGP4 传播与 Skyfield EarthSatellite 逐颗计算的结果对比
+"""
+
+from datetime import datetime
+
+import numpy as np
+from skyfield.api import EarthSatellite
+
+from conftest import make_tle
+from src.propagation import propagate_gcrs_km
+from src.time_utils import get_timescale, utc_time
+
+def test_batch_matches_earth_satellite():
+    ts = get_timescale()
+    tles = [list(make_tle(norad_id, mean_anomaly)) for norad_id, mean_anomaly in ((25544, 10.0), (43013, 200.5))]
+    t = utc_time(ts, datetime(2008, 9, 21, 3, 0, 0), np.arange(0.0, 7200.0, 317.0))
+
+    positions = propagate_gcrs_km(tles, t)
+
+    assert positions.shape == (2, len(t), 3)
+    for tle, batch in zip(tles, positions):
+        expected = EarthSatellite(*tle, ts=ts).at(t).position.km.T
+        assert np.allclose(batch, expected, rtol=0, atol=1e-6)
@@ -0,0 +1,53 @@
+"""
+场景组装：独立模型文件与按清单打包
+"""
+
+import io
+import os
+import tarfile
+
+from src.scene_assembly import (MODELS_SUBDIR, package_scene, remove_unused_model_files,
+                                 write_model_reference, write_scene_model_file)
+
+def test_package_contains_only_manifest(tmp_path):
+    scene_dir = tmp_path / 'scene'
+    source = tmp_path / ('ab' * 32 + '.pbrt')
+    source.write_text('MakeNamedMaterial "m" "string type" "diffuse"\nShape "sphere"\n', encoding='utf-8')
+    model_file, instanceable = write_scene_model_file(str(scene_dir), 'uuid-1', str(source))
+    assert instanceable
+    (scene_dir / 'popo.pbrt').write_text('WorldBegin\n', encoding='utf-8')
+    # 以前的运行留下的文件
+    (scene_dir / 'popo.pbrt.gz').write_bytes(b'stale')
+    (scene_dir / 'notes.txt').write_text('stale', encoding='utf-8')
+
+    archive = package_scene(str(scene_dir), str(tmp_path / 'scene.tar.gz'), {'popo.pbrt', model_file})
+
+    with tarfile.open(archive) as tar:
+        assert sorted(tar.getnames()) == sorted(['popo.pbrt', model_file])
+        content = tar.extractfile(model_file).read().decode('utf-8')
+    assert 'MakeNamedMaterial "uuid-1:m"' in content
+
+def test_model_file_is_reused_and_references_follow_layout(tmp_path):
+    scene_dir = tmp_path / 'scene'
+    source = tmp_path / ('cd' * 32 + '.pbrt')
+    source.write_text('ObjectBegin "bolt"\nShape "sphere"\nObjectEnd\nObjectInstance "bolt"\n', encoding='utf-8')
+
+    model_file, instanceable = write_scene_model_file(str(scene_dir), 'uuid-2', str(source))
+    assert model_file == f"{MODELS_SUBDIR}/uuid-2-{'cd' * 6}.pbrt"
+    assert not instanceable
+    # 已经改写过的文件直接复用，实例定义标记从文件末尾读回
+    mtime = (scene_dir / model_file).stat().st_mtime_ns
+    assert write_scene_model_file(str(scene_dir), 'uuid-2', str(source)) == (model_file, False)
+    assert (scene_dir / model_file).stat().st_mtime_ns == mtime
+    second_copy, _ = write_scene_model_file(str(scene_dir), 'uuid-2', str(source), copy=1)
+    assert second_copy == f"{MODELS_SUBDIR}/uuid-2-{'cd' * 6}-1.pbrt"
+    assert 'ObjectBegin "uuid-2#1:bolt"' in (scene_dir / second_copy).read_text(encoding='utf-8')
+
+    for layout, directive in (('import', 'Import'), ('include', 'Include')):
+        out = io.BytesIO()
+        write_model_reference(out, layout, model_file, [1, 2, 3])
+        assert out.getvalue().decode('utf-8') == (f'AttributeBegin\n  Translate 1 2 3\n'
+                                                  f'  {directive} "{model_file}"\nAttributeEnd\n')
+
+    remove_unused_model_files(str(scene_dir), {model_file})
+    assert sorted(os.listdir(scene_dir / MODELS_SUBDIR)) == [os.path.basename(model_file)]
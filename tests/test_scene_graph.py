@@ -0,0 +1,62 @@
+"""
+场景图：校验、序列化顺序与相邻两帧的结构差异
+"""
+
+import pytest
+
+from src.scene_graph import (Scene, LookAt, Camera, Sampler, Integrator, Film, Sun, Moon, ModelPlacement)
+
+def _scene(sun=(1.0, 0.0, 0.0), satellites=(('SAT-A', [1, 2, 3]), ('SAT-B', [4, 5, 6]))):
+    scene = Scene()
+    scene.set(LookAt([10, 0, 0]))
+    scene.set(Camera('perspective', 30))
+    scene.set(Sampler('halton', 16))
+    scene.set(Integrator('volpath', 5))
+    scene.set(Film(640, 480))
+    scene.add(Sun(list(sun), 695700))
+    scene.add(Moon([0.0, 384400.0, 0.0], 1737.4))
+    for tle_name, translate in satellites:
+        scene.add(ModelPlacement('Bus', tle_name, 'bus', translate))
+    return scene
+
+def test_missing_required_options_are_listed():
+    scene = Scene()
+    scene.set(LookAt([10, 0, 0]))
+    scene.set(Film(640, 480))
+    with pytest.raises(ValueError, match='Camera, Sampler, Integrator'):
+        scene.validate()
+    with pytest.raises(ValueError):
+        scene.options_text()
+    _scene().validate()
+
+def test_nodes_must_go_to_their_section():
+    scene = Scene()
+    with pytest.raises(ValueError):
+        scene.set(Sun([0, 0, 0]))
+    with pytest.raises(ValueError):
+        scene.add(Film(640, 480))
+    # 同类渲染设置只保留最后设置的一个
+    scene.set(Camera('perspective', 30))
+    scene.set(Camera('perspective', 45))
+    assert scene.options[Camera] == Camera('perspective', 45)
+
+def test_header_text_order():
+    text = _scene().header_text()
+    order = [text.index(marker) for marker in ('LookAt', 'Camera', 'Sampler', 'Integrator', 'Film',
+                                               'WorldBegin', '# 天体设置', '# 模型部分开始')]
+    assert order == sorted(order)
+    assert text.count('WorldBegin') == 1
+    # 模型不在头部中，由场景组装逐个写入
+    assert 'SAT-A' not in text
+
+def test_diff_between_frames():
+    previous = _scene()
+    assert _scene().diff(previous) == {'added': [], 'removed': [], 'changed': []}
+
+    current = _scene(sun=(2.0, 0.0, 0.0), satellites=(('SAT-A', [1, 2, 3.5]), ('SAT-C', [7, 8, 9])))
+    diff = current.diff(previous)
+    assert diff['added'] == [ModelPlacement('Bus', 'SAT-C', 'bus', [7, 8, 9])]
+    assert diff['removed'] == [ModelPlacement('Bus', 'SAT-B', 'bus', [4, 5, 6])]
+    changed = {type(new).__name__ + getattr(new, 'tle_name', ''): (old, new) for old, new in diff['changed']}
+    assert set(changed) == {'Sun', 'ModelPlacementSAT-A'}
+    assert changed['ModelPlacementSAT-A'][0].translate != changed['ModelPlacementSAT-A'][1].translate
@@ -0,0 +1,36 @@
+"""
+流式场景组装：任意分块 (包括切开多字节字符) 得到相同的输出
+"""
+
+import io
+
+import pytest
+
+from src.scene_assembly import write_placed_model
+
+MODEL = ('# 太阳能板\nMakeNamedMaterial "面板" "string type" "diffuse"\n'
+         'NamedMaterial "面板"\nShape "sphere" "float radius" 1\n').encode('utf-8')
+
+def _place(chunk_size):
+    out = io.BytesIO()
+    chunks = (MODEL[i:i + chunk_size] for i in range(0, len(MODEL), chunk_size))
+    write_placed_model(out, chunks, 'uuid-1', [1.0, 2.0, 3.0])
+    return out.getvalue()
+
+def test_chunking_does_not_change_output():
+    expected = _place(len(MODEL))
+    text = expected.decode('utf-8')
+    assert text.startswith('AttributeBegin\n  Translate 1.0 2.0 3.0\n')
+    assert 'MakeNamedMaterial "uuid-1:面板"' in text and 'NamedMaterial "uuid-1:面板"' in text
+    assert text.endswith('\nAttributeEnd\n')
+    # 块大小 1 与 2 会把三字节的汉字切到不同的块中
+    for chunk_size in (1, 2, 5, 64):
+        assert _place(chunk_size) == expected
+
+def test_invalid_utf8_is_rejected():
+    with pytest.raises(ValueError):
+        write_placed_model(io.BytesIO(), [b'Shape "sphere" \xff\xfe\n'], 'uuid-1', [0, 0, 0])
+
+def test_truncated_multibyte_character_is_rejected():
+    with pytest.raises(ValueError):
+        write_placed_model(io.BytesIO(), [MODEL, '面'.encode('utf-8')[:2]], 'uuid-1', [0, 0, 0])
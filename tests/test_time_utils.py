@@ -0,0 +1,41 @@
+"""
+批量时间对象：datetime 数组与秒偏移一次换算为 Skyfield 与 astropy 时间
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+
+from src.time_utils import get_timescale, to_astropy_time, utc_time, utc_times
+
+EPOCH = datetime(2016, 12, 31, 23, 59, 58, 250000)
+
+def test_utc_times_matches_single_conversions():
+    ts = get_timescale()
+    # 跨越 2016 年末的闰秒，并含有带时区的 datetime
+    epochs = [EPOCH, EPOCH + timedelta(seconds=3), datetime(2025, 3, 10, 16, 0, tzinfo=timezone(timedelta(hours=8)))]
+
+    t = utc_times(ts, epochs)
+
+    assert t.shape == (3,)
+    for i, epoch in enumerate(epochs):
+        single = utc_time(ts, epoch)
+        assert abs((t[i].tt - single.tt) * 86400.0) < 1e-6
+    assert t[2].utc_datetime() == datetime(2025, 3, 10, 8, 0, tzinfo=timezone.utc)
+
+def test_offsets_and_astropy_time_without_strings():
+    ts = get_timescale()
+    offsets = np.arange(0.0, 7.0, 0.5)
+
+    t = utc_time(ts, EPOCH, offsets)
+    astropy_t = to_astropy_time(t)
+
+    # 偏移跨过闰秒时，相邻时刻仍相差 0.5 SI 秒
+    assert np.allclose(np.diff((t.whole - t.whole[0]) + t.tt_fraction) * 86400.0, 0.5, atol=1e-6)
+    expected = Time(EPOCH.isoformat(), scale='utc') + offsets * u.s
+    assert np.allclose((astropy_t - expected).sec, 0.0, atol=1e-6)
+    # 单个时刻的 astropy Time 被缓存，重复换算返回同一对象
+    single = utc_time(ts, EPOCH)
+    assert to_astropy_time(single) is to_astropy_time(utc_time(ts, EPOCH))
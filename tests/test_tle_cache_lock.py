@@ -0,0 +1,54 @@
+"""
+多进程同时刷新 TLE 缓存：只下载一次，所有进程都拿到完整的目录
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+
+from conftest import make_tle_text
+
+WORKERS = 8
+SATELLITES = [(f'SAT {i}', 20000 + i, float(i)) for i in range(50)]
+
+def _refresh_worker(cache_dir, url, barrier, results):
+    """在子进程中获取 TLE 目录，返回卫星名称与数量"""
+    from src import tle_data
+    tle_data.TLE_CACHE_DIR = cache_dir
+    barrier.wait()
+    try:
+        catalog = tle_data.get_tle_data(url, 'active.tle')
+        results.put((os.getpid(), len(catalog), sorted(str(name) for name in catalog.names)))
+    except Exception as e:
+        results.put((os.getpid(), -1, repr(e)))
+
+def test_concurrent_refresh_downloads_once(tmp_path, stand_in_server):
+    # 响应延迟放大各进程同时发现缓存缺失的时间窗口
+    server = stand_in_server(make_tle_text(SATELLITES), delay=0.5)
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(WORKERS)
+    results = context.Queue()
+    workers = [context.Process(target=_refresh_worker, args=(str(tmp_path), server.url, barrier, results))
+               for _ in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get(timeout=120) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    assert len(server.requests) == 1
+    expected = sorted(name for name, _, _ in SATELLITES)
+    for pid, count, names in outcomes:
+        assert count == len(SATELLITES), names
+        assert names == expected
+
+    # 缓存文件完整：文本与二进制目录都能解析，且没有遗留的临时文件
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
+    with open(tmp_path / 'active.tle', 'rb') as f:
+        assert f.read() == server.body
+    caches = [name for name in os.listdir(tmp_path) if name.endswith('.npy')]
+    assert len(caches) == 1
+    assert len(np.load(tmp_path / caches[0], mmap_mode='r')) == len(SATELLITES)
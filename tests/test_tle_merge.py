@@ -0,0 +1,35 @@
+"""
+多个TLE数据源的目录合并：同一NORAD编号保留历元最新的记录
+"""
+
+from conftest import make_tle
+from src.tle_data import TLECatalog, merge_catalogs
+
+def _catalog(satellites):
+    """由 [(名称, NORAD编号, 历元字段)] 构建目录"""
+    return TLECatalog.from_dict({name: list(make_tle(norad_id, epoch=epoch)) for name, norad_id, epoch in satellites})
+
+def test_merge_keeps_newest_epoch_per_norad_id():
+    active = _catalog([('ISS', 25544, '25069.50000000'), ('HST', 20580, '25070.25000000'),
+                       ('NOAA 19', 33591, '25068.00000000')])
+    supplemental = _catalog([('ISS (ZARYA)', 25544, '25070.00000000'), ('HST', 20580, '25069.75000000'),
+                             ('STARLINK-1007', 44713, '25070.10000000')])
+
+    merged = merge_catalogs([active, supplemental])
+
+    assert len(merged) == 4
+    epochs = {int(norad_id): line1[18:32] for norad_id, (line1, _) in
+              zip(merged.norad_ids, (merged.lines(row) for row in range(len(merged))))}
+    assert epochs == {25544: '25070.00000000', 20580: '25070.25000000', 33591: '25068.00000000',
+                      44713: '25070.10000000'}
+    # 保持各卫星首次出现的顺序
+    assert [int(norad_id) for norad_id in merged.norad_ids] == [25544, 20580, 33591, 44713]
+    assert 'ISS (ZARYA)' in merged and 'ISS' not in merged
+
+def test_equal_epochs_prefer_earlier_source():
+    first = _catalog([('FIRST', 25544, '25069.50000000')])
+    second = _catalog([('SECOND', 25544, '25069.50000000')])
+
+    merged = merge_catalogs([first, second])
+
+    assert list(merged.keys()) == ['FIRST']
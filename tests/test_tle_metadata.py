@@ -0,0 +1,50 @@
+"""
+目录加载时批量计算的轨道元数据：周期、轨道类型与 SGP4 状态
+"""
+
+import numpy as np
+from sgp4.api import Satrec
+
+from conftest import make_tle, with_checksum
+from src.tle_data import ORBIT_REGIMES, TLECatalog
+
+def _with_elements(norad_id, epoch='08264.51782528', eccentricity=None, mean_motion=None, bstar=None):
+    line1, line2 = make_tle(norad_id, epoch=epoch)
+    if bstar is not None:
+        line1 = with_checksum(f"{line1[:53]}{bstar}{line1[61:]}")
+    if eccentricity is not None:
+        line2 = f"{line2[:26]}{eccentricity}{line2[33:]}"
+    if mean_motion is not None:
+        line2 = f"{line2[:52]}{mean_motion}{line2[63:]}"
+    return [line1, with_checksum(line2)]
+
+def test_regimes_and_periods():
+    catalog = TLECatalog.from_dict({
+        'LEO': _with_elements(10001),
+        'MEO': _with_elements(10002, mean_motion=' 2.00561844'),
+        'GEO': _with_elements(10003, eccentricity='0001234', mean_motion=' 1.00271100'),
+        'HEO': _with_elements(10004, eccentricity='7200000', mean_motion=' 1.50000000'),
+    })
+
+    assert [ORBIT_REGIMES[regime] for regime in catalog.records['regime']] == ['LEO', 'MEO', 'GEO', 'HEO']
+    assert np.allclose(catalog.records['period_min'], 1440.0 / catalog.records['mean_motion'])
+    assert catalog.orbit_info('GEO')['regime'] == 'GEO'
+
+def test_sgp4_errors_match_single_satellite_propagation():
+    tles = {
+        'OK': _with_elements(10001),
+        # 偏心率接近 1，近地点在地球内部
+        'INVALID': _with_elements(10002, eccentricity='9990000'),
+        # 历元比目录中最新的记录早半年、阻力很大，传播到参考历元时已陨落
+        'STALE': _with_elements(10003, epoch='08100.00000000', bstar=' 50000-1'),
+    }
+    catalog = TLECatalog.from_dict(tles)
+
+    reference_jd = catalog.epochs.max()
+    whole = np.floor(reference_jd)
+    expected = [Satrec.twoline2rv(*lines).sgp4(whole, reference_jd - whole)[0] for lines in tles.values()]
+    assert catalog.records['sgp4_error'].tolist() == expected
+    assert expected[0] == 0 and expected[1] != 0 and expected[2] != 0
+
+    assert catalog.records['decayed'].tolist() == [False, True, True]
+    assert list(catalog.exclude_decayed().keys()) == ['OK']
@@ -0,0 +1,78 @@
+"""
+流式 TLE 解析：两行与三行格式混排、逐条校验与解析统计
+"""
+
+from conftest import make_tle, with_checksum
+from src.tle_data import TLEParseStats, iter_tle_groups, iter_tle_records, parse_tle_file
+
+def _write(tmp_path, lines):
+    path = tmp_path / 'mixed.tle'
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+def _corrupt_checksum(line):
+    return line[:68] + str((int(line[68]) + 1) % 10)
+
+def test_mixed_two_and_three_line_formats(tmp_path):
+    iss, hst, noaa = make_tle(25544), make_tle(20580), make_tle(33591)
+    path = _write(tmp_path, ['ISS (ZARYA)', *iss, *hst, '', '0 NOAA 19', *noaa])
+
+    stats = TLEParseStats()
+    groups = list(iter_tle_groups(path, stats))
+
+    assert groups == [('ISS (ZARYA)', *iss), ('20580', *hst), ('NOAA 19', *noaa)]
+    assert stats.records == 3 and stats.malformed == 0
+
+def test_bad_records_are_dropped_without_shifting_later_ones(tmp_path):
+    good = make_tle(25544)
+    bad_checksum = make_tle(20580)
+    mismatch = make_tle(33591)[0], make_tle(33592)[1]
+    path = _write(tmp_path, [
+        'BAD CHECKSUM', bad_checksum[0], _corrupt_checksum(bad_checksum[1]),
+        'MISMATCH', *mismatch,
+        'LONELY LINE 2', make_tle(11111)[1],
+        'NO SECOND LINE', make_tle(22222)[0],
+        'GOOD', *good,
+        'TRUNCATED', make_tle(44713)[0],
+    ])
+
+    stats = TLEParseStats()
+    groups = list(iter_tle_groups(path, stats))
+
+    assert groups == [('GOOD', *good)]
+    assert stats.records == 1
+    assert stats.checksum_errors == 1
+    assert stats.id_mismatches == 1
+    # 缺少第一行的第二行、缺少第二行的第一行、文件末尾截断的一组
+    assert stats.orphan_lines == 3
+    assert stats.malformed == 5
+
+def test_trailing_name_without_lines_is_counted(tmp_path):
+    path = _write(tmp_path, ['ISS', *make_tle(25544), 'DANGLING NAME'])
+
+    stats = TLEParseStats()
+    assert len(list(iter_tle_groups(path, stats))) == 1
+    assert stats.orphan_lines == 1
+
+def test_unparseable_elements_are_counted(tmp_path):
+    line1, line2 = make_tle(20580)
+    # 校验和正确，但偏心率字段不是数字
+    broken = with_checksum(line2[:26] + 'abcdefg' + line2[33:])
+    path = _write(tmp_path, ['BROKEN', line1, broken, 'ISS', *make_tle(25544)])
+
+    stats = TLEParseStats()
+    records = list(iter_tle_records(path, stats))
+
+    assert [record[0] for record in records] == [25544]
+    assert stats.records == 1 and stats.invalid_elements == 1 and stats.malformed == 1
+
+def test_parse_tle_file_builds_catalog_and_reports_stats(tmp_path, capsys):
+    path = _write(tmp_path, ['ISS', *make_tle(25544), *make_tle(20580), 'CUT', make_tle(33591)[0]])
+
+    stats = TLEParseStats()
+    catalog = parse_tle_file(path, stats)
+
+    assert list(catalog.keys()) == ['ISS', '20580']
+    assert catalog['ISS'] == list(make_tle(25544))
+    assert str(stats) == "2 条有效, 1 条格式错误 (校验和 0, 编号不一致 0, 孤立行 1, 根数无效 0)"
+    assert '格式错误' in capsys.readouterr().out
@@ -0,0 +1,102 @@
+"""
+TLE 刷新：条件请求、流式写入临时文件后原子替换、按 NORAD 编号增量合并
+"""
+
+import json
+import os
+
+import numpy as np
+
+from conftest import make_tle_text
+from src import tle_data
+
+SATELLITES = [('SAT A', 10001, 10.0), ('SAT B', 10002, 20.0), ('SAT C', 10003, 30.0)]
+
+def test_download_streams_into_temp_file_and_replaces(tle_cache_dir, stand_in_server, monkeypatch):
+    body = make_tle_text(SATELLITES)
+    server = stand_in_server(body)
+
+    replaced = []
+    real_replace = os.replace
+
+    def recording_replace(src, dst):
+        replaced.append((str(src), str(dst)))
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(tle_data.os, 'replace', recording_replace)
+    path = tle_data.download_tle_file(server.url, 'active.tle')
+
+    assert path == os.path.join(str(tle_cache_dir), 'active.tle')
+    with open(path, 'rb') as f:
+        assert f.read() == body
+    # 正文先写入同目录的临时文件，再替换为目标文件
+    src, dst = replaced[0]
+    assert dst == path
+    assert os.path.dirname(src) == str(tle_cache_dir) and src.endswith('.part')
+    assert not [name for name in os.listdir(tle_cache_dir) if name.endswith('.part')]
+
+    with open(path + '.meta.json', encoding='utf-8') as f:
+        metadata = json.load(f)
+    assert metadata == {'url': server.url, 'etag': '"v1"', 'last_modified': server.last_modified}
+
+def test_conditional_request_keeps_file_on_304(tle_cache_dir, stand_in_server):
+    body = make_tle_text(SATELLITES)
+    server = stand_in_server(body)
+    path = tle_data.download_tle_file(server.url, 'active.tle')
+    os.utime(path, (0, 0))
+
+    assert tle_data.download_tle_file(server.url, 'active.tle') == path
+
+    status, headers = server.requests[-1]
+    assert status == 304
+    assert headers['If-None-Match'] == '"v1"'
+    assert headers['If-Modified-Since'] == server.last_modified
+    assert server.full_downloads == 1
+    with open(path, 'rb') as f:
+        assert f.read() == body
+    # 304 时刷新文件时间，缓存有效期随之延长
+    assert tle_data.is_tle_cache_valid(path)
+
+def test_changed_file_is_downloaded_again(tle_cache_dir, stand_in_server):
+    server = stand_in_server(make_tle_text(SATELLITES))
+    path = tle_data.download_tle_file(server.url, 'active.tle')
+
+    updated = make_tle_text(SATELLITES[:2] + [('SAT D', 10004, 40.0)])
+    server.publish(updated, '"v2"')
+    assert tle_data.download_tle_file(server.url, 'active.tle') == path
+
+    assert server.requests[-1][0] == 200
+    with open(path, 'rb') as f:
+        assert f.read() == updated
+    with open(path + '.meta.json', encoding='utf-8') as f:
+        assert json.load(f)['etag'] == '"v2"'
+
+def test_incremental_merge_parses_only_changed_records(tmp_path, monkeypatch, capsys):
+    old_path = tmp_path / 'old.tle'
+    old_path.write_bytes(make_tle_text(SATELLITES))
+    previous = tle_data.parse_tle_file(str(old_path))
+
+    # SAT B 的根数变化，SAT C 下架，新增 SAT D
+    new_path = tmp_path / 'new.tle'
+    new_path.write_bytes(make_tle_text([('SAT A', 10001, 10.0), ('SAT B', 10002, 25.0), ('SAT D', 10004, 40.0)]))
+
+    parsed = []
+    real_make_record = tle_data._make_record
+
+    def counting_make_record(name, line1, line2):
+        parsed.append(name)
+        return real_make_record(name, line1, line2)
+
+    monkeypatch.setattr(tle_data, '_make_record', counting_make_record)
+    capsys.readouterr()
+    merged = tle_data.update_tle_catalog(previous, str(new_path))
+
+    assert sorted(parsed) == ['SAT B', 'SAT D']
+    assert "2 条记录变化, 1 条未变" in capsys.readouterr().out
+
+    # 合并结果与完整解析新文件一致
+    full = tle_data.parse_tle_file(str(new_path))
+    for field in ('norad_id', 'name', 'line1', 'line2', 'regime', 'decayed'):
+        assert np.array_equal(merged.records[field], full.records[field])
+    for field in ('epoch', 'mean_anomaly', 'period_min', 'apogee_km', 'perigee_km'):
+        assert np.allclose(merged.records[field], full.records[field], equal_nan=True)
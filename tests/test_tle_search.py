@@ -0,0 +1,54 @@
+"""
+TLE 增量搜索索引与逐条子串匹配的结果一致
+"""
+
+import random
+
+import pytest
+
+from conftest import make_tle, with_checksum
+from src.tle_data import TLECatalog
+from src.tle_search import TLESearchIndex
+
+NAMES = ['ISS (ZARYA)', 'STARLINK-1007', 'STARLINK-1008', 'STARLINK-30190', 'NOAA 19', 'NOAA 18',
+         'GPS BIIR-2 (PRN 13)', 'HST', 'TIANGONG', 'CSS (TIANHE)', 'ONEWEB-0012', 'COSMOS 2251 DEB']
+
+def _tle(norad_id, designator):
+    line1, line2 = make_tle(norad_id)
+    return [with_checksum(f"{line1[:9]}{designator:<8}{line1[17:]}"), line2]
+
+@pytest.fixture(scope='module')
+def catalog():
+    return TLECatalog.from_dict({name: _tle(40000 + 37 * i, f"{(98 + i % 3) % 100:02d}{67 + i:03d}{'ABC'[i % 3]}")
+                                 for i, name in enumerate(NAMES)})
+
+def _scan(catalog, query):
+    """逐条检查名称、NORAD编号与国际编号是否包含查询串"""
+    query = query.strip().upper()
+    return [key for key, norad_id, designator in
+            zip(catalog.keys(), catalog.norad_ids.tolist(), catalog.records['intl_designator'])
+            if not query or any(query in field for field in (key.upper(), str(norad_id), str(designator).upper()))]
+
+@pytest.mark.parametrize('query', ['', 'STAR', 'starlink-10', 'noaa', '1', '40', '400', '98', '067A',
+                                   'TIAN', ' hst ', 'ZARYA)', 'NOT THERE', 'K-1', 'T\x004'])
+def test_search_matches_substring_scan(catalog, query):
+    assert TLESearchIndex(catalog).search(query) == _scan(catalog, query)
+
+def test_refining_and_widening_queries(catalog):
+    index = TLESearchIndex(catalog)
+    # 逐字输入 (在上一次结果中细化)、删除字符与换成不相关的查询交替进行
+    for query in ['S', 'ST', 'STA', 'STAR', 'STARL', 'STARLINK-3', 'STARLINK-', 'STARLINK-1008',
+                  'STAR', 'N', 'NO', 'NOAA 1', 'NOAA 19', 'OA', '', '4', '40', '401', 'OSMOS']:
+        assert index.search(query) == _scan(catalog, query), query
+
+def test_random_typing_sessions(catalog):
+    alphabet = 'STARLINKO019 -()A'
+    generator = random.Random(7)
+    index = TLESearchIndex(catalog)
+    query = ''
+    for _ in range(500):
+        if query and generator.random() < 0.35:
+            query = query[:-1]
+        else:
+            query += generator.choice(alphabet)
+        assert index.search(query) == _scan(catalog, query), query